@@ -0,0 +1,288 @@
+# /ai_output.py
+"""
+Turns the planner's raw output into task suggestions, salvaging what it can.
+
+Gemini is asked for a bare JSON array and mostly sends one, but not always:
+fences and prose around it, trailing commas, comments, Python literals or
+single quotes, an object wrapping the array, points written as "50 points" or
+out of range, or the end cut off at the token limit. Any of those used to fail
+`json.loads` and the request with it (503), and the retry paid for a whole new
+generation. `parse_tasks` tries increasingly tolerant steps and stops at the
+first one that yields tasks:
+
+1. the text as JSON, once markdown fences are stripped;
+2. the outermost array (or object) cut out of the surrounding text, as is and
+   then through `repair`;
+3. every complete object in it, one by one, which keeps the finished tasks of a
+   truncated response.
+
+Every task then goes through `normalize_task`. The caller only fails when
+nothing at all could be recovered.
+
+With AI_RESPONSE_SCHEMA the model is also given `RESPONSE_SCHEMA`, so it
+generates valid JSON in the first place; the parser stays as the safety net.
+"""
+
+import json
+import math
+import re
+from dataclasses import dataclass, field
+
+from pydantic import ValidationError
+
+from ai_stream import JSONArrayStreamParser
+from schemas import TaskCreate
+
+MIN_POINTS, MAX_POINTS = 10, 100
+# Points for a task the model gave none (or nonsense) for: a quick task, per the prompt's scale.
+DEFAULT_POINTS = 30
+MAX_TITLE_LENGTH = 200
+MAX_DESCRIPTION_LENGTH = 2000
+
+# Outcomes of parse_tasks, best first: valid as sent, valid after extraction, repair or
+# normalization, recovered object by object (tasks may be missing), nothing usable.
+CLEAN, REPAIRED, PARTIAL, FAILED = "clean", "repaired", "partial", "failed"
+
+# Passed as `response_schema` (OpenAPI subset understood by the Gemini SDK). Only the
+# fields the model decides; the fixed ones are filled in by normalize_task.
+RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "Short, action-oriented task name."},
+            "description": {"type": "string", "description": "1-2 sentences: what to do and why."},
+            "points": {"type": "integer", "description": f"Effort points, {MIN_POINTS} to {MAX_POINTS}."},
+        },
+        "required": ["title", "description", "points"],
+    },
+}
+
+_FENCE = re.compile(r"```[A-Za-z]*")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = "“”"
+
+@dataclass
+class ParseResult:
+    tasks: list[dict] = field(default_factory=list)
+    outcome: str = FAILED
+    # Objects found in the output that could not be turned into a task.
+    dropped: int = 0
+
+# --- Normalization ---
+
+def normalize_points(value) -> int:
+    """Coerces `points` into an integer in [MIN_POINTS, MAX_POINTS]."""
+    if isinstance(value, bool):
+        value = None
+    elif isinstance(value, str):
+        match = _NUMBER.search(value)
+        value = float(match.group()) if match else None
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        return DEFAULT_POINTS
+    return min(MAX_POINTS, max(MIN_POINTS, round(value)))
+
+def _text(value) -> str:
+    if value is None or isinstance(value, (dict, list)):
+        return ""
+    return " ".join(str(value).split())
+
+def normalize_task(candidate) -> dict | None:
+    """
+    A task suggestion in canonical form (the shape of `TaskCreate`), or None if unusable.
+
+    Title and description are trimmed (`name`/`details` are accepted for them), points
+    coerced and clamped, and the fields the prompt fixes (deadline, completed, isFinal,
+    bossType, bossName) set to their required values whatever the model wrote.
+    """
+    if not isinstance(candidate, dict):
+        return None
+    title = _text(candidate.get("title", candidate.get("name")))[:MAX_TITLE_LENGTH]
+    if not title:
+        return None
+    description = _text(candidate.get("description", candidate.get("details")))[:MAX_DESCRIPTION_LENGTH]
+    task = {
+        "title": title,
+        "description": description,
+        "points": normalize_points(candidate.get("points")),
+        "deadline": None,
+        "completed": False,
+        "isFinal": False,
+        "bossType": "none",
+        "bossName": None,
+    }
+    try:
+        TaskCreate.model_validate(task)
+    except ValidationError:
+        return None
+    return task
+
+def _unchanged(candidate: dict, task: dict) -> bool:
+    # Fixed fields the model left out (JSON mode only asks for three) do not count as changes.
+    required = RESPONSE_SCHEMA["items"]["required"]
+    return all(key in candidate for key in required) and all(candidate.get(key, value) == value for key, value in task.items())
+
+# --- Extraction and repair ---
+
+def _strip_fences(text: str) -> str:
+    return _FENCE.sub("", text).strip()
+
+def _outermost(text: str) -> tuple[int, str] | None:
+    """
+    Where the first top-level JSON array (or object) in `text` starts, and its text up
+    to the closing bracket, or to the end if it never closes (truncated output).
+    """
+    array = re.search(r"\[\s*(?:[{\]]|/[/*])", text)
+    obj = text.find("{")
+    if array and (obj < 0 or array.start() <= obj):
+        start = array.start()
+    elif obj >= 0:
+        start = obj
+    else:
+        return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return start, text[start:i + 1]
+    return start, text[start:]
+
+def repair(text: str) -> str:
+    """
+    Fixes the JSON mistakes language models make, leaving string contents alone:
+    trailing commas, // and /* */ comments, True/False/None, single-quoted and
+    smart-quoted strings.
+    """
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char == '"':
+            # Copy a double-quoted string verbatim.
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        elif char == "'" or char in _SMART_QUOTES:
+            closing = "'" if char == "'" else "”"
+            j = i + 1
+            chars = []
+            while j < n and text[j] != closing:
+                if text[j] == "\\" and j + 1 < n:
+                    chars.append(text[j + 1] if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                chars.append('\\"' if text[j] == '"' else text[j])
+                j += 1
+            out.append('"' + "".join(chars) + '"')
+            i = j + 1
+        elif text.startswith("//", i):
+            while i < n and text[i] != "\n":
+                i += 1
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+        elif char == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] in "]}":
+                i += 1
+            else:
+                out.append(char)
+                i += 1
+        elif char.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(_PYTHON_LITERALS.get(word, word))
+            i = j
+        else:
+            out.append(char)
+            i += 1
+    return "".join(out)
+
+def loads_lenient(text: str):
+    """json.loads, retried once on the `repair`ed text."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(repair(text))
+
+def _task_list(value) -> list | None:
+    """The list of task candidates in a parsed value: the array itself, or one wrapped in an object."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for item in value.values():
+            if isinstance(item, list) and any(isinstance(element, dict) for element in item):
+                return item
+        if "title" in value or "name" in value:
+            return [value]
+    return None
+
+def _objects(text: str) -> list:
+    """Every complete object in `text`, an array cut short or broken or objects one after another."""
+    parser = JSONArrayStreamParser(loads=loads_lenient)
+    return parser.feed(text if text.startswith("[") else "[" + text)
+
+# --- Pipeline ---
+
+def _result(candidates: list, outcome: str) -> ParseResult:
+    tasks, dropped = [], 0
+    for candidate in candidates:
+        task = normalize_task(candidate)
+        if task is None:
+            dropped += 1
+            continue
+        tasks.append(task)
+        if outcome == CLEAN and not _unchanged(candidate, task):
+            outcome = REPAIRED
+    if not tasks:
+        return ParseResult(outcome=FAILED, dropped=dropped)
+    return ParseResult(tasks, PARTIAL if dropped else outcome, dropped)
+
+def parse_tasks(text: str) -> ParseResult:
+    """Parses the planner's output; see the module docstring for the steps."""
+    stripped = _strip_fences(text or "")
+    try:
+        value = json.loads(stripped)
+        candidates = _task_list(value)
+        if candidates:
+            return _result(candidates, CLEAN if isinstance(value, list) else REPAIRED)
+    except json.JSONDecodeError:
+        pass
+
+    found = _outermost(stripped)
+    if found is None:
+        return ParseResult()
+    start, span = found
+    try:
+        value = loads_lenient(span)
+        candidates = _task_list(value)
+        # A lone task object may be the first of several written one after another: step 3.
+        if candidates and candidates != [value]:
+            return _result(candidates, REPAIRED)
+    except json.JSONDecodeError:
+        pass
+
+    objects = _objects(stripped[start:])
+    if not objects:
+        return ParseResult()
+    return _result(objects, PARTIAL)
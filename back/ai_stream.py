@@ -0,0 +1,64 @@
+# /ai_stream.py
+
+import json
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extracts the objects of a top-level JSON array from text chunks.
+
+    Feed it the model output as it streams in and it returns every object whose
+    closing brace has arrived, so callers can act on each element long before the
+    array is complete. Text before the opening bracket (e.g. markdown fences) is ignored.
+    Each object's text is decoded with `loads`; objects it rejects are skipped.
+    """
+
+    def __init__(self, loads=json.loads):
+        self._loads = loads
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        objects = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = i
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(self._loads(buffer[self._object_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+            i += 1
+
+        # Drop consumed text so the buffer only holds the object being built.
+        keep_from = self._object_start if self._object_start is not None else i
+        self._buffer = buffer[keep_from:]
+        if self._object_start is not None:
+            self._object_start = 0
+        self._pos = i - keep_from
+        return objects
@@ -0,0 +1,253 @@
+# /archive.py
+"""
+Hot/cold split for missions.
+
+A mission that was soft-deleted (isActive = false) or reached one of
+ARCHIVE_STATUSES, and has not changed for ARCHIVE_AFTER_DAYS, is moved by
+`archive_missions` (python manage.py archive, run from cron) out of mission,
+task, missionparticipant and taskcompletion into the cold tables:
+- missionarchive keeps the mission's columns, plus its tasks and task
+  completions in `payload` (zlib-compressed JSON): nothing ever queries them
+  one by one once the mission is over.
+- missionparticipantarchive keeps the participants as rows, so their points
+  still count on the global leaderboard.
+The hot tables, their indexes and the search index then only hold missions
+still in play.
+
+Reads stay transparent: the mission routes fall back to this module when an id
+is not in the hot tables and answer in the same shape. Archived missions are
+read-only (writes get 409); `restore_mission` moves one back.
+"""
+
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import defer
+from sqlmodel import and_, delete, insert, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from loaders import eager_options
+from models import Mission, MissionArchive, MissionParticipant, MissionParticipantArchive, Task, TaskCompletion
+from pagination import as_utc, decode_cursor, encode_cursor
+from serialization import project
+from schemas import MissionParticipantReadWithUser, MissionReadWithParticipants
+
+COMPRESSION_LEVEL = 6
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def archivable(cutoff: datetime):
+    """Hot missions the archival job may move: deleted or finished, and untouched since `cutoff`."""
+    finished = or_(Mission.isActive == False, Mission.status.in_(settings.ARCHIVE_STATUSES))
+    return and_(finished, Mission.updatedAt < cutoff)
+
+# --- Payload ---
+
+def pack(tasks: list[Task], completions: list[TaskCompletion]) -> bytes:
+    data = {"tasks": [task.model_dump() for task in tasks], "completions": [c.model_dump() for c in completions]}
+    return zlib.compress(orjson.dumps(data), COMPRESSION_LEVEL)
+
+def unpack(archived: MissionArchive) -> tuple[list[Task], list[TaskCompletion]]:
+    """The archived mission's tasks, in (createdAt, id) order, and task completions."""
+    data = orjson.loads(zlib.decompress(archived.payload))
+    return [Task.model_validate(t) for t in data["tasks"]], [TaskCompletion.model_validate(c) for c in data["completions"]]
+
+# --- Batch job ---
+
+async def archive_batch(session: AsyncSession, cutoff: datetime, limit: int) -> int:
+    """Moves up to `limit` archivable missions to the cold tables in one transaction. Returns how many."""
+    candidates = select(Mission.id).where(archivable(cutoff)).order_by(Mission.updatedAt).limit(limit)
+    # O UPDATE (sem efeito) vem antes de qualquer leitura: pega o lock de escrita (SQLite) ou
+    # das linhas (PostgreSQL) e reavalia o filtro, então uma missão alterada nesse meio tempo
+    # é arquivada já com a alteração ou, se deixou de se qualificar, fica onde está.
+    mission_ids = (await session.exec(
+        update(Mission)
+        .where(Mission.id.in_(candidates.scalar_subquery()), archivable(cutoff))
+        .values(version=Mission.version)
+        .returning(Mission.id)
+    )).scalars().all()
+    if not mission_ids:
+        return 0
+
+    missions = (await session.exec(select(Mission).where(Mission.id.in_(mission_ids)))).all()
+    tasks = (await session.exec(
+        select(Task).where(Task.missionId.in_(mission_ids)).order_by(Task.createdAt, Task.id)
+    )).all()
+    mission_tasks = select(Task.id).where(Task.missionId.in_(mission_ids))
+    completions = (await session.exec(select(TaskCompletion).where(TaskCompletion.task_id.in_(mission_tasks)))).all()
+    participants = (await session.exec(
+        select(MissionParticipant).where(MissionParticipant.mission_id.in_(mission_ids))
+    )).all()
+
+    tasks_by_mission: dict[uuid.UUID, list[Task]] = {}
+    mission_of_task = {}
+    for task in tasks:
+        tasks_by_mission.setdefault(task.missionId, []).append(task)
+        mission_of_task[task.id] = task.missionId
+    completions_by_mission: dict[uuid.UUID, list[TaskCompletion]] = {}
+    for completion in completions:
+        completions_by_mission.setdefault(mission_of_task[completion.task_id], []).append(completion)
+
+    archived_at = _now()
+    await session.exec(insert(MissionArchive), params=[
+        {
+            **mission.model_dump(),
+            "archivedAt": archived_at,
+            "payload": pack(tasks_by_mission.get(mission.id, []), completions_by_mission.get(mission.id, [])),
+        }
+        for mission in missions
+    ])
+    if participants:
+        await session.exec(insert(MissionParticipantArchive), params=[p.model_dump() for p in participants])
+
+    # synchronize_session=False: the loaded rows are dropped at commit anyway, and matching
+    # each DELETE against every object in the session costs more than the DELETEs themselves.
+    for statement in (
+        delete(TaskCompletion).where(TaskCompletion.task_id.in_(mission_tasks)),
+        delete(Task).where(Task.missionId.in_(mission_ids)),
+        delete(MissionParticipant).where(MissionParticipant.mission_id.in_(mission_ids)),
+        delete(Mission).where(Mission.id.in_(mission_ids)),
+    ):
+        await session.exec(statement.execution_options(synchronize_session=False))
+    await session.commit()
+    session.expunge_all()
+    return len(mission_ids)
+
+async def purge_batch(session: AsyncSession, cutoff: datetime, limit: int) -> int:
+    """Deletes up to `limit` missions archived before `cutoff` for good. Returns how many."""
+    mission_ids = (await session.exec(
+        select(MissionArchive.id).where(MissionArchive.archivedAt < cutoff).limit(limit)
+    )).all()
+    if not mission_ids:
+        return 0
+    await session.exec(delete(MissionParticipantArchive).where(MissionParticipantArchive.mission_id.in_(mission_ids)))
+    await session.exec(delete(MissionArchive).where(MissionArchive.id.in_(mission_ids)))
+    await session.commit()
+    return len(mission_ids)
+
+async def compact_search_index(session: AsyncSession):
+    """
+    Merges the SQLite full-text index after a large archival run.
+
+    Each deleted row leaves a delete marker in the FTS5 index, and until segments
+    are merged every search walks past them: searching for a common word got slower
+    after archiving most missions, not faster. PostgreSQL needs nothing here.
+    """
+    if session.bind.dialect.name != "sqlite":
+        return
+    for fts in ("mission_fts", "task_fts", "missionarchive_fts"):
+        await session.exec(text(f"INSERT INTO {fts}({fts}) VALUES ('optimize')"))
+    await session.commit()
+
+async def archive_missions(
+    session: AsyncSession,
+    after_days: float = settings.ARCHIVE_AFTER_DAYS,
+    retention_days: float = settings.ARCHIVE_RETENTION_DAYS,
+    batch_size: int = settings.ARCHIVE_BATCH_SIZE,
+) -> tuple[int, int]:
+    """
+    Archives every archivable mission, then purges archives past their retention.
+
+    Works in batches of `batch_size` missions, one short transaction each, so the
+    API's writers are never blocked for long. Returns (archived, purged).
+    """
+    archived = purged = 0
+    cutoff = _now() - timedelta(days=after_days)
+    while count := await archive_batch(session, cutoff, batch_size):
+        archived += count
+    if archived:
+        await compact_search_index(session)
+    if retention_days > 0:
+        cutoff = _now() - timedelta(days=retention_days)
+        while count := await purge_batch(session, cutoff, batch_size):
+            purged += count
+    return archived, purged
+
+async def restore_mission(session: AsyncSession, mission_id: uuid.UUID) -> bool:
+    """
+    Moves an archived mission back to the hot tables. Returns False if it is not archived.
+
+    `updatedAt` is set to now, so the next run does not archive it again right away.
+    """
+    archived = await session.get(MissionArchive, mission_id)
+    if archived is None:
+        return False
+    tasks, completions = unpack(archived)
+    participants = (await session.exec(
+        select(MissionParticipantArchive).where(MissionParticipantArchive.mission_id == mission_id)
+    )).all()
+
+    mission = archived.model_dump(exclude={"archivedAt", "payload"})
+    await session.exec(insert(Mission), params=[{**mission, "updatedAt": _now()}])
+    if tasks:
+        await session.exec(insert(Task), params=[task.model_dump() for task in tasks])
+    if completions:
+        await session.exec(insert(TaskCompletion), params=[c.model_dump() for c in completions])
+    if participants:
+        await session.exec(insert(MissionParticipant), params=[p.model_dump() for p in participants])
+    await session.exec(delete(MissionParticipantArchive).where(MissionParticipantArchive.mission_id == mission_id))
+    await session.exec(delete(MissionArchive).where(MissionArchive.id == mission_id))
+    await session.commit()
+    return True
+
+# --- Reads ---
+
+async def get_mission(session: AsyncSession, mission_id: uuid.UUID, schema=None, fields: frozenset | None = None) -> MissionArchive | None:
+    """An archived mission, with the relationships `schema` serializes (see `loaders.eager_options`) loaded."""
+    options = eager_options(MissionArchive, schema, fields) if schema is not None else ()
+    return (await session.exec(select(MissionArchive).where(MissionArchive.id == mission_id).options(*options))).first()
+
+async def user_missions(session: AsyncSession, user_id: uuid.UUID, fields: frozenset | None = None) -> list[dict]:
+    """The archived, not deleted, missions `user_id` created or took part in, as `mission_view`s."""
+    participating = select(MissionParticipantArchive.mission_id).where(MissionParticipantArchive.user_id == user_id)
+    statement = select(MissionArchive).where(
+        or_(MissionArchive.createdById == user_id, MissionArchive.id.in_(participating)), MissionArchive.isActive == True
+    )
+    if fields is not None and "tasks" not in fields:
+        # The payload only holds the tasks.
+        statement = statement.options(defer(MissionArchive.payload))
+    statement = statement.options(*eager_options(MissionArchive, MissionReadWithParticipants, fields))
+    return [mission_view(archived, fields) for archived in (await session.exec(statement)).all()]
+
+def mission_view(archived: MissionArchive, fields: frozenset | None = None) -> dict:
+    """An archived mission loaded for `MissionReadWithParticipants`, in the shape the hot route returns."""
+    data = {name: getattr(archived, name) for name in ("id", "name", "description", "createdById")}
+    data["participants"] = archived.participants if fields is None or "participants" in fields else []
+    data["tasks"] = unpack(archived)[0] if fields is None or "tasks" in fields else []
+    return project(MissionReadWithParticipants, data, fields)
+
+def task_page(archived: MissionArchive, completed: bool | None, limit: int, cursor: str | None = None) -> dict:
+    """A keyset page of the archived tasks, with the same cursors as `pagination.paginate`."""
+    tasks = unpack(archived)[0]
+    if completed is not None:
+        tasks = [task for task in tasks if task.completed == completed]
+    if cursor:
+        after = decode_cursor(cursor)
+        tasks = [task for task in tasks if (as_utc(task.createdAt), task.id) > after]
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1].createdAt, tasks[-1].id)
+    return {"items": tasks, "next_cursor": next_cursor}
+
+async def ranked(session: AsyncSession, mission_id: uuid.UUID) -> list[tuple[uuid.UUID, int]]:
+    """(user_id, points) of an archived mission's participants, best first, ties as on the live boards."""
+    rows = await session.exec(
+        select(MissionParticipantArchive.user_id, MissionParticipantArchive.total_points)
+        .where(MissionParticipantArchive.mission_id == mission_id)
+        .order_by(MissionParticipantArchive.total_points.desc(), MissionParticipantArchive.user_id)
+    )
+    return list(rows.all())
+
+async def participants_with_users(session: AsyncSession, mission_id: uuid.UUID, user_ids: list[uuid.UUID]) -> dict:
+    statement = (
+        select(MissionParticipantArchive)
+        .where(MissionParticipantArchive.mission_id == mission_id, MissionParticipantArchive.user_id.in_(user_ids))
+        .options(*eager_options(MissionParticipantArchive, MissionParticipantReadWithUser))
+    )
+    return {p.user_id: p for p in (await session.exec(statement)).all()}
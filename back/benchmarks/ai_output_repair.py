@@ -0,0 +1,157 @@
+# /benchmarks/ai_output_repair.py
+"""
+How many planner responses survive parsing: the old parser vs ai_output.parse_tasks.
+
+Runs a corpus of planner outputs through both parsers:
+
+  legacy      strip ```json fences, json.loads, keep it if it is a list (the old
+              _generate_plan; anything else was a 503 and a new generation)
+  tolerant    ai_output.parse_tasks (extraction, repair, object-by-object recovery)
+
+The corpus is hand-written from the failure modes seen in Gemini output (fences
+and prose, trailing commas, comments, Python literals, wrapped arrays, truncation
+at the token limit...), one case per mode plus clean responses. It says which
+modes are handled, not how often each occurs in production: for that, weight the
+cases with the `ai_output_total` counter from /metrics.
+
+Prints per-case results, the share of responses each parser turns into tasks,
+the tasks recovered vs. expected, parse time, and what the failures cost: each
+failed parse is another generation of `--generation-seconds`.
+
+    python benchmarks/ai_output_repair.py
+    python benchmarks/ai_output_repair.py --generation-seconds 8 --verbose
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _task(i: int, points=50, **extra) -> dict:
+    task = {"title": f"Task {i}", "description": f"Do part {i} of the plan.", "points": points}
+    task.update(extra)
+    return task
+
+def _full(i: int, points=50) -> dict:
+    return _task(i, points, deadline=None, completed=False, isFinal=False, bossType="none", bossName=None)
+
+_THREE = [_full(1, 20), _full(2, 40), _full(3, 70)]
+_PRETTY = json.dumps(_THREE, indent=2)
+
+# (case, model output, tasks a person would read out of it)
+CORPUS = [
+    ("clean", json.dumps(_THREE), 3),
+    ("clean, pretty-printed", _PRETTY, 3),
+    ("clean, JSON mode", json.dumps([_task(i) for i in range(1, 6)]), 5),
+    ("fenced", "```json\n" + _PRETTY + "\n```", 3),
+    ("fenced, no language", "```\n" + _PRETTY + "\n```", 3),
+    ("prose before", "Here is your quest plan:\n" + _PRETTY, 3),
+    ("prose around fences", "Sure! Here you go:\n```json\n" + _PRETTY + "\n```\nGood luck on your quest!", 3),
+    ("trailing commas", '[{"title": "A", "description": "a", "points": 20,}, {"title": "B", "description": "b", "points": 30},]', 2),
+    ("line comments", '[\n  {"title": "A", "description": "see http://x.io", "points": 20}, // warm-up\n  {"title": "B", "description": "b", "points": 30}\n]', 2),
+    ("block comments", '[/* first */ {"title": "A", "description": "a", "points": 20}, {"title": "B", "description": "b", "points": 30}]', 2),
+    ("python literals", "[{'title': 'A', 'description': 'a', 'points': 20, 'completed': False, 'deadline': None}]", 1),
+    ("smart quotes", '[{“title”: “A”, “description”: “a”, “points”: 20}]', 1),
+    ("points as text", '[{"title": "A", "description": "a", "points": "70 points"}, {"title": "B", "description": "b", "points": "40"}]', 2),
+    ("points out of range", '[{"title": "A", "description": "a", "points": 500}, {"title": "B", "description": "b", "points": 0}]', 2),
+    ("points missing", '[{"title": "A", "description": "a"}, {"title": "B", "description": "b", "points": 30}]', 2),
+    ("wrong fixed fields", json.dumps([_task(1, bossType="dragon", isFinal=True, completed=True, deadline="tomorrow")]), 1),
+    ("name instead of title", json.dumps([{"name": "A", "details": "a", "points": 20}]), 1),
+    ("wrapped in object", json.dumps({"tasks": _THREE}), 3),
+    ("wrapped, fenced", "```json\n" + json.dumps({"mission": "Learn", "tasks": _THREE}, indent=2) + "\n```", 3),
+    ("truncated mid-object", _PRETTY[:_PRETTY.rfind('"points"')], 2),
+    ("truncated mid-string", _PRETTY[:_PRETTY.rfind("Do part 3") + 4], 2),
+    ("truncated, fenced", "```json\n" + _PRETTY[:-40], 2),
+    ("objects one per line", "\n".join(json.dumps(t) for t in _THREE), 3),
+    ("missing comma", '[{"title": "A", "description": "a", "points": 20} {"title": "B", "description": "b", "points": 30}]', 2),
+    ("one bad item", '[{"title": "A", "description": "a", "points": 20}, {"title": "", "points": 30}, "oops"]', 1),
+    ("refusal", "I'm sorry, but I can't help with planning that.", 0),
+    ("empty array", "[]", 0),
+]
+
+def legacy_parse(text: str) -> list:
+    """The parser _generate_plan used before ai_output: any exception was a failed request."""
+    try:
+        tasks = json.loads(text.strip().replace("```json", "").replace("```", "").strip())
+    except Exception:
+        return []
+    return tasks if isinstance(tasks, list) else []
+
+def legacy_usable(tasks: list) -> list:
+    """What the old path could save from a parsed list: the items that validate as TaskSuggestion."""
+    from pydantic import ValidationError
+    from schemas import TaskSuggestion
+
+    usable = []
+    for task in tasks:
+        try:
+            TaskSuggestion.model_validate(task)
+        except ValidationError:
+            continue
+        usable.append(task)
+    return usable
+
+def timed(fn, text: str, repeat: int) -> list[float]:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def retry_cost(success_rate: float, generation_seconds: float) -> str:
+    """Expected generations per plan if every failure is retried, and the time they take."""
+    if success_rate <= 0:
+        return "never succeeds"
+    generations = 1 / success_rate
+    return f"{generations:.2f} generations per plan, {generations * generation_seconds:.1f}s on average"
+
+def main(args) -> int:
+    import ai_output
+
+    expected_total = sum(expected for _, _, expected in CORPUS)
+    answerable = [case for case in CORPUS if case[2] > 0]
+    legacy_ok = tolerant_ok = legacy_tasks = tolerant_tasks = 0
+    outcomes: dict[str, int] = {}
+    legacy_times, tolerant_times = [], []
+
+    print(f"{'case':<26} {'expected':>8} {'legacy':>7} {'tolerant':>9}  outcome")
+    for case, text, expected in CORPUS:
+        old = legacy_usable(legacy_parse(text))
+        result = ai_output.parse_tasks(text)
+        outcomes[result.outcome] = outcomes.get(result.outcome, 0) + 1
+        if expected:
+            legacy_ok += bool(old)
+            tolerant_ok += bool(result.tasks)
+        legacy_tasks += min(len(old), expected)
+        tolerant_tasks += min(len(result.tasks), expected)
+        print(f"{case:<26} {expected:>8} {len(old):>7} {len(result.tasks):>9}  {result.outcome}")
+        if args.verbose and result.tasks:
+            for task in result.tasks:
+                print(f"{'':<28}{task['title']!r} {task['points']}")
+        legacy_times += timed(legacy_parse, text, args.repeat)
+        tolerant_times += timed(ai_output.parse_tasks, text, args.repeat)
+
+    print()
+    print(f"responses with a plan:  legacy {legacy_ok}/{len(answerable)}, tolerant {tolerant_ok}/{len(answerable)}")
+    print(f"tasks recovered:        legacy {legacy_tasks}/{expected_total}, tolerant {tolerant_tasks}/{expected_total}")
+    print(f"outcomes:               {', '.join(f'{k}: {v}' for k, v in sorted(outcomes.items()))}")
+    for label, latencies in (("legacy", legacy_times), ("tolerant", tolerant_times)):
+        q = statistics.quantiles(latencies, n=100, method="inclusive")
+        print(f"parse time {label:<9}    p50 {q[49] * 1e6:.1f}us, p99 {q[98] * 1e6:.1f}us")
+    # Only meaningful as a mix if the corpus' proportions were production's; see the docstring.
+    print(f"retrying failures at {args.generation_seconds:g}s per generation:")
+    print(f"  legacy    {retry_cost(legacy_ok / len(answerable), args.generation_seconds)}")
+    print(f"  tolerant  {retry_cost(tolerant_ok / len(answerable), args.generation_seconds)}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generation-seconds", type=float, default=6.0, help="time of one planner generation")
+    parser.add_argument("--repeat", type=int, default=200, help="timed parses per case")
+    parser.add_argument("--verbose", action="store_true", help="print the recovered tasks")
+    sys.exit(main(parser.parse_args()))
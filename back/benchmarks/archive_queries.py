@@ -0,0 +1,150 @@
+# /benchmarks/archive_queries.py
+"""
+Read latency before and after archiving finished missions (archive.py).
+
+Seeds a throwaway SQLite database with seed.py, then marks `--finished-share`
+of the missions as done 90 days ago (half of them soft-deleted, half with status
+"completed"). Calls a set of read routes in-process, runs the archival job,
+calls them again and prints p50/p95 of each, before and after, together with
+the row counts of the hot tables and the archive's size:
+
+    python benchmarks/archive_queries.py --users 50000
+    python benchmarks/archive_queries.py --users 200000 --finished-share 0.9
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACK_DIR)
+
+def finish_missions(share: float):
+    """Marks every mission whose rowid falls in the first `share` of each hundred as finished long ago."""
+    from sqlalchemy import text
+    from database import engine
+
+    cutoff = round(share * 100)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE mission SET \"updatedAt\" = datetime('now', '-90 days'), "
+            "\"isActive\" = CASE WHEN rowid % 2 = 0 THEN 0 ELSE 1 END, "
+            "status = CASE WHEN rowid % 2 = 0 THEN 'active' ELSE 'completed' END "
+            "WHERE rowid % 100 < :cutoff"
+        ), {"cutoff": cutoff})
+
+def table_sizes() -> str:
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.connect() as connection:
+        counts = {
+            table: connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in ("mission", "task", "missionparticipant", "missionarchive")
+        }
+        payload = connection.execute(text("SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM missionarchive")).scalar()
+    return ", ".join(f"{table}: {count:,}" for table, count in counts.items()) + f", archived payload: {payload / 1e6:.1f} MB"
+
+def sample_ids() -> dict:
+    """Ids the routes are called with: a mission that stays hot, one that gets archived, a busy user."""
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.connect() as connection:
+        hot = connection.execute(text("SELECT id FROM mission WHERE status = 'active' AND \"isActive\" ORDER BY rowid DESC LIMIT 1")).scalar()
+        cold = connection.execute(text("SELECT id FROM mission WHERE status = 'completed' ORDER BY rowid LIMIT 1")).scalar()
+        user = connection.execute(text(
+            "SELECT user_id FROM missionparticipant GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+    return {"hot": str(uuid.UUID(hot)), "cold": str(uuid.UUID(cold)), "user": str(uuid.UUID(user))}
+
+def routes(ids: dict) -> list[tuple[str, str]]:
+    return [
+        ("list missions (hot set)", "/missions/?limit=50"),
+        ("list missions, page 2", "/missions/?limit=200&fields=id"),
+        ("user's missions", f"/users/{ids['user']}/missions/?fields=id,name"),
+        ("search tasks, common word", "/search/tasks?q=review"),
+        ("search missions, common word", "/search/missions?q=review"),
+        ("get hot mission", f"/missions/{ids['hot']}"),
+        ("get finished mission", f"/missions/{ids['cold']}"),
+        ("finished mission tasks", f"/missions/{ids['cold']}/tasks/"),
+        ("finished mission leaderboard", f"/missions/{ids['cold']}/leaderboard"),
+    ]
+
+async def measure(paths: list[tuple[str, str]], repeat: int) -> dict:
+    import main
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        for label, path in paths:
+            # The second page needs the cursor of the first one.
+            if "page 2" in label:
+                first = await client.get(path)
+                path = f"{path}&cursor={first.json()['next_cursor']}"
+            latencies = []
+            for i in range(repeat + 3):
+                started = time.perf_counter()
+                response = await client.get(path)
+                elapsed = time.perf_counter() - started
+                if response.status_code != 200:
+                    raise SystemExit(f"{path}: {response.status_code} {response.text[:200]}")
+                if i >= 3:
+                    latencies.append(elapsed)
+            results[label] = statistics.quantiles(latencies, n=100, method="inclusive")
+    return results
+
+def main(args) -> int:
+    import seed
+    from archive import archive_missions
+    from database import async_engine, async_session_maker
+
+    seed.run_migrations()
+    started = time.perf_counter()
+    counts = seed.seed(args.users, missions_per_user=1, tasks_per_mission=args.tasks_per_mission)
+    print(f"seeded {', '.join(f'{t}: {c:,}' for t, c in counts.items())} in {time.perf_counter() - started:.1f}s")
+    finish_missions(args.finished_share)
+    ids = sample_ids()
+    paths = routes(ids)
+
+    print(f"before: {table_sizes()}")
+    before = asyncio.run(measure(paths, args.repeat))
+
+    async def archive_all():
+        async with async_session_maker() as session:
+            return await archive_missions(session, after_days=30, retention_days=0, batch_size=args.batch_size)
+
+    started = time.perf_counter()
+    archived, _ = asyncio.run(archive_all())
+    elapsed = time.perf_counter() - started
+    print(f"archived {archived:,} missions in {elapsed:.1f}s ({archived / elapsed:,.0f}/s, batches of {args.batch_size})")
+    print(f"after:  {table_sizes()}")
+    after = asyncio.run(measure(paths, args.repeat))
+    asyncio.run(async_engine.dispose())
+
+    print(f"{'route':<30} {'before p50':>10} {'p95':>8} | {'after p50':>10} {'p95':>8} (ms)")
+    for label, _ in paths:
+        b, a = before[label], after[label]
+        print(f"{label:<30} {b[49] * 1000:>10.2f} {b[94] * 1000:>8.2f} | {a[49] * 1000:>10.2f} {a[94] * 1000:>8.2f}")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50_000, help="seeded users; one mission per user")
+    parser.add_argument("--tasks-per-mission", type=int, default=5)
+    parser.add_argument("--finished-share", type=float, default=0.8)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_archive.db")
+    os.environ.setdefault("METRICS_ENABLED", "0")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ADMISSION_SLO_SECONDS", "0")
+    sys.exit(main(args))
@@ -0,0 +1,62 @@
+# /benchmarks/auth_overhead.py
+"""
+Measures the per-request cost of bearer-token authentication.
+
+Compares an unauthenticated endpoint with GET /users/me when every request misses
+the token cache (JWT decode + user lookup) and when it hits. Runs in-process against
+a throwaway SQLite database:
+
+    python benchmarks/auth_overhead.py --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_auth.db")
+os.environ.setdefault("ARGON2_MEMORY_COST", "8192")
+# One client hammering login would otherwise measure the rate limiter.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("ADMISSION_SLO_SECONDS", "0")
+
+import httpx
+
+import dependencies
+import main
+from database import create_db_and_tables
+
+async def timed(client: httpx.AsyncClient, n: int, path: str, headers=None, before_each=None) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        if before_each:
+            before_each()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / n * 1e6
+
+async def run(n: int):
+    create_db_and_tables()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users/", json={"email": "bench@example.com", "username": "bench", "name": "Bench", "password": "bench-pass"})
+        login = await client.post("/auth/login", data={"username": "bench", "password": "bench-pass"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        baseline = await timed(client, n, "/")
+        cold = await timed(client, n, "/users/me", headers, before_each=dependencies._token_cache.clear)
+        warm = await timed(client, n, "/users/me", headers)
+
+    print(f"{'scenario':<28}{'us/request':>12}{'overhead':>12}")
+    print(f"{'unauthenticated GET /':<28}{baseline:>12.1f}{'-':>12}")
+    print(f"{'/users/me, cache miss':<28}{cold:>12.1f}{cold - baseline:>12.1f}")
+    print(f"{'/users/me, cache hit':<28}{warm:>12.1f}{warm - baseline:>12.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
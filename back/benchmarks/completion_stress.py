@@ -0,0 +1,200 @@
+# /benchmarks/completion_stress.py
+"""
+Concurrency stress test for task completion: proves no lost or double-counted points.
+
+Starts uvicorn with several worker processes on a throwaway SQLite database (or
+targets --base-url with the --database-url it uses), creates a mission with
+`--tasks` tasks and `--users` participants, then fires every (task, user)
+completion `--duplicates` times in random order from `--concurrency` clients,
+mixing the single and batch endpoints. Failed requests are retried, which is
+safe because completions are idempotent.
+
+Afterwards it checks, straight from the database, that:
+  - every (task, user) pair was completed exactly once,
+  - each participant's total_points equals the sum of the points of their completions,
+  - exactly one response per pair reported `awarded: true`.
+Exits with status 1 if any check fails:
+
+    python benchmarks/completion_stress.py --users 50 --tasks 40 --duplicates 3 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import create_engine, text
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server(database_url: str, workers: int) -> tuple[subprocess.Popen, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=database_url, ARGON2_MEMORY_COST="8192", RATE_LIMIT_ENABLED="0", ADMISSION_SLO_SECONDS="0")
+    subprocess.run([sys.executable, "manage.py", "migrate"], cwd=BACK_DIR, env=env, check=True)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACK_DIR, env=env, start_new_session=True,
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+def stop_server(server: subprocess.Popen):
+    # The whole process group: worker processes and their hashing pools must not outlive the run.
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+async def setup(client: httpx.AsyncClient, users: int, tasks: int) -> tuple[str, list, list]:
+    for _ in range(100):
+        try:
+            if (await client.get("/healthz")).status_code == 200:
+                break
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    run = time.time_ns()
+    user_ids = []
+    for i in range(users):
+        response = await client.post("/users/", json={"email": f"stress{run}_{i}@example.com", "username": f"stress{run}_{i}", "name": "Stress", "password": "stress-pass"})
+        user_ids.append(response.json()["id"])
+    task_specs = [{"title": f"Task {i}", "points": random.randint(1, 100)} for i in range(tasks)]
+    mission = (await client.post("/missions/with-tasks", json={"mission": {"name": "Stress", "createdById": user_ids[0], "tasks": task_specs}})).json()
+    for user_id in user_ids:
+        (await client.post(f"/missions/{mission['id']}/participants", json={"user_id": user_id})).raise_for_status()
+    task_ids, cursor = [], None
+    while True:
+        page = (await client.get(f"/missions/{mission['id']}/tasks/", params={"limit": 200, **({"cursor": cursor} if cursor else {})})).json()
+        task_ids += [task["id"] for task in page["items"]]
+        if not (cursor := page["next_cursor"]):
+            break
+    return mission["id"], task_ids, user_ids
+
+async def hammer(client: httpx.AsyncClient, mission_id: str, pairs: list, args) -> tuple[Counter, int, int]:
+    """Sends every pair `duplicates` times; returns awarded counts per pair, retries and requests."""
+    jobs = []
+    for _ in range(args.duplicates):
+        shuffled = random.sample(pairs, len(pairs))
+        while shuffled:
+            if random.random() < args.batch_share:
+                jobs.append(shuffled[:args.batch_size])
+                shuffled = shuffled[args.batch_size:]
+            else:
+                jobs.append(shuffled[:1])
+                shuffled = shuffled[1:]
+    random.shuffle(jobs)
+
+    awarded, retries = Counter(), 0
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def send(job):
+        if len(job) == 1:
+            task_id, user_id = job[0]
+            response = await client.post(f"/missions/{mission_id}/tasks/{task_id}/complete", json={"user_id": user_id})
+            return response, [response.json()] if response.status_code == 200 else None
+        body = {"completions": [{"task_id": t, "user_id": u} for t, u in job]}
+        response = await client.post(f"/missions/{mission_id}/completions", json=body)
+        return response, response.json() if response.status_code == 200 else None
+
+    async def worker():
+        nonlocal retries
+        while not queue.empty():
+            job = queue.get_nowait()
+            for attempt in range(args.max_retries + 1):
+                try:
+                    response, results = await send(job)
+                except httpx.TransportError:
+                    results = None
+                if results is not None:
+                    for result in results:
+                        if result["awarded"]:
+                            awarded[(result["task_id"], result["user_id"])] += 1
+                    break
+                retries += 1
+                await asyncio.sleep(0.05 * (attempt + 1))
+            else:
+                raise SystemExit(f"request kept failing after {args.max_retries} retries")
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return awarded, retries, len(jobs)
+
+def verify(database_url: str, mission_id: str, pairs: list, awarded: Counter) -> list[str]:
+    engine = create_engine(database_url)
+    mission_hex = mission_id.replace("-", "")
+    with engine.connect() as connection:
+        # UUIDs are stored as 32-char hex on SQLite and as native uuid on PostgreSQL.
+        mission_param = mission_hex if engine.dialect.name == "sqlite" else mission_id
+        completions = connection.execute(text(
+            "SELECT c.user_id, COUNT(*), SUM(c.points) FROM taskcompletion c JOIN task t ON t.id = c.task_id "
+            "WHERE t.\"missionId\" = :mission GROUP BY c.user_id"
+        ), {"mission": mission_param}).all()
+        totals = dict(connection.execute(text(
+            "SELECT user_id, total_points FROM missionparticipant WHERE mission_id = :mission"
+        ), {"mission": mission_param}).all())
+    engine.dispose()
+
+    problems = []
+    users = {user_id for _, user_id in pairs}
+    tasks_per_user = len(pairs) // len(users)
+    counted = {str(user_id).replace("-", ""): (count, points) for user_id, count, points in completions}
+    for user_id, total in totals.items():
+        count, points = counted.get(str(user_id).replace("-", ""), (0, 0))
+        if count != tasks_per_user:
+            problems.append(f"user {user_id}: {count} completions, expected {tasks_per_user}")
+        if total != points:
+            problems.append(f"user {user_id}: total_points {total} != sum of completions {points} (lost or double update)")
+    if set(awarded) != set(pairs) or any(n != 1 for n in awarded.values()):
+        problems.append(f"{sum(n != 1 for n in awarded.values())} pairs awarded more than once, {len(set(pairs) - set(awarded))} never awarded")
+    return problems
+
+async def run(args, base_url: str) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        mission_id, task_ids, user_ids = await setup(client, args.users, args.tasks)
+        pairs = [(task_id, user_id) for task_id in task_ids for user_id in user_ids]
+        started = time.perf_counter()
+        awarded, retries, requests = await hammer(client, mission_id, pairs, args)
+        elapsed = time.perf_counter() - started
+
+    print(f"{len(pairs)} pairs x {args.duplicates} = {len(pairs) * args.duplicates} completions in {requests} requests "
+          f"({requests / elapsed:.0f} req/s, {retries} retried)")
+    problems = verify(args.database_url, mission_id, pairs, awarded)
+    for problem in problems[:20]:
+        print(f"FAIL {problem}")
+    print("OK: no lost or duplicated points" if not problems else f"{len(problems)} problems")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="use a running server (also pass its --database-url)")
+    parser.add_argument("--database-url", help="database the server uses; a temp SQLite file by default")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes when starting the server")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=40)
+    parser.add_argument("--duplicates", type=int, default=3, help="times each completion is sent")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-share", type=float, default=0.3, help="share of requests sent to the batch endpoint")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--max-retries", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.base_url and not args.database_url:
+        parser.error("--base-url needs --database-url to verify the results")
+    args.database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_stress.db"
+    server, base_url = (None, args.base_url) if args.base_url else start_server(args.database_url, args.workers)
+    try:
+        code = asyncio.run(run(args, base_url))
+    finally:
+        if server:
+            stop_server(server)
+    sys.exit(code)
@@ -0,0 +1,261 @@
+# /benchmarks/load_test.py
+"""
+Load test for the QuestTasks API, runnable fully offline on one machine.
+
+By default the app runs in-process on a throwaway SQLite database seeded by
+seed.py, with the fake Gemini client (AI_BACKEND=fake). Each scenario drives one
+route with `--concurrency` clients for `--requests` requests and reports p50/p95/p99
+latency, throughput, and SQL queries per request (read from the app's /metrics).
+Point `--base-url` at a running server (seeded with seed.py) to test it over HTTP.
+
+Results can be stored as a baseline, and later runs compared against it: a p95 or
+throughput regression beyond `--tolerance`, any increase in queries per request,
+or any failed request makes the run exit with status 1.
+
+    python benchmarks/load_test.py --scale small --concurrency 32 --save-baseline
+    python benchmarks/load_test.py --scale small --concurrency 32 --check-baseline
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACK_DIR, "benchmarks", "baseline.json")
+sys.path.insert(0, BACK_DIR)
+
+@dataclass
+class Context:
+    """Ids and credentials sampled from the seeded data, shared by all scenarios."""
+    rng: random.Random
+    user_ids: list
+    usernames: list
+    mission_ids: list
+    access_token: str = ""
+    refresh_token: str = ""
+    run_id: str = field(default_factory=lambda: str(time.time_ns()))
+
+    def user(self) -> str:
+        return self.rng.choice(self.user_ids)
+
+    def mission(self) -> str:
+        return self.rng.choice(self.mission_ids)
+
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # Route template as labelled in /metrics, used to read queries per request.
+    route: str
+    request: Callable[[Context, int], dict]
+    # Upper bound on requests, for scenarios dominated by deliberate CPU cost (Argon2).
+    max_requests: int | None = None
+
+def _new_mission(ctx: Context, i: int) -> dict:
+    tasks = [{"title": f"Step {j}", "points": 10 * (j + 1)} for j in range(5)]
+    return {"mission": {"name": f"Load mission {ctx.run_id}-{i}", "createdById": ctx.user(), "tasks": tasks}}
+
+# Palavras comuns e prefixos do vocabulário do seed.py.
+SEARCH_QUERIES = ["plan", "report", "sprint team", "dep", "weekly review", "cli"]
+
+SCENARIOS = [
+    Scenario("users_list", "GET", "/users/", lambda ctx, i: {"url": "/users/", "params": {"limit": 50}}),
+    Scenario("user_get", "GET", "/users/{user_id}", lambda ctx, i: {"url": f"/users/{ctx.user()}"}),
+    Scenario("user_me", "GET", "/users/me", lambda ctx, i: {"url": "/users/me", "headers": ctx.auth()}),
+    Scenario("user_missions", "GET", "/users/{user_id}/missions/", lambda ctx, i: {"url": f"/users/{ctx.user()}/missions/"}),
+    Scenario("user_missions_sparse", "GET", "/users/{user_id}/missions/", lambda ctx, i: {"url": f"/users/{ctx.user()}/missions/", "params": {"fields": "id,name"}}),
+    Scenario("missions_list", "GET", "/missions/", lambda ctx, i: {"url": "/missions/", "params": {"limit": 50}}),
+    Scenario("mission_get", "GET", "/missions/{mission_id}", lambda ctx, i: {"url": f"/missions/{ctx.mission()}"}),
+    Scenario("mission_tasks", "GET", "/missions/{mission_id}/tasks/", lambda ctx, i: {"url": f"/missions/{ctx.mission()}/tasks/"}),
+    Scenario("mission_leaderboard", "GET", "/missions/{mission_id}/leaderboard", lambda ctx, i: {"url": f"/missions/{ctx.mission()}/leaderboard"}),
+    Scenario("search_tasks", "GET", "/search/tasks", lambda ctx, i: {"url": "/search/tasks", "params": {"q": ctx.rng.choice(SEARCH_QUERIES)}}),
+    Scenario("search_missions", "GET", "/search/missions", lambda ctx, i: {"url": "/search/missions", "params": {"q": ctx.rng.choice(SEARCH_QUERIES)}}),
+    Scenario("mission_create", "POST", "/missions/with-tasks", lambda ctx, i: {"url": "/missions/with-tasks", "json": _new_mission(ctx, i)}),
+    Scenario("auth_login", "POST", "/auth/login", lambda ctx, i: {"url": "/auth/login", "data": {"username": ctx.rng.choice(ctx.usernames), "password": "bench-pass"}}, max_requests=200),
+    Scenario("auth_refresh", "POST", "/auth/refresh", lambda ctx, i: {"url": "/auth/refresh", "json": {"refresh_token": ctx.refresh_token}}),
+    Scenario("ai_plan", "POST", "/ai/plan-mission", lambda ctx, i: {"url": "/ai/plan-mission", "json": {"prompt": f"Plan a study quest #{ctx.run_id}-{i}"}}),
+    Scenario("ai_plan_cached", "POST", "/ai/plan-mission", lambda ctx, i: {"url": "/ai/plan-mission", "json": {"prompt": "Plan a study quest about photosynthesis"}}),
+    Scenario("ai_stream", "POST", "/ai/plan-mission/stream", lambda ctx, i: {"url": "/ai/plan-mission/stream", "json": {"prompt": f"Stream a study quest #{ctx.run_id}-{i}"}}),
+]
+
+# --- Measurement ---
+
+_DB_QUERIES = re.compile(r'^http_request_db_queries_(sum|count)\{method="([^"]+)",route="([^"]+)"\} (\S+)$', re.M)
+
+async def scrape_db_queries(client) -> dict:
+    """(method, route) -> [query sum, request count] from the app's /metrics."""
+    response = await client.get("/metrics")
+    totals = {}
+    if response.status_code == 200:
+        for kind, method, route, value in _DB_QUERIES.findall(response.text):
+            totals.setdefault((method, route), [0.0, 0.0])[kind == "count"] = float(value)
+    return totals
+
+async def run_scenario(client, scenario: Scenario, ctx: Context, requests: int, concurrency: int) -> dict:
+    n = min(requests, scenario.max_requests or requests)
+    latencies, errors = [], 0
+
+    async def fire(i: int):
+        nonlocal errors
+        started = time.perf_counter()
+        response = await client.request(scenario.method, **scenario.request(ctx, i))
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors += 1
+
+    async def worker(counter):
+        while (i := next(counter)) < n:
+            await fire(i)
+
+    # Warm-up (connections, caches, lazy imports) is excluded from the numbers.
+    for i in range(min(20, n)):
+        await client.request(scenario.method, **scenario.request(ctx, -1 - i))
+    before = await scrape_db_queries(client)
+    counter = itertools.count()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(counter) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await scrape_db_queries(client)
+
+    key = (scenario.method, scenario.route)
+    queries, counted = (a - b for a, b in zip(after.get(key, [0, 0]), before.get(key, [0, 0])))
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": round(n / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "queries_per_request": round(queries / counted, 2) if counted else None,
+    }
+
+async def build_context(client, rng: random.Random) -> Context:
+    users = (await client.get("/users/", params={"limit": 200})).json()["items"]
+    missions = (await client.get("/missions/", params={"limit": 200})).json()["items"]
+    if not users or not missions:
+        raise SystemExit("The target database has no users or missions; seed it with benchmarks/seed.py first.")
+    ctx = Context(rng, [u["id"] for u in users], [u["username"] for u in users], [m["id"] for m in missions])
+    login = await client.post("/auth/login", data={"username": ctx.usernames[0], "password": "bench-pass"})
+    login.raise_for_status()
+    ctx.access_token, ctx.refresh_token = login.json()["access_token"], login.json()["refresh_token"]
+    return ctx
+
+# --- Baselines ---
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for name, current in results.items():
+        if current["errors"]:
+            problems.append(f"{name}: {current['errors']} failed requests")
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {previous['p95_ms']}ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            problems.append(f"{name}: {current['rps']} req/s vs baseline {previous['rps']} req/s")
+        if (current["queries_per_request"] or 0) > (previous["queries_per_request"] or 0) + 0.01:
+            problems.append(f"{name}: {current['queries_per_request']} queries/request vs baseline {previous['queries_per_request']}")
+    return problems
+
+def print_results(results: dict):
+    print(f"{'scenario':<22}{'req':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/req':>7}")
+    for name, r in results.items():
+        queries = "-" if r["queries_per_request"] is None else f"{r['queries_per_request']:g}"
+        print(f"{name:<22}{r['requests']:>7}{r['errors']:>5}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{queries:>7}")
+
+# --- Entry point ---
+
+def configure_in_process(args):
+    """Environment for the in-process app; must run before any app module is imported."""
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_load.db")
+    os.environ["AI_BACKEND"] = "fake"
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    os.environ["FAKE_GEMINI_LATENCY_SECONDS"] = str(args.ai_latency)
+    # Every request comes from one client; the limiter and load shedding would dominate the results.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ADMISSION_SLO_SECONDS", "0")
+
+async def main(args) -> int:
+    import httpx
+
+    selected = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+    config = {"target": args.base_url or "in-process", "scale": args.scale, "concurrency": args.concurrency, "requests": args.requests, "ai_latency": args.ai_latency}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60)
+        shutdown = None
+    else:
+        configure_in_process(args)
+        import main as app_main
+        import seed
+        from security import shutdown_hash_pool
+
+        if not args.no_seed:
+            seed.run_migrations()
+            started = time.perf_counter()
+            counts = seed.seed(seed.SCALES[args.scale])
+            print(f"seeded {', '.join(f'{t}: {c:,}' for t, c in counts.items())} in {time.perf_counter() - started:.1f}s")
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://bench", timeout=60)
+        shutdown = shutdown_hash_pool
+
+    try:
+        async with client:
+            ctx = await build_context(client, random.Random(args.seed))
+            results = {}
+            for scenario in selected:
+                results[scenario.name] = await run_scenario(client, scenario, ctx, args.requests, args.concurrency)
+                print(f"  {scenario.name} done", file=sys.stderr)
+    finally:
+        if shutdown:
+            shutdown()
+
+    print(f"target={config['target']} scale={args.scale} concurrency={args.concurrency} python={platform.python_version()}")
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "platform": platform.platform(), "results": results}, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    if args.check_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"warning: baseline was recorded with {baseline.get('config')}")
+        problems = regressions(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="test a running server instead of the in-process app")
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small", help="dataset seeded for in-process runs")
+    parser.add_argument("--no-seed", action="store_true", help="use DATABASE_URL as is (already seeded)")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), help="comma-separated subset: " + ",".join(s.name for s in SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ai-latency", type=float, default=0.05, help="simulated Gemini latency in seconds (in-process)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95/throughput regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,77 @@
+# /benchmarks/metrics_overhead.py
+"""
+Measures the cost of request instrumentation (MetricsMiddleware + SQL timing hooks).
+
+Metrics are switched on at import time, so each measurement runs in a subprocess
+with METRICS_ENABLED set to 0 or 1. Runs alternate between the two to spread out
+machine noise, and the median per-request time of each side is compared:
+
+    python benchmarks/metrics_overhead.py --requests 3000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def measure(n: int) -> float:
+    """µs per GET /users/{id} (one indexed query) against the in-process app."""
+    sys.path.insert(0, BACK_DIR)
+    import httpx
+
+    import main
+    from database import create_db_and_tables
+
+    create_db_and_tables()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        user = await client.post("/users/", json={"email": "bench@example.com", "username": "bench", "name": "Bench", "password": "bench-pass"})
+        path = f"/users/{user.json()['id']}"
+        for _ in range(200):
+            await client.get(path)
+        started = time.perf_counter()
+        for _ in range(n):
+            response = await client.get(path)
+            response.raise_for_status()
+        return (time.perf_counter() - started) / n * 1e6
+
+def run_worker(enabled: bool, n: int) -> float:
+    env = dict(
+        os.environ,
+        METRICS_ENABLED="1" if enabled else "0",
+        DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench_metrics.db",
+        ARGON2_MEMORY_COST="8192",
+        RATE_LIMIT_ENABLED="0",
+        ADMISSION_SLO_SECONDS="0",
+    )
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", __file__, "--worker", "--requests", str(n)],
+        cwd=BACK_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(asyncio.run(measure(args.requests)))
+        sys.exit(0)
+
+    results = {False: [], True: []}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            results[enabled].append(run_worker(enabled, args.requests))
+    off, on = statistics.median(results[False]), statistics.median(results[True])
+    print(f"{'metrics':<10}{'us/request (median)':>22}")
+    print(f"{'disabled':<10}{off:>22.1f}")
+    print(f"{'enabled':<10}{on:>22.1f}")
+    print(f"overhead: {on - off:.1f} us/request ({(on - off) / off * 100:.2f}%)")
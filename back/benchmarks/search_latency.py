@@ -0,0 +1,86 @@
+# /benchmarks/search_latency.py
+"""
+Latency of full-text search over a large task table.
+
+Seeds a throwaway SQLite database with seed.py (5 tasks per mission, so the
+default 200k users give 1M tasks with Zipf-distributed words), then calls the
+search service in-process for several kinds of query, from rare words to the
+most common word in the corpus and short prefixes, and prints p50/p95/p99 plus
+the number of matching rows for each:
+
+    python benchmarks/search_latency.py --users 200000
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/search_latency.py --no-seed
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACK_DIR)
+
+def queries(rare_words: list[str], mission_id) -> list[tuple[str, str, dict]]:
+    return [
+        ("rare word", rare_words[0], {}),
+        ("rare word prefix", rare_words[1][:4], {}),
+        ("rare + common word", f"{rare_words[2]} plan", {}),
+        ("most common word", "review", {}),
+        ("most common, half typed", "revi", {}),
+        ("long word, half typed", "documen", {}),
+        ("two common words", "sprint team", {}),
+        ("2-letter prefix", "re", {}),
+        ("most common in one mission", "review", {"mission_id": mission_id}),
+    ]
+
+async def run(args) -> int:
+    from sqlalchemy import text
+    from database import async_engine, async_session_maker
+    from search import fts5_query, search_terms, search_tasks
+    from seed import COMMON_WORDS
+
+    async with async_session_maker() as session:
+        total = (await session.exec(text("SELECT COUNT(*) FROM task"))).one()[0]
+        rows = (await session.exec(text("SELECT description, \"missionId\" FROM task ORDER BY rowid LIMIT 20"))).all()
+        rare_words = [word for description, _ in rows for word in description.split() if word not in COMMON_WORDS]
+        mission_id = uuid.UUID(rows[0][1])
+        print(f"{total:,} tasks")
+        print(f"{'query':<30} {'q':<22} {'matches':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for label, q, filters in queries(rare_words, mission_id):
+            matches = (await session.exec(
+                text("SELECT COUNT(*) FROM task_fts WHERE task_fts MATCH :q").bindparams(q=fts5_query(search_terms(q)))
+            )).one()[0]
+            for _ in range(3):
+                await search_tasks(session, q, limit=args.limit, **filters)
+            latencies = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await search_tasks(session, q, limit=args.limit, **filters)
+                latencies.append(time.perf_counter() - started)
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            print(f"{label:<30} {q[:22]:<22} {matches:>9,} {cuts[49] * 1000:>8.2f} {cuts[94] * 1000:>8.2f} {cuts[98] * 1000:>8.2f}")
+    await async_engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200_000, help="seeded users; tasks = 5 x users")
+    parser.add_argument("--no-seed", action="store_true", help="use DATABASE_URL as is (already seeded)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_search.db")
+    os.environ.setdefault("METRICS_ENABLED", "0")
+    if not args.no_seed:
+        import seed
+        seed.run_migrations()
+        started = time.perf_counter()
+        counts = seed.seed(args.users, missions_per_user=1, tasks_per_mission=5)
+        print(f"seeded {', '.join(f'{t}: {c:,}' for t, c in counts.items())} in {time.perf_counter() - started:.1f}s")
+    sys.exit(asyncio.run(run(args)))
@@ -0,0 +1,146 @@
+# /benchmarks/seed.py
+"""
+Seeds a database with a synthetic, reproducible QuestTasks dataset.
+
+Rows are generated from the tables in models.py and written with chunked
+executemany inserts on the sync engine, so even the large scale fits in memory.
+Every seeded user shares one precomputed password hash (SEED_PASSWORD), which
+keeps seeding fast while still letting the load test log in as any of them.
+The database named by DATABASE_URL is migrated to head first:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/seed.py --scale medium
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import insert
+
+from database import engine, run_migrations
+from models import Mission, MissionParticipant, Task, User
+from security import get_password_hash
+
+SCALES = {"small": 10_000, "medium": 100_000, "large": 1_000_000}
+SEED_PASSWORD = "bench-pass"
+CHUNK_SIZE = 5000
+
+# Títulos e descrições com distribuição de Zipf: poucas palavras muito comuns e uma
+# cauda longa de palavras raras, como texto real, para a busca ter seletividade realista.
+COMMON_WORDS = (
+    "review plan write report meeting design test deploy update fix sprint team budget client "
+    "research draft weekly launch refactor migrate document prepare schedule call email training "
+    "backlog release data survey interview demo feedback roadmap audit invoice contract onboarding"
+).split()
+RARE_WORDS = 20_000
+
+def _vocabulary(rng: random.Random) -> tuple[list[str], list[float]]:
+    syllables = "ba be bi bo ka ke ki ko ra re ri ro ta te ti to la le li lo ma me mi mo na ne ni no sa se si so".split()
+    rare = ["".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(RARE_WORDS)]
+    words = COMMON_WORDS + rare
+    weights, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1 / rank
+        weights.append(total)
+    return words, weights
+
+def seed_username(i: int) -> str:
+    return f"bench_user_{i}"
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+def _chunked(rows, size: int):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+def seed(users: int, missions_per_user: float = 0.5, tasks_per_mission: int = 5, participants_per_mission: int = 3, random_seed: int = 42) -> dict:
+    """Inserts the dataset and returns the number of rows written per table."""
+    rng = random.Random(random_seed)
+    password = get_password_hash(SEED_PASSWORD)
+    # Timestamps go back one second per row so keyset pagination sees distinct values.
+    origin = datetime.now(timezone.utc)
+    user_ids = [_uuid(rng) for _ in range(users)]
+    mission_count = int(users * missions_per_user)
+    participants_per_mission = min(participants_per_mission, users)
+    words, cum_weights = _vocabulary(rng)
+
+    def phrase(k: int) -> str:
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=k))
+
+    def user_rows():
+        for i, user_id in enumerate(user_ids):
+            created = origin - timedelta(seconds=users - i)
+            yield {
+                "id": user_id, "name": f"Bench User {i}", "email": f"{seed_username(i)}@example.com",
+                "username": seed_username(i), "password": password, "avatar": None,
+                "createdAt": created, "updatedAt": created, "isActive": True,
+            }
+
+    mission_ids = []
+
+    def mission_rows():
+        for i in range(mission_count):
+            mission_id = _uuid(rng)
+            mission_ids.append(mission_id)
+            created = origin - timedelta(seconds=mission_count - i)
+            yield {
+                "id": mission_id, "name": f"Bench Mission {i}: {phrase(2)}", "description": phrase(12),
+                "status": "active", "createdById": user_ids[rng.randrange(users)],
+                "createdAt": created, "updatedAt": created, "isActive": True,
+            }
+
+    def task_rows():
+        for mission_id in mission_ids:
+            for j in range(tasks_per_mission):
+                created = origin - timedelta(seconds=tasks_per_mission - j)
+                yield {
+                    "id": _uuid(rng), "title": f"Step {j + 1}: {phrase(3)}", "description": phrase(10),
+                    "points": rng.randint(10, 100), "missionId": mission_id, "deadline": None,
+                    "completed": rng.random() < 0.3, "isFinal": j == tasks_per_mission - 1,
+                    "createdAt": created, "updatedAt": created, "bossType": "none", "bossName": None,
+                }
+
+    def participant_rows():
+        for mission_id in mission_ids:
+            for user_index in rng.sample(range(users), participants_per_mission):
+                yield {
+                    "mission_id": mission_id, "user_id": user_ids[user_index],
+                    "total_points": rng.randint(0, 500), "joined_at": origin,
+                }
+
+    counts = {}
+    for model, rows in ((User, user_rows()), (Mission, mission_rows()), (Task, task_rows()), (MissionParticipant, participant_rows())):
+        written = 0
+        with engine.begin() as connection:
+            for chunk in _chunked(rows, CHUNK_SIZE):
+                connection.execute(insert(model), chunk)
+                written += len(chunk)
+        counts[model.__tablename__] = written
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small", help="number of users: " + ", ".join(f"{k}={v:,}" for k, v in SCALES.items()))
+    parser.add_argument("--users", type=int, help="overrides --scale")
+    parser.add_argument("--missions-per-user", type=float, default=0.5)
+    parser.add_argument("--tasks-per-mission", type=int, default=5)
+    parser.add_argument("--participants-per-mission", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    run_migrations()
+    started = time.perf_counter()
+    counts = seed(
+        args.users or SCALES[args.scale], args.missions_per_user, args.tasks_per_mission,
+        args.participants_per_mission, args.seed,
+    )
+    print(", ".join(f"{table}: {count:,}" for table, count in counts.items()), f"in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,96 @@
+# /benchmarks/serialization_speed.py
+"""
+Serialization cost of large mission lists: before and after the fast path.
+
+Builds `--missions` Mission objects in memory, each with participants (and their
+users) and tasks, shaped like the `/users/{id}/missions/` response, and times
+turning them into JSON bytes four ways:
+
+  stdlib      jsonable_encoder + json.dumps (FastAPI's encoder without a response model)
+  pydantic    validate into List[MissionReadWithParticipants] from attributes, then
+              dump_json: what FastAPI does for a route with a response_model
+  project     serialization.project + orjson (the fast path)
+  project+f   the same with fields=id,name,createdById (no participants/tasks)
+
+Also checks that `project` produces exactly the JSON Pydantic produces:
+
+    python benchmarks/serialization_speed.py --missions 1000 --participants 3 --tasks 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from models import Mission, MissionParticipant, Task, User
+from schemas import MissionReadWithParticipants
+from serialization import ORJSONResponse, parse_fields, project
+
+def build(missions: int, participants: int, tasks: int) -> list[Mission]:
+    now = datetime.now(timezone.utc)
+    users = [
+        User(id=uuid.uuid4(), email=f"u{i}@example.com", username=f"u{i}", name=f"User {i}", password="x", createdAt=now, updatedAt=now)
+        for i in range(participants * 4)
+    ]
+    rows = []
+    for i in range(missions):
+        mission = Mission(id=uuid.uuid4(), name=f"Mission {i}", description="A mission", createdById=users[0].id, createdAt=now, updatedAt=now)
+        mission.participants = [
+            MissionParticipant(mission_id=mission.id, user_id=user.id, total_points=10 * j, user=user)
+            for j, user in enumerate(users[i % 4::4][:participants])
+        ]
+        mission.tasks = [
+            Task(id=uuid.uuid4(), title=f"Task {j}", description="Do it", points=10, missionId=mission.id, createdAt=now, updatedAt=now)
+            for j in range(tasks)
+        ]
+        rows.append(mission)
+    return rows
+
+def timed(function, repeat: int) -> list[float]:
+    function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--missions", type=int, default=1000)
+    parser.add_argument("--participants", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    missions = build(args.missions, args.participants, args.tasks)
+    adapter = TypeAdapter(List[MissionReadWithParticipants])
+    sparse = parse_fields("id,name,createdById", MissionReadWithParticipants)
+
+    ways = {
+        "stdlib": lambda: json.dumps(jsonable_encoder(adapter.validate_python(missions, from_attributes=True))).encode(),
+        "pydantic": lambda: adapter.dump_json(adapter.validate_python(missions, from_attributes=True)),
+        "project": lambda: ORJSONResponse([project(MissionReadWithParticipants, m) for m in missions]).body,
+        "project+f": lambda: ORJSONResponse([project(MissionReadWithParticipants, m, sparse) for m in missions]).body,
+    }
+    if orjson.loads(ways["project"]()) != json.loads(ways["pydantic"]()):
+        raise SystemExit("FAIL: project() output differs from the Pydantic response model")
+    print(f"{args.missions} missions x ({args.participants} participants, {args.tasks} tasks); output identical to Pydantic")
+    results = {name: timed(function, args.repeat) for name, function in ways.items()}
+    reference = statistics.median(results["pydantic"])
+    print(f"{'path':<10} {'median ms':>10} {'p95 ms':>8} {'KiB':>8} {'vs pydantic':>12}")
+    for name, samples in results.items():
+        median = statistics.median(samples)
+        p95 = statistics.quantiles(samples, n=20)[18] if len(samples) > 1 else median
+        print(f"{name:<10} {median * 1000:>10.2f} {p95 * 1000:>8.2f} {len(ways[name]()) / 1024:>8.0f} {reference / median:>11.1f}x")
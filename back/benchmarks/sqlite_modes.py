@@ -0,0 +1,104 @@
+# /benchmarks/sqlite_modes.py
+"""
+Compares SQLite journal/synchronous modes under a mixed read/write load.
+
+For each mode (`journal_mode/synchronous`, default: the old rollback journal
+`delete/full` and the current default `wal/normal`), starts uvicorn with several
+worker processes on a fresh database, creates a mission with tasks and
+participants, then runs `--concurrency` clients for `--duration` seconds. Each
+request is a read (mission, task list, leaderboard) with probability
+`--read-share`, otherwise a write (completing a task or adding one). Prints
+throughput, latency percentiles per kind, and failed requests (mostly
+"database is locked" surfacing as 500s):
+
+    python benchmarks/sqlite_modes.py --workers 4 --concurrency 64 --duration 20
+    python benchmarks/sqlite_modes.py --modes delete/full,wal/normal,wal/full
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+from completion_stress import setup, start_server, stop_server
+
+def percentiles(latencies: list[float]) -> str:
+    if len(latencies) < 2:
+        return f"{'-':>7} {'-':>7} {'-':>7}"
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return " ".join(f"{cuts[p] * 1000:>7.1f}" for p in (49, 94, 98))
+
+async def mixed_load(client: httpx.AsyncClient, mission_id: str, task_ids: list, user_ids: list, args) -> dict:
+    latencies = {"read": [], "write": []}
+    failures = {"read": 0, "write": 0}
+    reads = [
+        lambda: client.get(f"/missions/{mission_id}"),
+        lambda: client.get(f"/missions/{mission_id}/tasks/", params={"limit": 50}),
+        lambda: client.get(f"/missions/{mission_id}/leaderboard"),
+    ]
+    writes = [
+        lambda: client.post(f"/missions/{mission_id}/tasks/{random.choice(task_ids)}/complete", json={"user_id": random.choice(user_ids)}),
+        lambda: client.post(f"/missions/{mission_id}/tasks/", json={"title": "Load task", "points": 10}),
+    ]
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            kind = "read" if random.random() < args.read_share else "write"
+            started = time.perf_counter()
+            try:
+                response = await random.choice(reads if kind == "read" else writes)()
+                ok = response.status_code < 400
+            except httpx.TransportError:
+                ok = False
+            if ok:
+                latencies[kind].append(time.perf_counter() - started)
+            else:
+                failures[kind] += 1
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return {"latencies": latencies, "failures": failures}
+
+async def run_mode(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        mission_id, task_ids, user_ids = await setup(client, args.users, args.tasks)
+        return await mixed_load(client, mission_id, task_ids, user_ids, args)
+
+def main(args) -> int:
+    print(f"{args.workers} workers, {args.concurrency} clients, {args.duration:.0f}s per mode, {args.read_share:.0%} reads")
+    print(f"{'mode':<14} {'reads/s':>8} {'writes/s':>8} {'failed':>7} | {'read p50':>7} {'p95':>7} {'p99':>7} | {'write p50':>7} {'p95':>7} {'p99':>7}")
+    for mode in args.modes:
+        journal_mode, synchronous = mode.split("/")
+        os.environ.update(SQLITE_JOURNAL_MODE=journal_mode, SQLITE_SYNCHRONOUS=synchronous)
+        server, base_url = start_server(f"sqlite:///{tempfile.mkdtemp()}/bench_modes.db", args.workers)
+        try:
+            result = asyncio.run(run_mode(base_url, args))
+        finally:
+            stop_server(server)
+        latencies, failures = result["latencies"], result["failures"]
+        print(
+            f"{mode:<14} {len(latencies['read']) / args.duration:>8.0f} {len(latencies['write']) / args.duration:>8.0f} "
+            f"{failures['read'] + failures['write']:>7} | {percentiles(latencies['read'])} | {percentiles(latencies['write'])}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=["delete/full", "wal/normal"], help="comma-separated journal_mode/synchronous pairs")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per mode")
+    parser.add_argument("--read-share", type=float, default=0.8)
+    parser.add_argument("--users", type=int, default=20, help="mission participants")
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    sys.exit(main(args))
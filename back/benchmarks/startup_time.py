@@ -0,0 +1,70 @@
+# /benchmarks/startup_time.py
+"""
+Measures how long a fresh worker takes to import the app, broken down per module.
+
+Runs `python -X importtime -c "import main"` in clean subprocesses (so nothing is
+already cached in sys.modules) and reports the total wall time and the slowest
+modules by cumulative import time. `--compare` also times the imports that are now
+deferred until first use, to show what a cold start no longer pays:
+
+    python benchmarks/startup_time.py --runs 5 --top 20 --compare
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_IMPORTS = ["google.generativeai", "alembic.command"]
+
+def import_once(statement: str) -> tuple[float, dict[str, int]]:
+    """Wall seconds for `statement` in a new interpreter, and cumulative µs per module."""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench_startup.db")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACK_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - started
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return elapsed, modules
+
+def report(label: str, statement: str, runs: int, top: int):
+    walls = []
+    per_module = defaultdict(list)
+    for _ in range(runs):
+        wall, modules = import_once(statement)
+        walls.append(wall)
+        for name, cumulative in modules.items():
+            per_module[name].append(cumulative)
+
+    print(f"{label}: median {statistics.median(walls) * 1000:.0f} ms wall over {runs} runs (interpreter start included)")
+    if not top:
+        return
+    medians = sorted(((statistics.median(v), k) for k, v in per_module.items()), reverse=True)
+    print(f"  {'module':<48}{'cumulative ms':>14}")
+    for cumulative, name in medians[:top]:
+        print(f"  {name:<48}{cumulative / 1000:>14.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--compare", action="store_true", help="also time the imports deferred until first use")
+    args = parser.parse_args()
+
+    report("python -c pass", "pass", args.runs, 0)
+    report("import main", "import main", args.runs, args.top)
+    if args.compare:
+        for module in DEFERRED_IMPORTS:
+            report(f"import {module} (deferred)", f"import {module}", args.runs, 0)
@@ -0,0 +1,129 @@
+# /benchmarks/websocket_fanout.py
+"""
+Load test for mission events: N concurrent WebSocket subscribers on one mission.
+
+Starts a uvicorn server on a throwaway SQLite database (or uses --base-url),
+opens `--subscribers` WebSockets to /missions/{id}/events, then creates
+`--events` tasks through the API. Each task_created event must reach every
+subscriber. Reports the time to open the connections, the delivery latency
+from the POST to each receipt (p50/p95/p99), the time until the last subscriber
+has an event, and any missed messages or resyncs:
+
+    python benchmarks/websocket_fanout.py --subscribers 10000 --events 20
+
+Needs one file descriptor per subscriber in both processes (check `ulimit -n`).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+BACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server() -> tuple[subprocess.Popen, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench_events.db", ARGON2_MEMORY_COST="8192", RATE_LIMIT_ENABLED="0", ADMISSION_SLO_SECONDS="0")
+    subprocess.run([sys.executable, "manage.py", "migrate"], cwd=BACK_DIR, env=env, check=True)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--backlog", "4096"],
+        cwd=BACK_DIR, env=env,
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            if (await client.get("/healthz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise SystemExit("server did not start")
+
+async def run(args, base_url: str):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        await wait_until_up(client)
+        user = (await client.post("/users/", json={"email": f"fanout{time.time_ns()}@example.com", "username": f"fanout{time.time_ns()}", "name": "Fan", "password": "fanout-pass"})).json()
+        mission = (await client.post("/missions/with-tasks", json={"mission": {"name": "Fan-out", "createdById": user["id"], "tasks": []}})).json()
+        ws_url = base_url.replace("http", "ws", 1) + f"/missions/{mission['id']}/events"
+
+        started = time.perf_counter()
+        sockets = []
+        for batch in range(0, args.subscribers, args.connect_batch):
+            size = min(args.connect_batch, args.subscribers - batch)
+            sockets += await asyncio.gather(*(connect(ws_url, max_queue=None, ping_interval=None) for _ in range(size)))
+        connect_seconds = time.perf_counter() - started
+        print(f"{len(sockets)} subscribers connected in {connect_seconds:.1f}s")
+
+        sent_at: dict[str, float] = {}
+        latencies, last_receipt, resyncs = [], {}, 0
+
+        async def consume(ws):
+            nonlocal resyncs
+            received = 0
+            while received < args.events:
+                message = json.loads(await ws.recv())
+                now = time.perf_counter()
+                if message["type"] == "resync":
+                    resyncs += 1
+                    return
+                if message["type"] != "task_created":
+                    continue
+                title = message["data"]["title"]
+                latencies.append(now - sent_at[title])
+                last_receipt[title] = max(last_receipt.get(title, 0), now)
+                received += 1
+
+        consumers = [asyncio.ensure_future(consume(ws)) for ws in sockets]
+        for i in range(args.events):
+            title = f"event {i}"
+            sent_at[title] = time.perf_counter()
+            (await client.post(f"/missions/{mission['id']}/tasks/", json={"title": title, "points": 10})).raise_for_status()
+            await asyncio.sleep(args.interval)
+        done, pending = await asyncio.wait(consumers, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+    expected = args.subscribers * args.events
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    fanout = [last_receipt[t] - sent_at[t] for t in last_receipt]
+    print(f"delivered {len(latencies)}/{expected} messages, {resyncs} resyncs, {len(pending)} subscribers timed out")
+    print(f"delivery latency ms: p50 {cuts[49] * 1000:.1f}  p95 {cuts[94] * 1000:.1f}  p99 {cuts[98] * 1000:.1f}")
+    print(f"time to reach every subscriber ms: median {statistics.median(fanout) * 1000:.1f}  max {max(fanout) * 1000:.1f}")
+    print(f"throughput: {len(latencies) / sum(fanout) if fanout else 0:,.0f} deliveries/s while fanning out")
+    return 0 if len(latencies) == expected else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="use a running server instead of starting one")
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between published events")
+    parser.add_argument("--connect-batch", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = start_server()
+    try:
+        code = asyncio.run(run(args, base_url))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    sys.exit(code)
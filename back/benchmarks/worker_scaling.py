@@ -0,0 +1,170 @@
+# /benchmarks/worker_scaling.py
+"""
+Throughput of the production server (gunicorn.conf.py) as workers are added.
+
+For each worker count in `--workers` (default: 1, 2, 4... up to the CPU count)
+starts gunicorn on a throwaway SQLite database with a mission, its tasks and
+participants, then drives it for `--duration` seconds from `--clients` load
+generator processes with `--concurrency` connections each (a single asyncio
+client tops out well before several workers do). Requests are reads of the
+mission, its task list and its leaderboard. Prints requests/s, the speedup over
+one worker, latency percentiles, failures, and the memory of the workers: RSS
+counts pages shared with the master (preload_app) in every worker, PSS splits
+them between the processes sharing them, so the gap is what preloading saves.
+
+    python benchmarks/worker_scaling.py
+    python benchmarks/worker_scaling.py --workers 1,2,4,8 --clients 4 --duration 20
+
+Run it on the machine size you deploy to: the speedup is bounded by its cores,
+and the load generators run on them too.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from completion_stress import BACK_DIR, setup
+
+def start_gunicorn(database_url: str, workers: int) -> tuple[subprocess.Popen, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(
+        os.environ, DATABASE_URL=database_url, ARGON2_MEMORY_COST="8192", RATE_LIMIT_ENABLED="0",
+        ADMISSION_SLO_SECONDS="0", WEB_BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(workers),
+        # Throughput only: the in-memory backends are fine for a run with no events or boards to share.
+        WEB_REQUIRE_SHARED_BACKENDS="0",
+        WEB_PIDFILE=f"{tempfile.mkdtemp()}/gunicorn.pid",
+    )
+    subprocess.run([sys.executable, "manage.py", "migrate"], cwd=BACK_DIR, env=env, check=True)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "--log-level", "warning"],
+        cwd=BACK_DIR, env=env, start_new_session=True,
+    )
+    return server, f"http://127.0.0.1:{port}"
+
+def stop_gunicorn(server: subprocess.Popen):
+    # The whole process group: workers and their hashing pools must not outlive the run.
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+def worker_memory(master_pid: int) -> tuple[float, float]:
+    """Summed RSS and PSS of the master's children, in MB (Linux only; zeros elsewhere)."""
+    rss = pss = 0
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            children = [int(pid) for pid in f.read().split()]
+        for pid in children:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    name, value = line.split(":", 1)
+                    if name == "Rss":
+                        rss += int(value.split()[0])
+                    elif name == "Pss":
+                        pss += int(value.split()[0])
+    except OSError:
+        return 0.0, 0.0
+    return rss / 1024, pss / 1024
+
+async def _load(base_url: str, paths: list[str], concurrency: int, duration: float) -> tuple[list[float], int]:
+    latencies, failures = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal failures
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = (await client.get(random.choice(paths))).status_code == 200
+                except httpx.TransportError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    failures += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures
+
+def _load_process(base_url: str, paths: list[str], concurrency: int, duration: float, results):
+    results.put(asyncio.run(_load(base_url, paths, concurrency, duration)))
+
+async def _prepare(base_url: str, args) -> list[str]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        mission_id, _, _ = await setup(client, args.users, args.tasks)
+    return [f"/missions/{mission_id}", f"/missions/{mission_id}/tasks/?limit=50", f"/missions/{mission_id}/leaderboard"]
+
+def run(workers: int, args) -> dict:
+    server, base_url = start_gunicorn(f"sqlite:///{tempfile.mkdtemp()}/bench_scaling.db", workers)
+    try:
+        paths = asyncio.run(_prepare(base_url, args))
+        # Warm-up, so every worker has its connections and caches before the timed run.
+        asyncio.run(_load(base_url, paths, args.concurrency, 2))
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=_load_process, args=(base_url, paths, args.concurrency, args.duration, results))
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        outcomes = [results.get() for _ in clients]
+        for client in clients:
+            client.join()
+        rss, pss = worker_memory(server.pid)
+    finally:
+        stop_gunicorn(server)
+    latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+    return {
+        "requests_per_second": len(latencies) / args.duration,
+        "latencies": statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [0.0] * 99,
+        "failures": sum(failures for _, failures in outcomes),
+        "rss": rss,
+        "pss": pss,
+    }
+
+def main(args) -> int:
+    print(f"{os.cpu_count()} CPUs, {args.clients} load processes x {args.concurrency} connections, {args.duration:g}s per run")
+    print(f"{'workers':>7} {'req/s':>8} {'speedup':>7} | {'p50':>7} {'p95':>7} {'p99':>7} (ms) | {'failed':>6} | {'RSS MB':>7} {'PSS MB':>7}")
+    baseline = None
+    for workers in args.workers:
+        result = run(workers, args)
+        baseline = baseline or result["requests_per_second"]
+        q = result["latencies"]
+        print(
+            f"{workers:>7} {result['requests_per_second']:>8.0f} {result['requests_per_second'] / baseline:>6.2f}x | "
+            f"{q[49] * 1000:>7.1f} {q[94] * 1000:>7.1f} {q[98] * 1000:>7.1f}      | {result['failures']:>6} | "
+            f"{result['rss']:>7.0f} {result['pss']:>7.0f}"
+        )
+    return 0
+
+def _default_workers() -> list[int]:
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=_default_workers(), help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per load generator")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load per worker count")
+    parser.add_argument("--users", type=int, default=20, help="mission participants")
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    sys.exit(main(args))
@@ -0,0 +1,115 @@
+# /cache.py
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Protocol
+
+class TTLCache:
+    """A bounded mapping whose entries expire after `ttl` seconds, evicting least recently used first."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class CacheBackend(Protocol):
+    """Async key/value store for JSON-serializable values, shared or per process."""
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any, ttl: float) -> None: ...
+
+class InMemoryCacheBackend:
+    """Per-process backend; each worker keeps its own LRU."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    async def get(self, key: str) -> Any | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+class RedisCacheBackend:
+    """Backend shared by every worker through Redis. Requires the optional `redis` package."""
+
+    def __init__(self, url: str, prefix: str = "questtasks:"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(self._prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+def create_cache_backend(url: str | None, max_entries: int, ttl: float) -> CacheBackend:
+    """Returns a Redis backend for `redis://` URLs and an in-process one otherwise."""
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisCacheBackend(url)
+    return InMemoryCacheBackend(max_entries=max_entries, ttl=ttl)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight coroutine.
+
+    The shared call runs as its own task, so a caller that disconnects does not
+    cancel the work the remaining callers are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def _done(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task)
@@ -0,0 +1,136 @@
+# /check_query_plans.py
+"""
+Fails if any read endpoint runs a query that scans a whole table.
+
+Migrates a throwaway SQLite database to head, seeds a little data, calls every
+read route through the app while recording the SQL it executes, and runs
+EXPLAIN QUERY PLAN on each SELECT. A plan step like `SCAN task` (a scan that is
+not driven by an index) is reported and the script exits with status 1, so it
+can run in CI:
+
+    python check_query_plans.py
+
+tests/test_query_plans.py runs the same routes against the test database.
+"""
+
+import asyncio
+import contextlib
+import os
+import re
+import sys
+import tempfile
+
+import uuid
+
+if __name__ == "__main__":
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/query_plans.db"
+    os.environ.setdefault("ARGON2_MEMORY_COST", "8192")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("ADMISSION_SLO_SECONDS", "0")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from database import all_async_engines, engine, run_migrations
+from query_counter import count_queries
+
+# A virtual table reports its own index (FTS5 MATCH) as "VIRTUAL TABLE INDEX n:...".
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?!.*(USING (COVERING |INTEGER PRIMARY KEY|INDEX)|VIRTUAL TABLE INDEX))")
+
+async def exercise_routes(client: httpx.AsyncClient) -> dict[str, tuple[list, list]]:
+    """Seeds data through the API and returns the SQL run by each read route."""
+    users, suffix = [], uuid.uuid4().hex[:8]
+    for i in range(3):
+        username = f"plan{i}{suffix}"
+        response = await client.post("/users/", json={"email": f"{username}@example.com", "username": username, "name": "Plan", "password": "plan-pass"})
+        users.append(response.json()["id"])
+    tasks = [{"title": f"Task {i}", "points": 10} for i in range(3)]
+    missions = []
+    for i in range(3):
+        response = await client.post("/missions/with-tasks", json={"mission": {"name": f"Mission {i}", "createdById": users[0], "tasks": tasks}})
+        missions.append(response.json()["id"])
+        for user_id in users[1:]:
+            await client.post(f"/missions/{missions[-1]}/participants", json={"user_id": user_id})
+    login = await client.post("/auth/login", data={"username": f"plan0{suffix}", "password": "plan-pass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    mission_id, user_id = missions[0], users[1]
+    cursor = (await client.get("/missions/", params={"limit": 1})).json()["next_cursor"]
+    task_cursor = (await client.get(f"/missions/{mission_id}/tasks/", params={"limit": 1})).json()["next_cursor"]
+    user_cursor = (await client.get("/users/", params={"limit": 1})).json()["next_cursor"]
+
+    routes = {
+        "list missions": ("/missions/", {"limit": 1, "cursor": cursor}),
+        "list missions by creator": ("/missions/", {"createdById": users[0], "status": "active"}),
+        "list archived missions": ("/missions/", {"archived": "true", "createdById": users[0]}),
+        "get mission": (f"/missions/{mission_id}", None),
+        "list tasks": (f"/missions/{mission_id}/tasks/", {"limit": 1, "cursor": task_cursor}),
+        "mission leaderboard": (f"/missions/{mission_id}/leaderboard", None),
+        "mission rank": (f"/missions/{mission_id}/leaderboard/{user_id}", None),
+        "global leaderboard": ("/leaderboard/global", None),
+        "global rank": (f"/leaderboard/global/{user_id}", None),
+        "list users": ("/users/", {"limit": 1, "cursor": user_cursor}),
+        "get user": (f"/users/{user_id}", None),
+        "current user": ("/users/me", None),
+        "user missions": (f"/users/{user_id}/missions/", None),
+        "search missions": ("/search/missions", {"q": "miss"}),
+        "search missions by creator": ("/search/missions", {"q": "miss", "createdById": users[0]}),
+        "search archived missions": ("/search/missions", {"q": "miss", "archived": "true"}),
+        "search tasks": ("/search/tasks", {"q": "task"}),
+        "search tasks in mission": ("/search/tasks", {"q": "task", "missionId": mission_id}),
+    }
+    captured = {}
+    for name, (path, params) in routes.items():
+        # Reads may run on the primary (auth) and on the read engine (see read_routing.py).
+        with contextlib.ExitStack() as stack:
+            counters = [stack.enter_context(count_queries(async_engine)) for async_engine in all_async_engines()]
+            response = await client.get(path, params=params, headers=headers)
+        response.raise_for_status()
+        captured[name] = (
+            [statement for counter in counters for statement in counter.statements],
+            [parameters for counter in counters for parameters in counter.parameters],
+        )
+    return captured
+
+def query_plan(statement: str, parameters) -> list[str]:
+    """The steps of EXPLAIN QUERY PLAN, e.g. `SEARCH task USING INDEX ix_task_missionId (missionId=?)`."""
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in plan]
+
+def full_scans(steps: list[str]) -> list[str]:
+    return [step for step in steps if FULL_SCAN.match(step)]
+
+def route_plans(captured: dict[str, tuple[list, list]]) -> dict[str, list[tuple[str, list[str]]]]:
+    """The (statement, plan steps) of every SELECT each route ran."""
+    return {
+        route: [
+            (statement, query_plan(statement, params))
+            for statement, params in zip(statements, parameters)
+            if statement.lstrip().upper().startswith("SELECT")
+        ]
+        for route, (statements, parameters) in captured.items()
+    }
+
+async def main_async() -> int:
+    import main
+
+    run_migrations()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://plans") as client:
+        captured = await exercise_routes(client)
+
+    failures = 0
+    for route, plans in route_plans(captured).items():
+        route_failures = 0
+        for statement, steps in plans:
+            scans = full_scans(steps)
+            if scans:
+                route_failures += 1
+                print(f"FAIL {route}: {', '.join(scans)}\n     {' '.join(statement.split())}")
+        if not route_failures:
+            print(f"ok   {route} ({len(captured[route][0])} queries)")
+        failures += route_failures
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main_async()))
@@ -1,14 +1,126 @@
 # /config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./questtasks.db")
+    # Optional explicit async URL; derived from DATABASE_URL (aiosqlite / asyncpg) when unset.
+    ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    # Read replicas (comma-separated URLs) for GET routes. After a write, the same client
+    # keeps reading from the primary for READ_YOUR_WRITES_SECONDS to hide replication lag.
+    DATABASE_REPLICA_URLS: list[str] = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+    # SQLite (local / single node): WAL lets readers run alongside the writer.
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "normal")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_CACHE_SIZE_KIB: int = int(os.getenv("SQLITE_CACHE_SIZE_KIB", 65536))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))
+    # Arquivamento (python manage.py archive): missões excluídas ou com status finalizado,
+    # sem alterações há ARCHIVE_AFTER_DAYS dias, saem das tabelas quentes. Arquivos com mais
+    # de ARCHIVE_RETENTION_DAYS dias são apagados (0 = manter para sempre).
+    ARCHIVE_AFTER_DAYS: float = float(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+    ARCHIVE_STATUSES: list[str] = [s.strip() for s in os.getenv("ARCHIVE_STATUSES", "completed,abandoned").split(",") if s.strip()]
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", 200))
+    ARCHIVE_RETENTION_DAYS: float = float(os.getenv("ARCHIVE_RETENTION_DAYS", 0))
     GOOGLE_API_KEY: str | None = os.getenv("GOOGLE_API_KEY")
+    # "gemini" for the real API, "fake" for the offline client in fake_gemini.py.
+    AI_BACKEND: str = os.getenv("AI_BACKEND", "gemini")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    FAKE_GEMINI_LATENCY_SECONDS: float = float(os.getenv("FAKE_GEMINI_LATENCY_SECONDS", 0))
+    FAKE_GEMINI_FAILURE_RATE: float = float(os.getenv("FAKE_GEMINI_FAILURE_RATE", 0))
+    # Constrains generation to ai_output.RESPONSE_SCHEMA (JSON mode). Turn off for models
+    # that reject `response_schema`; the tolerant parser handles free-form output either way.
+    AI_RESPONSE_SCHEMA: bool = os.getenv("AI_RESPONSE_SCHEMA", "true").lower() in ("1", "true", "yes")
+    # Upstream protection: per-call deadline, in-flight cap and circuit breaker.
+    AI_TIMEOUT_SECONDS: float = float(os.getenv("AI_TIMEOUT_SECONDS", 30))
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", 16))
+    AI_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", 5))
+    AI_BREAKER_RESET_SECONDS: float = float(os.getenv("AI_BREAKER_RESET_SECONDS", 30))
+    # Planner response cache; set AI_CACHE_URL to a redis:// URL to share it across workers.
+    AI_CACHE_URL: str | None = os.getenv("AI_CACHE_URL")
+    AI_CACHE_TTL_SECONDS: int = int(os.getenv("AI_CACHE_TTL_SECONDS", 3600))
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", 1024))
+    # Background planning jobs (POST /ai/jobs): workers per process, retries of 503/504
+    # with exponential backoff, and active jobs allowed per user. AI_JOBS_URL set to a
+    # redis:// URL wakes idle workers of every process when a job is queued.
+    AI_JOBS_URL: str | None = os.getenv("AI_JOBS_URL")
+    AI_JOB_WORKERS: int = int(os.getenv("AI_JOB_WORKERS", 4))
+    AI_JOB_MAX_ATTEMPTS: int = int(os.getenv("AI_JOB_MAX_ATTEMPTS", 3))
+    AI_JOB_BACKOFF_SECONDS: float = float(os.getenv("AI_JOB_BACKOFF_SECONDS", 1))
+    AI_JOBS_PER_USER: int = int(os.getenv("AI_JOBS_PER_USER", 3))
+    AI_JOB_POLL_SECONDS: float = float(os.getenv("AI_JOB_POLL_SECONDS", 1))
+    AI_JOB_LEASE_SECONDS: float = float(os.getenv("AI_JOB_LEASE_SECONDS", 120))
+    # Ranked leaderboards; set LEADERBOARD_URL to a redis:// URL to share them across workers.
+    LEADERBOARD_URL: str | None = os.getenv("LEADERBOARD_URL")
+    LEADERBOARD_REFRESH_SECONDS: float = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", 60))
+    # In-memory backend only: least recently used mission boards beyond this are dropped.
+    LEADERBOARD_MAX_BOARDS: int = int(os.getenv("LEADERBOARD_MAX_BOARDS", 10000))
+    # Real-time mission events; set EVENTS_URL to a redis:// URL to fan out across workers.
+    EVENTS_URL: str | None = os.getenv("EVENTS_URL")
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", 100))
+    EVENTS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("EVENTS_SEND_TIMEOUT_SECONDS", 5))
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 20))
+    # Per-client token buckets (see rate_limit.py): RATE_LIMIT_BURST tokens, refilled at
+    # RATE_LIMIT_PER_MINUTE; expensive routes cost more than one. Set RATE_LIMIT_URL to a
+    # redis:// URL to share the buckets across workers.
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    RATE_LIMIT_URL: str | None = os.getenv("RATE_LIMIT_URL")
+    # A new client's first session (sign up, log in, plan a mission: 40 tokens) must fit with
+    # room left for the page loads and a retry around it.
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", 100))
+    RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", 120))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+    # Proxies in front of the API that append to X-Forwarded-For; the client is the address
+    # the outermost one saw. 0 ignores the header: otherwise clients could pick their own key.
+    RATE_LIMIT_TRUSTED_PROXIES: int = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", 0))
+    # Admission control: while the p95 latency of this worker's regular requests is over
+    # ADMISSION_SLO_SECONDS, low-priority requests and then reads are turned away (0 disables).
+    ADMISSION_SLO_SECONDS: float = float(os.getenv("ADMISSION_SLO_SECONDS", 1.0))
+    ADMISSION_WINDOW_SECONDS: float = float(os.getenv("ADMISSION_WINDOW_SECONDS", 2.0))
+    # Servidor de produção (gunicorn.conf.py): WEB_CONCURRENCY processos, cada um com seu
+    # próprio pool de conexões (DB_POOL_SIZE + DB_MAX_OVERFLOW). Mais de um exige EVENTS_URL,
+    # LEADERBOARD_URL e RATE_LIMIT_URL apontando para o Redis, pois os backends em memória são
+    # de um processo só: sem WEB_CONCURRENCY, um por CPU com eles e um só sem eles.
+    # WEB_REQUIRE_SHARED_BACKENDS=false dispensa a exigência (benchmarks).
+    WEB_BIND: str = os.getenv("WEB_BIND", "0.0.0.0:8000")
+    WEB_SHARED_BACKENDS: bool = all((url or "").startswith(("redis://", "rediss://")) for url in (EVENTS_URL, LEADERBOARD_URL, RATE_LIMIT_URL))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY") or ((os.cpu_count() or 1) if WEB_SHARED_BACKENDS else 1))
+    WEB_REQUIRE_SHARED_BACKENDS: bool = os.getenv("WEB_REQUIRE_SHARED_BACKENDS", "true").lower() in ("1", "true", "yes")
+    WEB_TIMEOUT: int = int(os.getenv("WEB_TIMEOUT", 60))
+    WEB_GRACEFUL_TIMEOUT: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+    WEB_KEEPALIVE: int = int(os.getenv("WEB_KEEPALIVE", 5))
+    # Recycle a worker after this many requests (plus jitter) to bound slow leaks; 0 disables.
+    WEB_MAX_REQUESTS: int = int(os.getenv("WEB_MAX_REQUESTS", 0))
+    WEB_PIDFILE: str = os.getenv("WEB_PIDFILE", "/tmp/questtasks-gunicorn.pid")
+    # Per-worker health (worker_health.py): each worker writes its status file under this
+    # directory every WORKER_HEARTBEAT_SECONDS (empty disables).
+    WORKER_STATUS_DIR: str = os.getenv("WORKER_STATUS_DIR", os.path.join(tempfile.gettempdir(), "questtasks-workers"))
+    WORKER_HEARTBEAT_SECONDS: float = float(os.getenv("WORKER_HEARTBEAT_SECONDS", 5))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "a_very_secret_default_key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+    # Verified access tokens are cached so authenticated requests skip JWT decoding and the user lookup.
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", 60))
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+    # Argon2 cost parameters (memory in KiB) and the worker pool that runs them.
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", 2))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", 102400))
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", 8))
+    # Each web worker runs its own pool: the CPUs are split between them, up to four each.
+    HASH_POOL_WORKERS: int = int(os.getenv("HASH_POOL_WORKERS", max(1, min(4, (os.cpu_count() or 1) // max(1, WEB_CONCURRENCY)))))
+    HASH_QUEUE_LIMIT: int = int(os.getenv("HASH_QUEUE_LIMIT", 64))
+    HASH_RETRY_AFTER_SECONDS: int = int(os.getenv("HASH_RETRY_AFTER_SECONDS", 1))
+    # Request/DB instrumentation exposed on /metrics; requests slower than SLOW_REQUEST_SECONDS are logged (0 disables).
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    SLOW_REQUEST_SECONDS: float = float(os.getenv("SLOW_REQUEST_SECONDS", 0))
 
 settings = Settings()
\ No newline at end of file
@@ -1,12 +1,148 @@
 # /database.py
-from sqlmodel import create_engine, Session, SQLModel
+import os
+from functools import lru_cache
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from config import settings
 
-engine = create_engine(settings.DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+# Drivers used for the async engine when only a sync DATABASE_URL is configured.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def _async_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+# Shows up in pg_stat_activity, so connections can be told apart from other clients.
+APPLICATION_NAME = "questtasks-api"
+
+def _is_in_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _engine_options(url) -> dict:
+    """Keyword arguments for create_engine/create_async_engine that suit the URL's backend."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        # In-memory databases live inside a single connection, so they must not be pooled.
+        if _is_in_memory(url):
+            return options
+    else:
+        # asyncpg takes server settings apart; psycopg2 passes libpq parameters through.
+        if url.get_driver_name() == "asyncpg":
+            connect_args = {"server_settings": {"application_name": APPLICATION_NAME}}
+        else:
+            connect_args = {"application_name": APPLICATION_NAME}
+        options = {"pool_pre_ping": True, "connect_args": connect_args}
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+def sqlite_pragmas(url) -> list[str]:
+    """PRAGMAs run on every new SQLite connection (see SQLITE_* in config.py)."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        # Negative cache_size is in KiB instead of pages.
+        f"PRAGMA cache_size = -{settings.SQLITE_CACHE_SIZE_KIB}",
+        f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    # WAL needs a file (the -wal and -shm files live next to it).
+    if not _is_in_memory(make_url(url)):
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+def _configure_sqlite(engine, url):
+    """Runs `sqlite_pragmas` on each new connection of a SQLite engine."""
+    if make_url(url).get_backend_name() != "sqlite":
+        return
+    pragmas = sqlite_pragmas(url)
+
+    @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def _create_async_engine(url):
+    async_engine = create_async_engine(url, echo=False, **_engine_options(url))
+    _configure_sqlite(async_engine, url)
+    return async_engine
+
+# The sync engine is kept for schema management and scripts; requests use the async one.
+engine = create_engine(settings.DATABASE_URL, echo=False, **_engine_options(settings.DATABASE_URL))
+_configure_sqlite(engine, settings.DATABASE_URL)
+
+async_database_url = settings.ASYNC_DATABASE_URL or _async_url(settings.DATABASE_URL)
+async_engine = _create_async_engine(async_database_url)
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Read replicas for GET routes; see read_routing.py.
+replica_engines = [_create_async_engine(_async_url(url)) for url in settings.DATABASE_REPLICA_URLS]
+replica_session_makers = [
+    async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False) for replica in replica_engines
+]
+
+def all_async_engines() -> list:
+    """Every async engine the app holds (primary first), for instrumentation and shutdown."""
+    return [async_engine, *replica_engines]
+
+def dispose_after_fork():
+    """
+    Gives a forked worker pools of its own (gunicorn's post_fork hook).
+
+    With the app preloaded, the engines are created in the master before forking, and
+    any connection already in their pools would be shared by every worker: two processes
+    talking over one socket corrupt each other's results. `close=False` drops the
+    inherited pools without closing those connections, which still belong to the master.
+    """
+    engine.dispose(close=False)
+    for async_engine in all_async_engines():
+        async_engine.sync_engine.dispose(close=False)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
 
 def create_db_and_tables():
+    """Creates the current schema directly, without migration history. For throwaway databases."""
     SQLModel.metadata.create_all(engine)
 
-def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+def run_migrations(revision: str = "head"):
+    """Upgrades the database to `revision` with the versioned migrations in migrations/."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, revision)
+
+@lru_cache(maxsize=1)
+def migration_heads() -> frozenset[str]:
+    """Revisions at the tip of migrations/, i.e. what a fully migrated database reports."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return frozenset(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+
+async def current_revisions() -> frozenset[str]:
+    """Revisions recorded in the database's alembic_version table."""
+    async with async_engine.connect() as connection:
+        result = await connection.execute(text("SELECT version_num FROM alembic_version"))
+        return frozenset(result.scalars().all())
+
+async def get_session():
+    async with async_session_maker() as session:
+        yield session
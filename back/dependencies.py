@@ -0,0 +1,133 @@
+# /dependencies.py
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import events
+from cache import TTLCache
+from config import settings
+from database import get_session
+from models import User
+from schemas import UserRead
+from security import decode_token
+
+logger = logging.getLogger(__name__)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+@dataclass(frozen=True)
+class _CachedPrincipal:
+    user: UserRead
+    generation: int
+
+# token -> verified user claims. Entries never outlive the token's own expiry.
+_token_cache = TTLCache(max_entries=settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+# user -> (when, generation) of the user's last change, oldest first; cached principals
+# from another generation are ignored. Generations come from one counter and are never
+# reused, so an entry can be dropped once every principal cached before it has expired.
+_user_generations: OrderedDict[uuid.UUID, tuple[float, int]] = OrderedDict()
+_generation_counter = itertools.count(1)
+
+# Carries the ids of changed users to the other workers through the events broker.
+INVALIDATION_CHANNEL = "users:invalidated"
+_CHANGED_USERS = "changed_users"
+_publishing: set[asyncio.Task] = set()
+
+def _generation(user_id: uuid.UUID) -> int:
+    entry = _user_generations.get(user_id)
+    return 0 if entry is None else entry[1]
+
+def invalidate_user(user_id: uuid.UUID):
+    """Forces every cached token of `user_id` to be re-verified against the database."""
+    now = time.monotonic()
+    _user_generations.pop(user_id, None)
+    _user_generations[user_id] = (now, next(_generation_counter))
+    # Principals live at most TOKEN_CACHE_TTL_SECONDS: older changes guard nothing still cached.
+    while _user_generations:
+        oldest, (changed_at, _) = next(iter(_user_generations.items()))
+        if now - changed_at <= settings.TOKEN_CACHE_TTL_SECONDS:
+            break
+        del _user_generations[oldest]
+
+def _on_invalidation(message: str):
+    for user_id in json.loads(message):
+        invalidate_user(uuid.UUID(user_id))
+
+events.hub.on(INVALIDATION_CHANNEL, _on_invalidation)
+
+async def publish_invalidation(user_ids: set[uuid.UUID]):
+    """Invalidates `user_ids` in every worker. Best-effort, like the mission events."""
+    try:
+        await events.broker.publish(INVALIDATION_CHANNEL, json.dumps([str(user_id) for user_id in user_ids]))
+    except Exception:
+        logger.exception("Could not publish user invalidation")
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_changed_user(mapper, connection, target):
+    # Flushed, not committed yet: the transaction may still roll back.
+    object_session(target).info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    user_ids = session.info.pop(_CHANGED_USERS, None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    try:
+        task = asyncio.get_running_loop().create_task(publish_invalidation(user_ids))
+    except RuntimeError:
+        # Committed outside the event loop (scripts): no other worker to tell.
+        return
+    _publishing.add(task)
+    task.add_done_callback(_publishing.discard)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop(_CHANGED_USERS, None)
+
+async def load_active_user(session: AsyncSession, username: str) -> User:
+    user = (await session.exec(select(User).where(User.username == username))).first()
+    if not user or not user.isActive:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)
+) -> UserRead:
+    """
+    Resolves the bearer token to the authenticated user.
+
+    A hit in the token cache costs a dictionary lookup; a miss verifies the JWT and
+    loads the user once, then caches the result until the token (or the cache TTL)
+    expires or the user is invalidated.
+    """
+    cached = _token_cache.get(token)
+    if cached is not None and cached.generation == _generation(cached.user.id):
+        return cached.user
+
+    payload = decode_token(token, expected_type="access")
+    user = await load_active_user(session, payload["sub"])
+    principal = _CachedPrincipal(user=UserRead.model_validate(user), generation=_generation(user.id))
+    ttl = min(settings.TOKEN_CACHE_TTL_SECONDS, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(token, principal, ttl)
+    return principal.user
@@ -0,0 +1,214 @@
+# /events.py
+"""
+Per-mission pub/sub for real-time updates.
+
+Writers call `publish_mission_event` after their transaction commits. The broker
+carries each message to every worker; each worker's `Hub` then fans it out to its
+local subscribers. Messages are encoded once by the publisher and the same string
+is handed to every subscriber, so fan-out cost does not include serialization.
+
+Each subscriber has a bounded queue. A consumer that falls behind has its backlog
+dropped and receives a single `{"type": "resync"}` message, telling the client to
+re-fetch the mission (a cheap conditional GET), instead of letting memory grow.
+
+The same broker carries messages other modules handle in every worker through
+`hub.on` (dependencies.py: users whose cached tokens must be dropped).
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Callable, Protocol
+
+from config import settings
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+event_subscribers = Gauge("mission_event_subscribers", "Open mission event subscriptions.")
+events_published_total = Counter("mission_events_published_total", "Mission events published.", ("type",))
+event_resyncs_total = Counter("mission_event_resyncs_total", "Subscribers that fell behind and were told to resync.")
+
+RESYNC_MESSAGE = json.dumps({"type": "resync"})
+
+# Event types
+TASK_CREATED = "task_created"
+TASK_COMPLETED = "task_completed"
+PARTICIPANT_JOINED = "participant_joined"
+RANK_CHANGED = "rank_changed"
+
+def mission_channel(mission_id: uuid.UUID) -> str:
+    return f"mission:{mission_id}"
+
+class Subscription:
+    """One client's bounded queue of encoded messages."""
+
+    def __init__(self, channel: str, max_queue: int):
+        self.channel = channel
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, message: str):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC_MESSAGE)
+            event_resyncs_total.inc()
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+class Hub:
+    """Subscribers of this process, by channel."""
+
+    def __init__(self):
+        self._channels: dict[str, set[Subscription]] = {}
+        self._handlers: dict[str, list[Callable[[str], None]]] = {}
+
+    def on(self, channel: str, handler: Callable[[str], None]):
+        """Calls `handler(message)` for every message on `channel`."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def add(self, subscription: Subscription):
+        self._channels.setdefault(subscription.channel, set()).add(subscription)
+        event_subscribers.inc()
+
+    def remove(self, subscription: Subscription):
+        subscribers = self._channels.get(subscription.channel)
+        if subscribers is not None and subscription in subscribers:
+            subscribers.discard(subscription)
+            event_subscribers.dec()
+            if not subscribers:
+                del self._channels[subscription.channel]
+
+    def dispatch(self, channel: str, message: str):
+        for handler in self._handlers.get(channel, ()):
+            # A failing handler must not keep the message from the others, nor stop the broker.
+            try:
+                handler(message)
+            except Exception:
+                logger.exception("Event handler for %s failed", channel)
+        for subscription in list(self._channels.get(channel, ())):
+            subscription.deliver(message)
+
+    def resync_all(self):
+        """Tells every subscriber of this process that it may have missed messages."""
+        for subscribers in list(self._channels.values()):
+            for subscription in list(subscribers):
+                subscription.deliver(RESYNC_MESSAGE)
+
+class Broker(Protocol):
+    """Carries published messages to the hub of every worker."""
+
+    async def start(self) -> None: ...
+
+    async def publish(self, channel: str, message: str) -> None: ...
+
+    async def close(self) -> None: ...
+
+class InMemoryBroker:
+    """Single-process broker: publishing dispatches straight to the local hub."""
+
+    def __init__(self, hub: Hub):
+        self._hub = hub
+
+    async def start(self) -> None:
+        pass
+
+    async def publish(self, channel: str, message: str) -> None:
+        self._hub.dispatch(channel, message)
+
+    async def close(self) -> None:
+        pass
+
+class RedisBroker:
+    """
+    Fans out across workers with Redis pub/sub. Requires the optional `redis` package.
+
+    The listener reconnects with backoff when the subscription fails; messages sent
+    while it was down are lost, so local subscribers are then told to resync.
+    """
+
+    RETRY_SECONDS, MAX_RETRY_SECONDS = 0.5, 30
+
+    def __init__(self, url: str, hub: Hub, prefix: str = "questtasks:events:"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._hub = hub
+        self._prefix = prefix
+        self._listener: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        # One pattern subscription per worker, opened when the worker first needs it.
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        delay, reconnecting = self.RETRY_SECONDS, False
+        while True:
+            try:
+                pubsub = self._client.pubsub()
+                try:
+                    await pubsub.psubscribe(self._prefix + "*")
+                    if reconnecting:
+                        self._hub.resync_all()
+                    delay, reconnecting = self.RETRY_SECONDS, True
+                    async for item in pubsub.listen():
+                        if item["type"] == "pmessage":
+                            channel = item["channel"].decode()[len(self._prefix):]
+                            self._hub.dispatch(channel, item["data"].decode())
+                finally:
+                    await pubsub.aclose()
+                logger.warning("Events subscription ended; resubscribing")
+            except Exception:
+                logger.exception("Events subscription failed; retrying in %.1fs", delay)
+                reconnecting = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RETRY_SECONDS)
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self._client.publish(self._prefix + channel, message)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._client.aclose()
+
+def create_broker(url: str | None, hub: Hub) -> Broker:
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url, hub)
+    return InMemoryBroker(hub)
+
+hub = Hub()
+broker = create_broker(settings.EVENTS_URL, hub)
+
+@asynccontextmanager
+async def subscribe(mission_id: uuid.UUID):
+    """Registers a subscriber to a mission's events for the duration of the block."""
+    await broker.start()
+    subscription = Subscription(mission_channel(mission_id), settings.EVENTS_QUEUE_SIZE)
+    hub.add(subscription)
+    try:
+        yield subscription
+    finally:
+        hub.remove(subscription)
+
+async def publish_mission_event(mission_id: uuid.UUID, event_type: str, version: int | None, data: dict):
+    """
+    Publishes a delta for a mission. Call after the change has committed.
+
+    Delivery is best-effort: a broker failure is logged and never fails the write
+    that produced the event; clients recover through the next resync or refetch.
+    """
+    message = json.dumps(
+        {"type": event_type, "mission_id": str(mission_id), "version": version, "data": data}, default=str
+    )
+    events_published_total.labels(event_type).inc()
+    try:
+        await broker.publish(mission_channel(mission_id), message)
+    except Exception:
+        logger.exception("Could not publish mission event")
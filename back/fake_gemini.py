@@ -0,0 +1,98 @@
+# /fake_gemini.py
+"""
+Offline stand-in for `google.generativeai.GenerativeModel`.
+
+Selected with AI_BACKEND=fake so tests and benchmarks can exercise the planner
+without network access or API spend. Responses are deterministic for a prompt;
+`latency` and `failure_rate` inject slowness and upstream faults.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+FAKE_TASK_COUNT = 5
+FAKE_STREAM_CHUNK_CHARS = 48
+
+class FakeUsage:
+    # Rough token estimate (~4 characters per token), enough to exercise usage accounting.
+    def __init__(self, prompt: str, text: str):
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+class FakeResponse:
+    def __init__(self, text: str, usage_metadata: FakeUsage | None = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+class FakeUpstreamError(RuntimeError):
+    pass
+
+class FakeGenerativeModel:
+    def __init__(self, model_name: str, latency: float = 0.0, failure_rate: float = 0.0):
+        self.model_name = model_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise FakeUpstreamError("Injected upstream fault.")
+
+    def _tasks_for(self, prompt: str) -> list:
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        return [
+            {
+                "title": f"Quest step {i + 1}",
+                "description": f"Step {i + 1} of the generated plan.",
+                "points": 10 + (seed >> (i * 4)) % 91,
+                "deadline": None,
+                "completed": False,
+                "isFinal": False,
+                "bossType": "none",
+                "bossName": None,
+            }
+            for i in range(FAKE_TASK_COUNT)
+        ]
+
+    def _text_for(self, contents, generation_config: dict | None = None) -> str:
+        tasks = self._tasks_for(str(contents))
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            # JSON mode: bare JSON with only the fields of the response schema.
+            return json.dumps([{k: t[k] for k in ("title", "description", "points")} for t in tasks])
+        # Wrapped in fences like the real model often does despite the instructions.
+        return "```json\n" + json.dumps(tasks, indent=2) + "\n```"
+
+    def generate_content(self, contents, generation_config: dict | None = None, **kwargs) -> FakeResponse:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._maybe_fail()
+        return self._response_for(contents, generation_config)
+
+    def _response_for(self, contents, generation_config: dict | None = None) -> FakeResponse:
+        text = self._text_for(contents, generation_config)
+        return FakeResponse(text, FakeUsage(str(contents), text))
+
+    async def _stream(self, contents, generation_config: dict | None = None):
+        text = self._text_for(contents, generation_config)
+        chunks = [text[i:i + FAKE_STREAM_CHUNK_CHARS] for i in range(0, len(text), FAKE_STREAM_CHUNK_CHARS)]
+        for i, chunk in enumerate(chunks):
+            # `latency` is the time for the whole response, spread across the chunks.
+            if self.latency:
+                await asyncio.sleep(self.latency / len(chunks))
+            usage = FakeUsage(str(contents), text[:(i + 1) * FAKE_STREAM_CHUNK_CHARS])
+            yield FakeResponse(chunk, usage)
+
+    async def generate_content_async(self, contents, stream: bool = False, generation_config: dict | None = None, **kwargs):
+        self.calls += 1
+        if stream:
+            self._maybe_fail()
+            return self._stream(contents, generation_config)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return self._response_for(contents, generation_config)
@@ -0,0 +1,100 @@
+# /gunicorn.conf.py
+"""
+Production server: gunicorn supervising WEB_CONCURRENCY uvicorn workers (one per
+CPU once the shared backends are set, one otherwise).
+
+    gunicorn main:app                 # this file is picked up from the working directory
+    python manage.py reload           # new code, no dropped requests (see below)
+
+The app is imported once in the master and the workers are forked from it
+(preload_app), so the code and everything built at import time is shared
+copy-on-write instead of loaded again in each worker, and an import error stops
+the server before any worker starts. After the fork each worker drops the
+database pools it inherited (`database.dispose_after_fork`).
+
+With the app preloaded, HUP restarts the workers from the master's copy of the
+code: it does not pick up a deploy. `manage.py reload` sends USR2, which starts
+a new master with the new code on the same listening socket; once its workers
+report healthy, the old master gets TERM and its workers finish their in-flight
+requests (up to WEB_GRACEFUL_TIMEOUT) before exiting.
+
+/metrics aggregates the workers (metrics.py): unless PROMETHEUS_MULTIPROC_DIR is
+set, each server gets a fresh directory for the workers' metric files, removed
+when it exits.
+
+Several workers only agree with each other through the shared backends: events
+(and token invalidation), leaderboards and rate-limit buckets kept in memory
+belong to one process. Unless WEB_CONCURRENCY says otherwise, the server runs
+one worker per CPU when SHARED_BACKENDS point at Redis, and a single one, with a
+warning, when they do not. Asking for more than one worker without them stops
+the server from starting (WEB_REQUIRE_SHARED_BACKENDS=false skips the check, for
+benchmarks). The AI cache and job wakeups work either way, only less shared.
+
+Settings come from config.py (WEB_*); HASH_POOL_WORKERS already accounts for
+WEB_CONCURRENCY there.
+"""
+
+import os
+import shutil
+import tempfile
+
+from config import settings
+
+SHARED_BACKENDS = ("EVENTS_URL", "LEADERBOARD_URL", "RATE_LIMIT_URL")
+
+bind = settings.WEB_BIND
+workers = settings.WEB_CONCURRENCY
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+max_requests = settings.WEB_MAX_REQUESTS
+# So the workers started together are not all recycled at the same moment.
+max_requests_jitter = settings.WEB_MAX_REQUESTS // 10
+pidfile = settings.WEB_PIDFILE
+accesslog = None
+errorlog = "-"
+
+# Before the app, and with it prometheus_client, is loaded. A reload's new master
+# starts from the original environment, so it gets its own directory.
+metrics_directory = None
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    metrics_directory = tempfile.mkdtemp(prefix="questtasks-metrics-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_directory
+
+if workers > 1 and settings.WEB_REQUIRE_SHARED_BACKENDS:
+    local = [name for name in SHARED_BACKENDS if not (getattr(settings, name) or "").startswith(("redis://", "rediss://"))]
+    if local:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={workers} needs shared backends: set {', '.join(local)} to redis:// URLs, "
+            "or run a single worker."
+        )
+
+def post_fork(server, worker):
+    from database import dispose_after_fork
+
+    dispose_after_fork()
+
+def when_ready(server):
+    server.log.info("Serving on %s with %d workers (pid %d)", bind, workers, os.getpid())
+    if not settings.WEB_SHARED_BACKENDS and not os.environ.get("WEB_CONCURRENCY"):
+        server.log.warning(
+            "Running a single worker: set %s to redis:// URLs to run one per CPU", ", ".join(SHARED_BACKENDS)
+        )
+
+def child_exit(server, worker):
+    # Its live gauges (in-flight requests, subscribers...) stop counting; counters stay.
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server):
+    # The workers remove their own status files; the server's directory is left.
+    from worker_health import server_directory
+
+    directory = server_directory(os.getpid())
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+    if metrics_directory:
+        shutil.rmtree(metrics_directory, ignore_errors=True)
@@ -0,0 +1,49 @@
+# /http_cache.py
+"""
+Conditional GET support: weak ETags, If-None-Match and per-route Cache-Control.
+
+Handlers compute an ETag from a cheap version lookup (a mission's `version`
+counter, a row's `updatedAt`, or for a leaderboard the ranking it serves) and
+call `not_modified` before loading anything else, so a matching poll is answered
+with 304 and no relationship loading or serialization.
+"""
+
+import hashlib
+
+from fastapi import Request, Response, status
+
+# Cache-Control por rota. "no-cache" makes browsers revalidate every time (cheap 304s);
+# the leaderboard tolerates a few seconds of staleness, so polls inside that window
+# don't reach the server at all.
+CACHE_CONTROL = {
+    "mission": "private, no-cache",
+    "mission_tasks": "private, no-cache",
+    "mission_leaderboard": "private, max-age=5, must-revalidate",
+    "user": "private, no-cache",
+}
+
+def weak_etag(*parts) -> str:
+    """A weak validator for the representation identified by `parts`."""
+    digest = hashlib.blake2b(":".join(str(p) for p in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" and "x" are the same validator.
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def _validator_headers(etag: str, policy: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL[policy]}
+
+def not_modified(request: Request, etag: str, policy: str) -> Response | None:
+    """A 304 response if the client already holds `etag`, otherwise None."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(etag, policy))
+    return None
+
+def set_validators(response: Response, etag: str, policy: str):
+    """Adds the ETag and Cache-Control headers to a full (200) response."""
+    response.headers.update(_validator_headers(etag, policy))
@@ -0,0 +1,124 @@
+# /instrumentation.py
+"""
+Request-level performance instrumentation.
+
+`MetricsMiddleware` times every HTTP request by route template and
+`instrument_engine` times every SQL statement. Statements run while a request is
+being served are also added to that request's totals through a context variable,
+which gives per-endpoint query counts and database time.
+"""
+
+import contextvars
+import logging
+import time
+
+from sqlalchemy import event
+
+from metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger("questtasks.requests")
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+http_requests_total = Counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+http_request_duration_seconds = Histogram("http_request_duration_seconds", "Time to serve an HTTP request, body included.", ("method", "route"))
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+http_request_db_queries = Histogram("http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+http_request_db_seconds = Histogram("http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route"))
+db_query_duration_seconds = Histogram("db_query_duration_seconds", "Time to execute a single SQL statement.")
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+# Set by the middleware for the duration of a request. The async engine runs the
+# driver in a greenlet that shares the request task's context, so the engine hooks see it.
+_request_stats: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+# Full path templates by route object. Routes of an included router may only know their
+# path relative to the include prefix, so the app registers each prefix here.
+_route_templates: dict[int, str] = {}
+
+def register_route_templates(router, prefix: str = ""):
+    for route in router.routes:
+        _route_templates[id(route)] = prefix + route.path
+
+def _route_template(route) -> str:
+    if route is None:
+        return "unmatched"
+    return _route_templates.get(id(route)) or getattr(route, "path", None) or "unmatched"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    db_query_duration_seconds.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+def instrument_engine(engine):
+    """Times every statement executed through `engine` (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database usage for each HTTP request.
+
+    Written as a plain ASGI middleware (not BaseHTTPMiddleware) so it adds no extra
+    task per request and streaming responses pass through untouched; their duration
+    covers the whole body. Routes are labelled by template (`/missions/{mission_id}`),
+    and unmatched paths are grouped together to keep the number of series bounded.
+    Requests slower than `slow_request_seconds` are logged when it is set.
+    """
+
+    def __init__(self, app, slow_request_seconds: float = 0.0):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_stats.reset(token)
+            route = _route_template(scope.get("route"))
+            method = scope["method"]
+            http_requests_total.labels(method, route, status_code).inc()
+            http_request_duration_seconds.labels(method, route).observe(duration)
+            http_request_db_queries.labels(method, route).observe(stats.queries)
+            http_request_db_seconds.labels(method, route).observe(stats.query_seconds)
+            if self.slow_request_seconds and duration >= self.slow_request_seconds:
+                logger.warning(
+                    "Slow request: %s %s -> %s in %.3fs (%d queries, %.3fs in the database)",
+                    method, scope["path"], status_code, duration, stats.queries, stats.query_seconds,
+                )
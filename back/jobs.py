@@ -0,0 +1,388 @@
+# /jobs.py
+"""
+Background AI planning jobs.
+
+POST /ai/jobs stores a PlanJob and answers at once with its id. Workers running
+inside each API process pick the job up, call `services.plan_mission_with_ai`
+(so the response cache, single-flight, concurrency cap and circuit breaker all
+still apply) and store the tasks on the row, where the client polls for them or
+turns them into a mission. A client that disconnects no longer wastes the call.
+
+The planjob table is the queue and holds all of its state:
+- A worker claims a job with a conditional UPDATE (`... AND status = 'queued'`),
+  so no two workers, in the same process or not, run the same job.
+- Among the oldest ready jobs, the claim prefers the users with the fewest jobs
+  already running, so one user's burst does not take every worker.
+- A running job holds a lease (locked_until); the job of a worker that died goes
+  back to the queue once the lease expires.
+- 503/504 from the planner are retried up to AI_JOB_MAX_ATTEMPTS times after an
+  exponential backoff with jitter, never sooner than the upstream's Retry-After.
+
+A JobQueue only wakes idle workers when a job is queued. Workers also poll every
+AI_JOB_POLL_SECONDS, which is what picks up retries whose backoff has ended.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, literal
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import and_, func, or_, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from database import async_session_maker
+from metrics import Counter, Histogram
+from models import PlanJob, User
+import services
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE = (QUEUED, RUNNING)
+RETRYABLE_STATUS_CODES = (503, 504)
+# Oldest ready jobs considered by each claim for the fair-share pick.
+CLAIM_WINDOW = 20
+POLL_AFTER_SECONDS = max(1, math.ceil(settings.AI_JOB_POLL_SECONDS))
+
+ai_jobs_total = Counter("ai_jobs_total", "AI planning jobs by outcome.", ("outcome",))
+ai_job_wait_seconds = Histogram("ai_job_wait_seconds", "Time a ready job waited before a worker claimed it.")
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; they were stored in UTC.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def retry_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Seconds before retrying after failed attempt number `attempt` (1-based)."""
+    ceiling = settings.AI_JOB_BACKOFF_SECONDS * 2 ** (attempt - 1)
+    # Jitter spreads out jobs that failed together (e.g. when the breaker opened).
+    delay = random.uniform(ceiling / 2, ceiling)
+    if retry_after:
+        delay = max(delay, float(retry_after))
+    return delay
+
+def poll_after(job: PlanJob) -> int:
+    """Retry-After hint, in seconds, for a client polling a job that is not done."""
+    if job.status == QUEUED:
+        return max(POLL_AFTER_SECONDS, math.ceil((_as_utc(job.available_at) - _now()).total_seconds()))
+    return POLL_AFTER_SECONDS
+
+# --- Wakeups ---
+
+class JobQueue(Protocol):
+    """Wakes idle workers when a job is queued. The jobs themselves live in the planjob table."""
+
+    async def notify(self) -> None: ...
+
+    async def wait(self, timeout: float) -> None: ...
+
+    async def close(self) -> None: ...
+
+class LocalJobQueue:
+    """Wakes the workers of this process; the others find the job on their next poll."""
+
+    def __init__(self):
+        # Created on first use: the module is imported before any event loop runs, and
+        # an Event stays bound to the loop it was first awaited in.
+        self._event: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _current_event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new loop (a restarted app, another test client): the old one's waiters are gone.
+            self._event, self._loop = asyncio.Event(), loop
+        return self._event
+
+    async def notify(self) -> None:
+        self._current_event().set()
+
+    async def wait(self, timeout: float) -> None:
+        event = self._current_event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        event.clear()
+
+    async def close(self) -> None:
+        pass
+
+class RedisJobQueue:
+    """Wakes one idle worker of any process through a Redis list. Requires the optional `redis` package."""
+
+    def __init__(self, url: str, key: str = "questtasks:ai-jobs:wakeups", max_pending: int = 1000):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._key = key
+        self._max_pending = max_pending
+
+    async def notify(self) -> None:
+        # Wakeups nobody consumed only cost an empty claim later; the list stays bounded.
+        async with self._client.pipeline(transaction=False) as pipe:
+            await pipe.lpush(self._key, 1).ltrim(self._key, 0, self._max_pending - 1).execute()
+
+    async def wait(self, timeout: float) -> None:
+        await self._client.brpop([self._key], timeout=timeout)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+def create_job_queue(url: str | None) -> JobQueue:
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisJobQueue(url)
+    return LocalJobQueue()
+
+queue = create_job_queue(settings.AI_JOBS_URL)
+
+async def _wake():
+    try:
+        await queue.notify()
+    except Exception:
+        # The job is stored either way; workers will find it when they poll.
+        logger.exception("Could not wake AI job workers")
+
+# --- Submission ---
+
+async def _reusable_job(session: AsyncSession, user_id: uuid.UUID, key: str, now: datetime) -> PlanJob | None:
+    """The job still active, or succeeded within AI_CACHE_TTL_SECONDS, for this user and prompt."""
+    return (await session.exec(
+        select(PlanJob)
+        .where(
+            PlanJob.user_id == user_id,
+            PlanJob.prompt_key == key,
+            or_(
+                PlanJob.status.in_(ACTIVE),
+                and_(PlanJob.status == SUCCEEDED, PlanJob.finishedAt >= now - timedelta(seconds=settings.AI_CACHE_TTL_SECONDS)),
+            ),
+        )
+        .order_by(PlanJob.createdAt.desc())
+        .limit(1)
+    )).first()
+
+async def submit(session: AsyncSession, user_id: uuid.UUID, prompt: str) -> PlanJob:
+    """
+    Queues a planning job for `user_id`.
+
+    The same prompt (as normalized by `services.ai_cache_key`) from the same user
+    returns the job that is still active or succeeded within AI_CACHE_TTL_SECONDS
+    instead of queueing another. Identical prompts from different users get their
+    own jobs, but share one upstream call through the planner cache and single-flight.
+
+    Both checks hold under concurrent submits. The user's row is locked first
+    (FOR UPDATE; a no-op on SQLite, where writes are serialized anyway), the job
+    is inserted only if the user's active count is still under AI_JOBS_PER_USER,
+    in that same statement, and a unique index allows one active job per prompt:
+    the loser of a race gets the winner's job.
+    """
+    key = services.ai_cache_key(prompt)
+    now = _now()
+    await session.exec(select(User.id).where(User.id == user_id).with_for_update())
+    existing = await _reusable_job(session, user_id, key, now)
+    if existing:
+        ai_jobs_total.labels("deduplicated").inc()
+        return existing
+
+    job = PlanJob(user_id=user_id, prompt=prompt, prompt_key=key, available_at=now, createdAt=now, updatedAt=now)
+    values = {name: value for name, value in job.model_dump().items() if value is not None}
+    columns = PlanJob.__table__.c
+    active = select(func.count()).select_from(PlanJob).where(PlanJob.user_id == user_id, PlanJob.status.in_(ACTIVE))
+    under_limit = select(*(literal(value, columns[name].type) for name, value in values.items())).where(
+        active.scalar_subquery() < settings.AI_JOBS_PER_USER
+    )
+    try:
+        inserted = await session.exec(insert(PlanJob).from_select(list(values), under_limit))
+    except IntegrityError:
+        # A concurrent submit of the same prompt got there first.
+        await session.rollback()
+        existing = await _reusable_job(session, user_id, key, now)
+        if not existing:
+            raise
+        ai_jobs_total.labels("deduplicated").inc()
+        return existing
+    if not inserted.rowcount:
+        await session.rollback()
+        ai_jobs_total.labels("rejected").inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many planning jobs in progress (at most {settings.AI_JOBS_PER_USER}).",
+            headers={"Retry-After": str(POLL_AFTER_SECONDS)},
+        )
+    await session.commit()
+    ai_jobs_total.labels("queued").inc()
+    await _wake()
+    return job
+
+async def get_job(session: AsyncSession, job_id: uuid.UUID, user_id: uuid.UUID) -> PlanJob:
+    """The job if it belongs to `user_id`; 404 otherwise, so job ids of other users are not disclosed."""
+    job = await session.get(PlanJob, job_id)
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+# --- Workers ---
+
+class JobWorkers:
+    """The job workers of this process, started and stopped with the app."""
+
+    def __init__(self, job_queue: JobQueue, workers: int):
+        self.queue = job_queue
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._running: set[uuid.UUID] = set()
+
+    def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._recover_periodically()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._running:
+            # Jobs cut short by the shutdown go back to the queue now rather than when their lease expires.
+            now = _now()
+            async with async_session_maker() as session:
+                await session.exec(
+                    update(PlanJob)
+                    .where(PlanJob.id.in_(self._running), PlanJob.status == RUNNING)
+                    .values(status=QUEUED, attempts=PlanJob.attempts - 1, locked_until=None, available_at=now, updatedAt=now)
+                )
+                await session.commit()
+            self._running.clear()
+
+    async def _work(self):
+        while True:
+            try:
+                claimed = await self.claim()
+            except Exception:
+                logger.exception("Could not claim an AI job")
+                claimed = None
+            if claimed is None:
+                try:
+                    await self.queue.wait(settings.AI_JOB_POLL_SECONDS)
+                except Exception:
+                    logger.exception("Could not wait for AI job wakeups")
+                    await asyncio.sleep(settings.AI_JOB_POLL_SECONDS)
+                continue
+            await self.run(*claimed)
+
+    async def claim(self) -> tuple[uuid.UUID, str, int] | None:
+        """Claims the next job: (id, prompt, attempt number), or None when nothing is ready."""
+        now = _now()
+        async with async_session_maker() as session:
+            ready = (await session.exec(
+                select(PlanJob.id, PlanJob.user_id, PlanJob.available_at)
+                .where(PlanJob.status == QUEUED, PlanJob.available_at <= now)
+                .order_by(PlanJob.available_at)
+                .limit(CLAIM_WINDOW)
+            )).all()
+            if not ready:
+                return None
+            running = dict((await session.exec(
+                select(PlanJob.user_id, func.count())
+                .where(PlanJob.status == RUNNING, PlanJob.user_id.in_({user_id for _, user_id, _ in ready}))
+                .group_by(PlanJob.user_id)
+            )).all())
+            # Stable sort: oldest first among the users with the fewest running jobs.
+            for job_id, _, available_at in sorted(ready, key=lambda row: running.get(row.user_id, 0)):
+                claimed = (await session.exec(
+                    update(PlanJob)
+                    .where(PlanJob.id == job_id, PlanJob.status == QUEUED)
+                    .values(
+                        status=RUNNING,
+                        attempts=PlanJob.attempts + 1,
+                        locked_until=now + timedelta(seconds=settings.AI_JOB_LEASE_SECONDS),
+                        updatedAt=now,
+                    )
+                    .returning(PlanJob.prompt, PlanJob.attempts)
+                )).first()
+                if claimed:
+                    await session.commit()
+                    ai_job_wait_seconds.observe(max(0.0, (now - _as_utc(available_at)).total_seconds()))
+                    return job_id, claimed.prompt, claimed.attempts
+        return None
+
+    async def run(self, job_id: uuid.UUID, prompt: str, attempt: int):
+        """Runs a claimed job and records how it ended."""
+        self._running.add(job_id)
+        try:
+            try:
+                tasks = await services.plan_mission_with_ai(prompt)
+            except HTTPException as e:
+                now = _now()
+                if e.status_code in RETRYABLE_STATUS_CODES and attempt < settings.AI_JOB_MAX_ATTEMPTS:
+                    delay = retry_delay(attempt, (e.headers or {}).get("Retry-After"))
+                    values = {"status": QUEUED, "available_at": now + timedelta(seconds=delay)}
+                else:
+                    values = {"status": FAILED, "finishedAt": now}
+                outcome = "retried" if values["status"] == QUEUED else "failed"
+                await self._finish(job_id, attempt, outcome, error=str(e.detail), **values)
+            except Exception:
+                logger.exception("AI job %s failed", job_id)
+                await self._finish(job_id, attempt, "failed", status=FAILED, error="AI planning failed.", finishedAt=_now())
+            else:
+                await self._finish(job_id, attempt, "succeeded", status=SUCCEEDED, result=tasks, error=None, finishedAt=_now())
+        finally:
+            self._running.discard(job_id)
+
+    async def _finish(self, job_id: uuid.UUID, attempt: int, outcome: str, **values):
+        # Matches only while this attempt still holds the job: if its lease expired and
+        # another worker took over, that worker's result wins.
+        try:
+            async with async_session_maker() as session:
+                result = await session.exec(
+                    update(PlanJob)
+                    .where(PlanJob.id == job_id, PlanJob.status == RUNNING, PlanJob.attempts == attempt)
+                    .values(locked_until=None, updatedAt=_now(), **values)
+                )
+                await session.commit()
+        except Exception:
+            logger.exception("Could not record the outcome of AI job %s", job_id)
+            return
+        if result.rowcount:
+            ai_jobs_total.labels(outcome).inc()
+
+    async def _recover_periodically(self):
+        while True:
+            await asyncio.sleep(settings.AI_JOB_LEASE_SECONDS / 4)
+            try:
+                await self.recover_expired()
+            except Exception:
+                logger.exception("Could not recover expired AI jobs")
+
+    async def recover_expired(self) -> int:
+        """Requeues running jobs whose lease expired (failing those out of attempts). Returns how many."""
+        now = _now()
+        expired = update(PlanJob).where(PlanJob.status == RUNNING, PlanJob.locked_until < now)
+        async with async_session_maker() as session:
+            failed = await session.exec(
+                expired.where(PlanJob.attempts >= settings.AI_JOB_MAX_ATTEMPTS)
+                .values(status=FAILED, error="AI planning did not finish in time.", locked_until=None, finishedAt=now, updatedAt=now)
+            )
+            requeued = await session.exec(
+                expired.where(PlanJob.attempts < settings.AI_JOB_MAX_ATTEMPTS)
+                .values(status=QUEUED, locked_until=None, available_at=now, updatedAt=now)
+            )
+            await session.commit()
+        if failed.rowcount:
+            ai_jobs_total.labels("failed").inc(failed.rowcount)
+        if requeued.rowcount:
+            ai_jobs_total.labels("recovered").inc(requeued.rowcount)
+            await _wake()
+        return failed.rowcount + requeued.rowcount
+
+workers = JobWorkers(queue, settings.AI_JOB_WORKERS)
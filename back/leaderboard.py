@@ -0,0 +1,409 @@
+# /leaderboard.py
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Protocol
+
+from sortedcontainers import SortedList
+from sqlmodel import func, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from database import async_session_maker
+from models import MissionParticipant, MissionParticipantArchive
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BOARD = "global"
+DEFAULT_TOP = 50
+MAX_TOP = 500
+# How long a read waits for a board that another request or worker is loading.
+LOAD_WAIT_STEPS, LOAD_WAIT_SECONDS = 50, 0.02
+
+def mission_board(mission_id: uuid.UUID) -> str:
+    return f"mission:{mission_id}"
+
+class RankedSet:
+    """Members ordered by score (highest first) with O(log n) updates and rank lookups."""
+
+    def __init__(self):
+        self._scores: dict = {}
+        self._order = SortedList()
+
+    def set(self, member, score: int):
+        old = self._scores.get(member)
+        if old is not None:
+            self._order.remove((-old, member))
+        self._scores[member] = score
+        self._order.add((-score, member))
+
+    def raise_to(self, member, score: int):
+        """Sets `score` unless the member already has a higher one (Redis `ZADD GT`)."""
+        old = self._scores.get(member)
+        if old is None or score > old:
+            self.set(member, score)
+
+    def score(self, member) -> int | None:
+        return self._scores.get(member)
+
+    def rank(self, member) -> int | None:
+        """1-based position of `member`, or None if it is not ranked."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._order.index((-score, member)) + 1
+
+    def top(self, k: int) -> list[tuple]:
+        return [(member, -negated) for negated, member in self._order.islice(0, k)]
+
+    def __len__(self):
+        return len(self._scores)
+
+class LeaderboardBackend(Protocol):
+    """
+    Storage for named ranked boards; members are user ids, scores are points.
+
+    Scores are committed totals, which only grow, so writes never lower a score.
+    A load replaces the board with a database snapshot plus every score published
+    between `begin_load` and `load`: an award committed while the snapshot is read
+    is neither lost nor counted twice.
+    """
+
+    async def is_loaded(self, board: str) -> bool: ...
+
+    async def has_board(self, board: str) -> bool: ...
+
+    async def begin_load(self, board: str) -> bool: ...
+
+    async def load(self, board: str, scores: list[tuple[uuid.UUID, int]]) -> None: ...
+
+    async def abort_load(self, board: str) -> None: ...
+
+    async def raise_score(self, board: str, member: uuid.UUID, score: int) -> None: ...
+
+    async def claim_refresh(self, board: str, seconds: float) -> bool: ...
+
+    async def rank(self, board: str, member: uuid.UUID) -> tuple[int, int] | None: ...
+
+    async def top(self, board: str, k: int) -> list[tuple[uuid.UUID, int]]: ...
+
+@dataclass
+class _Board:
+    ranked: RankedSet = field(default_factory=RankedSet)
+    loaded_at: float | None = None
+    # Scores published while a load reads its snapshot; None when no load is running.
+    pending: dict | None = None
+
+class InMemoryLeaderboardBackend:
+    """
+    Per-process boards. Each board is rebuilt from the database once it is older than
+    `refresh_seconds`, which bounds drift from writes made by other workers. Only the
+    `max_boards` most recently used boards are kept.
+    """
+
+    def __init__(self, refresh_seconds: float, max_boards: int):
+        self.refresh_seconds = refresh_seconds
+        self.max_boards = max_boards
+        self._boards: OrderedDict[str, _Board] = OrderedDict()
+
+    def _get(self, board: str) -> _Board | None:
+        entry = self._boards.get(board)
+        if entry is not None:
+            self._boards.move_to_end(board)
+        return entry
+
+    def _evict(self):
+        for name in list(self._boards):
+            if len(self._boards) <= self.max_boards:
+                break
+            if self._boards[name].pending is None:
+                del self._boards[name]
+
+    async def is_loaded(self, board: str) -> bool:
+        entry = self._boards.get(board)
+        return entry is not None and entry.loaded_at is not None and time.monotonic() - entry.loaded_at < self.refresh_seconds
+
+    async def has_board(self, board: str) -> bool:
+        return board in self._boards
+
+    async def begin_load(self, board: str) -> bool:
+        entry = self._get(board)
+        if entry is None:
+            entry = self._boards[board] = _Board()
+            self._evict()
+        if entry.pending is not None:
+            return False
+        entry.pending = {}
+        return True
+
+    async def load(self, board: str, scores: list[tuple[uuid.UUID, int]]) -> None:
+        entry = self._boards.get(board)
+        if entry is None or entry.pending is None:
+            return
+        ranked = RankedSet()
+        for member, score in scores:
+            ranked.raise_to(member, score)
+        for member, score in entry.pending.items():
+            ranked.raise_to(member, score)
+        entry.ranked, entry.loaded_at, entry.pending = ranked, time.monotonic(), None
+        self._evict()
+
+    async def abort_load(self, board: str) -> None:
+        entry = self._boards.get(board)
+        if entry is not None:
+            entry.pending = None
+
+    async def raise_score(self, board: str, member: uuid.UUID, score: int) -> None:
+        entry = self._boards.get(board)
+        if entry is None:
+            return
+        entry.ranked.raise_to(member, score)
+        if entry.pending is not None:
+            entry.pending[member] = max(score, entry.pending.get(member, score))
+
+    async def claim_refresh(self, board: str, seconds: float) -> bool:
+        return True
+
+    async def rank(self, board: str, member: uuid.UUID) -> tuple[int, int] | None:
+        entry = self._get(board)
+        if entry is None or entry.ranked.score(member) is None:
+            return None
+        return entry.ranked.rank(member), entry.ranked.score(member)
+
+    async def top(self, board: str, k: int) -> list[tuple[uuid.UUID, int]]:
+        entry = self._get(board)
+        return [] if entry is None else entry.ranked.top(k)
+
+class RedisLeaderboardBackend:
+    """
+    Boards shared by every worker as Redis sorted sets (Redis 6.2+ for `ZADD GT`).
+    Requires the optional `redis` package.
+
+    Beside each board: `:loaded` expires after `refresh_seconds` and sends the next
+    read back to the database, `:loading` is the lock of the running load and
+    `:pending` collects the scores published while it runs.
+    """
+
+    LOAD_LOCK_SECONDS = 30
+
+    def __init__(self, url: str, refresh_seconds: float, prefix: str = "questtasks:leaderboard:"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._prefix = prefix
+        self.refresh_seconds = max(1, round(refresh_seconds))
+
+    async def is_loaded(self, board: str) -> bool:
+        return bool(await self._client.exists(self._prefix + board + ":loaded"))
+
+    async def has_board(self, board: str) -> bool:
+        key = self._prefix + board
+        return bool(await self._client.exists(key, key + ":loading"))
+
+    async def begin_load(self, board: str) -> bool:
+        key = self._prefix + board
+        if not await self._client.set(key + ":loading", 1, nx=True, ex=self.LOAD_LOCK_SECONDS):
+            return False
+        # Left over by a load that died: anything in it is already in the snapshot about to be read.
+        await self._client.delete(key + ":pending")
+        return True
+
+    async def load(self, board: str, scores: list[tuple[uuid.UUID, int]]) -> None:
+        key = self._prefix + board
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if scores:
+                pipe.zadd(key, {str(member): score for member, score in scores})
+            pipe.zunionstore(key, [key, key + ":pending"], aggregate="MAX")
+            # Unread boards go away; publishes keep them alive in between.
+            pipe.expire(key, 2 * self.refresh_seconds)
+            pipe.set(key + ":loaded", 1, ex=self.refresh_seconds)
+            pipe.delete(key + ":pending", key + ":loading")
+            await pipe.execute()
+
+    async def abort_load(self, board: str) -> None:
+        key = self._prefix + board
+        await self._client.delete(key + ":pending", key + ":loading")
+
+    async def raise_score(self, board: str, member: uuid.UUID, score: int) -> None:
+        key = self._prefix + board
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            pipe.exists(key + ":loading")
+            exists, loading = await pipe.execute()
+        if not (exists or loading):
+            return
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {str(member): score}, gt=True)
+            if loading:
+                pipe.zadd(key + ":pending", {str(member): score}, gt=True)
+                pipe.expire(key + ":pending", self.LOAD_LOCK_SECONDS)
+            await pipe.execute()
+
+    async def claim_refresh(self, board: str, seconds: float) -> bool:
+        key = self._prefix + board + ":refresh"
+        return bool(await self._client.set(key, 1, nx=True, ex=max(1, round(seconds))))
+
+    async def rank(self, board: str, member: uuid.UUID) -> tuple[int, int] | None:
+        key = self._prefix + board
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(key, str(member))
+            pipe.zscore(key, str(member))
+            rank, score = await pipe.execute()
+        return None if rank is None else (rank + 1, int(score))
+
+    async def top(self, board: str, k: int) -> list[tuple[uuid.UUID, int]]:
+        rows = await self._client.zrevrange(self._prefix + board, 0, k - 1, withscores=True)
+        return [(uuid.UUID(member.decode()), int(score)) for member, score in rows]
+
+def create_leaderboard_backend(url: str | None) -> LeaderboardBackend:
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisLeaderboardBackend(url, refresh_seconds=settings.LEADERBOARD_REFRESH_SECONDS)
+    return InMemoryLeaderboardBackend(
+        refresh_seconds=settings.LEADERBOARD_REFRESH_SECONDS, max_boards=settings.LEADERBOARD_MAX_BOARDS
+    )
+
+backend = create_leaderboard_backend(settings.LEADERBOARD_URL)
+
+# --- Loading ---
+
+async def _load(board: str, snapshot: Callable[[], Awaitable[list[tuple[uuid.UUID, int]]]]):
+    if not await backend.begin_load(board):
+        # Another request or worker is loading it: wait for that load rather than repeating it.
+        for _ in range(LOAD_WAIT_STEPS):
+            await asyncio.sleep(LOAD_WAIT_SECONDS)
+            if await backend.is_loaded(board):
+                return
+        return
+    try:
+        scores = await snapshot()
+    except BaseException:
+        await backend.abort_load(board)
+        raise
+    await backend.load(board, scores)
+
+async def _mission_scores(session: AsyncSession, mission_id: uuid.UUID) -> list[tuple[uuid.UUID, int]]:
+    rows = (await session.exec(
+        select(MissionParticipant.user_id, MissionParticipant.total_points)
+        .where(MissionParticipant.mission_id == mission_id)
+    )).all()
+    return list(rows)
+
+async def _global_scores(session: AsyncSession) -> list[tuple[uuid.UUID, int]]:
+    # Points earned in archived missions (archive.py) still count. Two GROUP BYs, each
+    # read in user_id index order, are cheaper than grouping a UNION ALL of both tables.
+    totals: dict[uuid.UUID, int] = {}
+    for model in (MissionParticipant, MissionParticipantArchive):
+        rows = (await session.exec(
+            select(model.user_id, func.sum(model.total_points)).group_by(model.user_id)
+        )).all()
+        for user_id, points in rows:
+            totals[user_id] = totals.get(user_id, 0) + int(points or 0)
+    return list(totals.items())
+
+async def _global_total(session: AsyncSession, user_id: uuid.UUID) -> int:
+    total = 0
+    for model in (MissionParticipant, MissionParticipantArchive):
+        total += (await session.exec(
+            select(func.coalesce(func.sum(model.total_points), 0)).where(model.user_id == user_id)
+        )).one()
+    return total
+
+async def _ensure_mission_board(session: AsyncSession, mission_id: uuid.UUID) -> str:
+    board = mission_board(mission_id)
+    if not await backend.is_loaded(board):
+        await _load(board, lambda: _mission_scores(session, mission_id))
+    return board
+
+async def _ensure_global_board(session: AsyncSession) -> str:
+    # Kept fresh by `refresher`; a request only builds it when there is none yet.
+    if not await backend.is_loaded(GLOBAL_BOARD):
+        await _load(GLOBAL_BOARD, lambda: _global_scores(session))
+    return GLOBAL_BOARD
+
+async def refresh_global_board():
+    """Rebuilds the global board; with a shared backend, one worker per refresh period does it."""
+    if await backend.claim_refresh(GLOBAL_BOARD, refresher.interval):
+        async with async_session_maker() as session:
+            await _load(GLOBAL_BOARD, lambda: _global_scores(session))
+
+class GlobalBoardRefresher:
+    """Rebuilds the global board in the background, started and stopped with the app."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await refresh_global_board()
+            except Exception:
+                logger.exception("Could not rebuild the global leaderboard")
+            await asyncio.sleep(self.interval)
+
+# Twice per marker lifetime, so reads find the board loaded between rebuilds.
+refresher = GlobalBoardRefresher(interval=settings.LEADERBOARD_REFRESH_SECONDS / 2)
+
+# --- Writes ---
+
+async def award_points(session: AsyncSession, mission_id: uuid.UUID, user_id: uuid.UUID, points: int) -> int | None:
+    """
+    Atomically adds `points` to a participant inside the caller's transaction.
+
+    Done as a single `UPDATE ... SET total_points = total_points + :points` so that
+    concurrent awards cannot overwrite each other. Returns the new total, or None if
+    the user is not a participant. Call `publish_points` once the transaction commits.
+    """
+    result = await session.exec(
+        update(MissionParticipant)
+        .where(MissionParticipant.mission_id == mission_id, MissionParticipant.user_id == user_id)
+        .values(total_points=MissionParticipant.total_points + points)
+        .returning(MissionParticipant.total_points)
+    )
+    return result.scalar_one_or_none()
+
+async def publish_points(session: AsyncSession, mission_id: uuid.UUID, user_id: uuid.UUID, new_total: int):
+    """
+    Applies a committed award to the ranked boards.
+
+    Both boards get the committed total rather than an increment, so an award that a
+    load has already read from the database is not counted again. Boards that do not
+    exist are left alone: they will read the committed value when first queried.
+    """
+    await backend.raise_score(mission_board(mission_id), user_id, new_total)
+    if await backend.has_board(GLOBAL_BOARD):
+        await backend.raise_score(GLOBAL_BOARD, user_id, await _global_total(session, user_id))
+
+async def publish_participant(mission_id: uuid.UUID, user_id: uuid.UUID):
+    """Ranks a newly joined participant with zero points on any loaded board."""
+    await backend.raise_score(mission_board(mission_id), user_id, 0)
+    await backend.raise_score(GLOBAL_BOARD, user_id, 0)
+
+# --- Reads ---
+
+async def mission_top(session: AsyncSession, mission_id: uuid.UUID, k: int) -> list[tuple[uuid.UUID, int]]:
+    return await backend.top(await _ensure_mission_board(session, mission_id), k)
+
+async def mission_rank(session: AsyncSession, mission_id: uuid.UUID, user_id: uuid.UUID) -> tuple[int, int] | None:
+    return await backend.rank(await _ensure_mission_board(session, mission_id), user_id)
+
+async def global_top(session: AsyncSession, k: int) -> list[tuple[uuid.UUID, int]]:
+    return await backend.top(await _ensure_global_board(session), k)
+
+async def global_rank(session: AsyncSession, user_id: uuid.UUID) -> tuple[int, int] | None:
+    return await backend.rank(await _ensure_global_board(session), user_id)
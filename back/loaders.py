@@ -0,0 +1,53 @@
+# /loaders.py
+
+from functools import lru_cache
+from typing import get_args, get_origin
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+def unwrap_annotation(annotation):
+    """Returns (inner type, is_collection) for `List[X]`, `X | None` and plain `X` annotations."""
+    origin = get_origin(annotation)
+    if origin in (list, tuple, set):
+        return get_args(annotation)[0], True
+    if origin is not None:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return unwrap_annotation(args[0])
+    return annotation, False
+
+def _options_for(model, schema, parent=None, fields=None) -> list:
+    relationships = inspect(model).relationships
+    options = []
+    for field_name, field in schema.model_fields.items():
+        if field_name not in relationships or (fields is not None and field_name not in fields):
+            continue
+        relationship = relationships[field_name]
+        child_schema, is_collection = unwrap_annotation(field.annotation)
+        attribute = getattr(model, field_name)
+
+        # Collections get their own SELECT ... WHERE fk IN (...) so parent rows are not
+        # multiplied; many-to-one references are cheap to JOIN into the parent query.
+        if parent is None:
+            loader = selectinload(attribute) if is_collection else joinedload(attribute)
+        else:
+            loader = parent.selectinload(attribute) if is_collection else parent.joinedload(attribute)
+
+        nested = []
+        if hasattr(child_schema, "model_fields"):
+            nested = _options_for(relationship.mapper.class_, child_schema, loader)
+        options.extend(nested or [loader])
+    return options
+
+@lru_cache(maxsize=None)
+def eager_options(model, schema, fields: frozenset | None = None) -> tuple:
+    """
+    Builds the loader options needed to serialize `model` instances through `schema`.
+
+    Only relationships that the response schema actually declares are loaded, so a
+    `MissionRead` costs one query while a `MissionReadWithParticipants` costs a fixed
+    handful regardless of how many missions, participants or tasks come back.
+    `fields` (a sparse fieldset) drops the relationships the client did not ask for.
+    """
+    return tuple(_options_for(model, schema, fields=fields))
@@ -2,12 +2,38 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import create_db_and_tables
-from routers import users, missions, ai_planner, auth
+from config import settings
+import events
+import jobs
+import rate_limit
+from database import all_async_engines, engine
+from instrumentation import MetricsMiddleware, instrument_engine, register_route_templates
+from leaderboard import refresher as leaderboard_refresher
+from read_routing import ReadYourWritesMiddleware
+from security import shutdown_hash_pool
+from serialization import ORJSONResponse
+from worker_health import heartbeat
+from routers import users, missions, ai_planner, auth, leaderboard, health, metrics, search
 
-app = FastAPI(title="QuestTasks API")
+app = FastAPI(title="QuestTasks API", default_response_class=ORJSONResponse)
 
 # --- Middleware ---
+# Added first, so they run inside CORS: 429/503 responses still carry the CORS headers
+# browsers need to read them. Admission runs before the rate limit, so shed requests
+# spend no tokens.
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        rate_limit.RateLimitMiddleware,
+        store=rate_limit.store,
+        burst=settings.RATE_LIMIT_BURST,
+        per_minute=settings.RATE_LIMIT_PER_MINUTE,
+        trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES,
+    )
+if settings.ADMISSION_SLO_SECONDS > 0:
+    app.add_middleware(
+        rate_limit.AdmissionMiddleware,
+        controller=rate_limit.AdmissionController(settings.ADMISSION_SLO_SECONDS, settings.ADMISSION_WINDOW_SECONDS),
+    )
 origins = [
     "http://localhost",
     "http://localhost:3000",
@@ -21,19 +47,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    for async_engine in all_async_engines():
+        instrument_engine(async_engine)
+    app.add_middleware(MetricsMiddleware, slow_request_seconds=settings.SLOW_REQUEST_SECONDS)
+if settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware, seconds=settings.READ_YOUR_WRITES_SECONDS)
 
-# --- Startup Event ---
+# --- Lifecycle Events ---
+# O schema não é criado aqui: rode `python manage.py migrate` antes de subir os workers.
 @app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+async def on_startup():
+    # Listening from the start: user invalidations arrive even without event subscribers.
+    await events.broker.start()
+    jobs.workers.start()
+    leaderboard_refresher.start()
+    heartbeat.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await heartbeat.stop()
+    await leaderboard_refresher.stop()
+    await jobs.workers.stop()
+    await jobs.queue.close()
+    await rate_limit.store.close()
+    await events.broker.close()
+    for async_engine in all_async_engines():
+        await async_engine.dispose()
+    shutdown_hash_pool()
 
 # --- API Routers ---
-app.include_router(auth.router, prefix="/auth", tags=["Authentication"]) 
-app.include_router(users.router, prefix="/users", tags=["Users"])
-app.include_router(missions.router, prefix="/missions", tags=["Missions"])
-app.include_router(ai_planner.router, prefix="/ai", tags=["AI Planner"])
+ROUTERS = [
+    (health.router, "", "Health"),
+    (metrics.router, "", "Metrics"),
+    (auth.router, "/auth", "Authentication"),
+    (users.router, "/users", "Users"),
+    (missions.router, "/missions", "Missions"),
+    (ai_planner.router, "/ai", "AI Planner"),
+    (leaderboard.router, "/leaderboard", "Leaderboard"),
+    (search.router, "/search", "Search"),
+]
+for router, prefix, tag in ROUTERS:
+    app.include_router(router, prefix=prefix, tags=[tag])
+    register_route_templates(router, prefix)
 
 # --- Root Endpoint ---
 @app.get("/", tags=["Root"])
-def read_root():
+async def read_root():
     return {"message": "Welcome to QuestTasks API"}
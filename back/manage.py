@@ -0,0 +1,151 @@
+# /manage.py
+"""
+Management commands that must not run inside the request-serving workers.
+
+    python manage.py migrate            # upgrade the database to the latest migration
+    python manage.py migrate 0001       # or to a specific revision
+    python manage.py check              # exit 1 if the database is not at the latest migration
+    python manage.py create-tables      # create_all without migration history (throwaway DBs only)
+    python manage.py rebuild-search     # rebuild the SQLite full-text index from the tables
+    python manage.py archive            # move finished/deleted missions to the archive (cron)
+    python manage.py restore-mission ID # move an archived mission back
+    python manage.py reload             # zero-downtime reload of the gunicorn server (gunicorn.conf.py)
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+import uuid
+
+from sqlalchemy import text
+
+import archive
+import worker_health
+from config import settings
+from database import (
+    async_engine, async_session_maker, create_db_and_tables, current_revisions, engine, migration_heads, run_migrations
+)
+
+def migrate(args) -> int:
+    run_migrations(args.revision)
+    return 0
+
+def check(args) -> int:
+    async def revisions():
+        try:
+            return await current_revisions()
+        finally:
+            await async_engine.dispose()
+
+    try:
+        current = asyncio.run(revisions())
+    except Exception as e:
+        print(f"Could not read the migration state: {e}")
+        return 1
+    heads = migration_heads()
+    print(f"database: {', '.join(sorted(current)) or '-'}  latest: {', '.join(sorted(heads))}")
+    return 0 if current == heads else 1
+
+def create_tables(args) -> int:
+    create_db_and_tables()
+    return 0
+
+def rebuild_search(args) -> int:
+    # O índice FTS5 aponta para a coluna search_key, mantida por triggers: reconstrua se
+    # dados forem carregados sem eles. No PostgreSQL a coluna gerada nunca fica desatualizada.
+    if engine.dialect.name != "sqlite":
+        print("Nothing to rebuild: the search index is maintained by the database.")
+        return 0
+    with engine.begin() as connection:
+        for fts in ("mission_fts", "task_fts", "missionarchive_fts"):
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    return 0
+
+def _run_with_session(work):
+    async def run():
+        try:
+            async with async_session_maker() as session:
+                return await work(session)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+def archive_missions(args) -> int:
+    archived, purged = _run_with_session(lambda session: archive.archive_missions(
+        session, after_days=args.after_days, retention_days=args.retention_days, batch_size=args.batch_size
+    ))
+    print(f"archived {archived} missions, purged {purged} expired archives")
+    return 0
+
+def restore_mission(args) -> int:
+    if not _run_with_session(lambda session: archive.restore_mission(session, args.mission_id)):
+        print(f"Mission {args.mission_id} is not archived.")
+        return 1
+    return 0
+
+def _read_pid(path: str) -> int | None:
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def _wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+def reload_server(args) -> int:
+    # USR2 inicia um novo master com o código novo no mesmo socket; o antigo só recebe TERM
+    # (e termina as requisições em andamento) depois que os workers novos estão de pé.
+    old_pid = _read_pid(args.pidfile)
+    if old_pid is None:
+        print(f"No server pid in {args.pidfile}; is gunicorn running?")
+        return 1
+    expected = len(worker_health.worker_statuses(old_pid)) or settings.WEB_CONCURRENCY
+    os.kill(old_pid, signal.SIGUSR2)
+    # The new master writes its pid next to the old one's until it is promoted.
+    new_pidfile = f"{args.pidfile}.2"
+    if not _wait_for(lambda: _read_pid(new_pidfile) not in (None, old_pid), args.timeout):
+        print("The new server did not start; the old one keeps serving.")
+        return 1
+    new_pid = _read_pid(new_pidfile)
+    healthy = lambda: sum(not w["stale"] for w in worker_health.worker_statuses(new_pid)) >= expected
+    if not _wait_for(healthy, args.timeout):
+        print(f"The new server's workers did not report within {args.timeout:g}s; stopping it, the old one keeps serving.")
+        os.kill(new_pid, signal.SIGTERM)
+        return 1
+    os.kill(old_pid, signal.SIGTERM)
+    print(f"reloaded: server {old_pid} -> {new_pid} ({expected} workers); the old workers are draining")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="Upgrade the database schema.")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.set_defaults(handler=migrate)
+    commands.add_parser("check", help="Check the database is at the latest migration.").set_defaults(handler=check)
+    commands.add_parser("create-tables", help="Create tables without migrations.").set_defaults(handler=create_tables)
+    commands.add_parser("rebuild-search", help="Rebuild the SQLite full-text index.").set_defaults(handler=rebuild_search)
+    archive_parser = commands.add_parser("archive", help="Archive finished and deleted missions.")
+    archive_parser.add_argument("--after-days", type=float, default=settings.ARCHIVE_AFTER_DAYS)
+    archive_parser.add_argument("--retention-days", type=float, default=settings.ARCHIVE_RETENTION_DAYS)
+    archive_parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    archive_parser.set_defaults(handler=archive_missions)
+    restore_parser = commands.add_parser("restore-mission", help="Move an archived mission back.")
+    restore_parser.add_argument("mission_id", type=uuid.UUID)
+    restore_parser.set_defaults(handler=restore_mission)
+    reload_parser = commands.add_parser("reload", help="Reload the gunicorn server without dropping requests.")
+    reload_parser.add_argument("--pidfile", default=settings.WEB_PIDFILE)
+    reload_parser.add_argument("--timeout", type=float, default=60)
+    reload_parser.set_defaults(handler=reload_server)
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
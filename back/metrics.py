@@ -0,0 +1,53 @@
+# /metrics.py
+"""
+Prometheus metrics, on prometheus_client.
+
+Under gunicorn every worker is a process with its own counters, and /metrics is
+answered by whichever worker takes the connection. With PROMETHEUS_MULTIPROC_DIR
+set (gunicorn.conf.py sets it before the app is loaded) each process writes its
+samples to files in that directory and `render` aggregates the files of every
+worker: counters and histograms are summed, gauges follow their
+`multiprocess_mode` (`livesum` by default: the live workers added up). Without
+it, as under a single uvicorn or the tests, the process' own registry is served.
+"""
+
+import os
+
+import prometheus_client
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+# Latency buckets in seconds, from sub-millisecond DB hits up to slow upstream calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# One `_created` series per counter and histogram is noise the dashboards never read.
+prometheus_client.disable_created_metrics()
+
+Counter = prometheus_client.Counter
+
+# Labelled children are built through the same constructors, hence the **kwargs.
+class Gauge(prometheus_client.Gauge):
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), multiprocess_mode: str = "livesum", **kwargs):
+        super().__init__(name, documentation, labelnames, multiprocess_mode=multiprocess_mode, **kwargs)
+
+class Histogram(prometheus_client.Histogram):
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(name, documentation, labelnames, buckets=buckets, **kwargs)
+
+def local_value(metric) -> float:
+    """This process' value of a counter or gauge, summed over its label sets."""
+    return sum(
+        sample.value
+        for family in metric.collect()
+        for sample in family.samples
+        if sample.name in (family.name, f"{family.name}_total")
+    )
+
+def render() -> bytes:
+    """Every metric in the Prometheus text format, from all workers when running several."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
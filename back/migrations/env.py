@@ -0,0 +1,61 @@
+# /migrations/env.py
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlmodel import SQLModel
+
+import models  # noqa: F401  (registers the tables on SQLModel.metadata)
+from config import settings
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = SQLModel.metadata
+
+# Full-text search objects (migrations 0005, 0010 and 0011) live outside the SQLModel
+# metadata: the FTS5 tables, their shadow tables and the search_key columns they are
+# keyed on on SQLite, the tsvector columns on PostgreSQL, and the indexes of both.
+# Autogenerate must not offer to drop them.
+SEARCH_TABLES = ("mission_fts", "task_fts", "missionarchive_fts")
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not name.startswith(SEARCH_TABLES)
+    if type_ == "column":
+        return name not in ("search_vector", "search_key")
+    if type_ == "index":
+        return not name.endswith(("_search_vector", "_search_key", "_search"))
+    return True
+
+def run_migrations_offline():
+    """Emits the migration SQL to stdout (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_name=include_name,
+        render_as_batch=settings.DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    from database import engine
+
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # SQLite cannot ALTER most things in place; batch mode recreates tables instead.
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
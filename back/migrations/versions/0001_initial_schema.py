@@ -0,0 +1,96 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created before migrations existed (by `create_all` at startup) already
+have these tables; they are skipped so such databases can upgrade in place.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def _missing(table: str) -> bool:
+    # Offline (--sql) runs have no database to inspect and emit the full schema.
+    if op.get_context().as_sql:
+        return True
+    return not sa.inspect(op.get_bind()).has_table(table)
+
+def upgrade():
+    if _missing("user"):
+        op.create_table(
+            "user",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("email", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("username", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("password", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("avatar", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column("createdAt", sa.DateTime(), nullable=False),
+            sa.Column("updatedAt", sa.DateTime(), nullable=False),
+            sa.Column("isActive", sa.Boolean(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_user_email", "user", ["email"], unique=True)
+        op.create_index("ix_user_username", "user", ["username"], unique=True)
+
+    if _missing("mission"):
+        op.create_table(
+            "mission",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("createdById", sa.Uuid(), nullable=False),
+            sa.Column("createdAt", sa.DateTime(), nullable=False),
+            sa.Column("updatedAt", sa.DateTime(), nullable=False),
+            sa.Column("isActive", sa.Boolean(), nullable=False),
+            sa.ForeignKeyConstraint(["createdById"], ["user.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if _missing("task"):
+        op.create_table(
+            "task",
+            sa.Column("id", sa.Uuid(), nullable=False),
+            sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column("points", sa.Integer(), nullable=False),
+            sa.Column("missionId", sa.Uuid(), nullable=False),
+            sa.Column("deadline", sa.DateTime(), nullable=True),
+            sa.Column("completed", sa.Boolean(), nullable=False),
+            sa.Column("isFinal", sa.Boolean(), nullable=False),
+            sa.Column("createdAt", sa.DateTime(), nullable=False),
+            sa.Column("updatedAt", sa.DateTime(), nullable=False),
+            sa.Column("bossType", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column("bossName", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.ForeignKeyConstraint(["missionId"], ["mission.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if _missing("missionparticipant"):
+        op.create_table(
+            "missionparticipant",
+            sa.Column("mission_id", sa.Uuid(), nullable=False),
+            sa.Column("user_id", sa.Uuid(), nullable=False),
+            sa.Column("total_points", sa.Integer(), nullable=False),
+            sa.Column("joined_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["mission_id"], ["mission.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+            sa.PrimaryKeyConstraint("mission_id", "user_id"),
+        )
+
+def downgrade():
+    op.drop_table("missionparticipant")
+    op.drop_table("task")
+    op.drop_table("mission")
+    op.drop_index("ix_user_username", table_name="user")
+    op.drop_index("ix_user_email", table_name="user")
+    op.drop_table("user")
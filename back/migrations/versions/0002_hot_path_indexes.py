@@ -0,0 +1,41 @@
+"""Indexes for hot query paths
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Covers the task listing (keyset on missionId, createdAt, id), the user-missions
+lookup (mission.createdById, missionparticipant.user_id), the leaderboard
+(mission_id, total_points) and the keyset listings of missions and users.
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY outside a
+transaction, so the migration can run against a live database without blocking
+writes. `if_not_exists` lets it run on databases where `create_all` already
+created some of them.
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_task_missionId_createdAt_id", "task", ["missionId", "createdAt", "id"]),
+    ("ix_mission_createdById", "mission", ["createdById"]),
+    ("ix_mission_createdAt_id", "mission", ["createdAt", "id"]),
+    ("ix_user_createdAt_id", "user", ["createdAt", "id"]),
+    ("ix_missionparticipant_user_id", "missionparticipant", ["user_id"]),
+    ("ix_missionparticipant_mission_points", "missionparticipant", ["mission_id", "total_points"]),
+]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,25 @@
+"""Mission version counter
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Adds mission.version, incremented whenever the mission, its tasks or its
+participants change. Conditional GETs compare it to answer polls with 304.
+Existing rows start at 1 through the server default.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("mission", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+def downgrade():
+    with op.batch_alter_table("mission") as batch_op:
+        batch_op.drop_column("version")
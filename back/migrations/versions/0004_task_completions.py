@@ -0,0 +1,35 @@
+"""Per-user task completions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Records which user completed which task and the points it was worth. The
+composite primary key (task_id, user_id) makes completions idempotent: a repeated
+completion conflicts instead of awarding points twice.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "taskcompletion",
+        sa.Column("task_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("points", sa.Integer(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["task_id"], ["task.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("task_id", "user_id"),
+    )
+    op.create_index("ix_taskcompletion_user_id", "taskcompletion", ["user_id"])
+
+def downgrade():
+    op.drop_index("ix_taskcompletion_user_id", table_name="taskcompletion")
+    op.drop_table("taskcompletion")
@@ -0,0 +1,84 @@
+"""Full-text search over missions and tasks
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+SQLite: FTS5 external-content tables (mission_fts, task_fts) indexed by the
+source row's rowid, kept in sync by triggers on insert, delete and on updates of
+the searched columns only (completing a task does not touch the index).
+
+PostgreSQL: a stored, generated `search_vector` tsvector column on each table,
+with a GIN index, plus a (createdAt, id) index on task so the newest matches of a
+common word can be read without sorting all of them (mission already has one).
+Adding a stored generated column rewrites the table, so run this one in a
+maintenance window on large databases.
+
+Neither object is part of the SQLModel metadata; `migrations/env.py` keeps
+autogenerate from dropping them. Ranking happens in search.py.
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# table -> (title column, description column)
+SEARCHED = {"mission": ("name", "description"), "task": ("title", "description")}
+
+def _sqlite_upgrade(table: str, title: str, description: str):
+    fts = f"{table}_fts"
+    columns = f"{title}, {description}"
+    old_values = f"old.{title}, old.{description}"
+    new_values = f"new.{title}, new.{description}"
+    # remove_diacritics: "missao" encontra "missão". prefix: índices para prefixos de 2 a 6 letras.
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.rowid, {new_values}); END"
+    )
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def _postgresql_upgrade(table: str, title: str, description: str):
+    # 'simple' não faz stemming: funciona igual para português e inglês e não atrapalha o prefixo.
+    op.execute(
+        f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        f"to_tsvector('simple', coalesce({title}, '') || ' ' || coalesce({description}, ''))) STORED"
+    )
+    op.execute(f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)")
+    if table == "task":
+        op.execute('CREATE INDEX ix_task_createdAt_id_search ON task ("createdAt", id)')
+
+def upgrade():
+    dialect = op.get_context().dialect.name
+    for table, (title, description) in SEARCHED.items():
+        if dialect == "sqlite":
+            _sqlite_upgrade(table, title, description)
+        elif dialect == "postgresql":
+            _postgresql_upgrade(table, title, description)
+
+def downgrade():
+    dialect = op.get_context().dialect.name
+    for table in SEARCHED:
+        if dialect == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif dialect == "postgresql":
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+            op.execute("DROP INDEX IF EXISTS ix_task_createdAt_id_search")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,49 @@
+"""Background AI planning jobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+The planjob table is the job queue of jobs.py: one row per submitted prompt,
+with its status, attempts, lease and, once done, the generated tasks or the
+error. (status, available_at) serves the workers' claim query; (user_id, status)
+the per-user limit and the duplicate lookup.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "planjob",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("prompt", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("prompt_key", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("finishedAt", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_planjob_prompt_key", "planjob", ["prompt_key"])
+    op.create_index("ix_planjob_status_available_at", "planjob", ["status", "available_at"])
+    op.create_index("ix_planjob_user_id_status", "planjob", ["user_id", "status"])
+
+def downgrade():
+    op.drop_index("ix_planjob_user_id_status", table_name="planjob")
+    op.drop_index("ix_planjob_status_available_at", table_name="planjob")
+    op.drop_index("ix_planjob_prompt_key", table_name="planjob")
+    op.drop_table("planjob")
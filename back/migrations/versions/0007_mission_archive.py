@@ -0,0 +1,85 @@
+"""Mission archive and hot-set partial indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+missionarchive and missionparticipantarchive are the cold tables archive.py
+moves finished and deleted missions into (tasks and task completions travel
+compressed in missionarchive.payload).
+
+The partial indexes cover only active rows, which is what the default mission
+and user listings ask for: they stay small however many rows are deleted or
+deactivated, and the listings no longer skip past those rows in the full
+(createdAt, id) indexes. Like 0002 they are built CONCURRENTLY on PostgreSQL.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# name -> (table, sqlite predicate, postgresql predicate)
+PARTIAL_INDEXES = {
+    "ix_mission_active_createdAt_id": ("mission", '"isActive" = 1', '"isActive"'),
+    "ix_user_active_createdAt_id": ("user", '"isActive" = 1', '"isActive"'),
+}
+
+def upgrade():
+    op.create_table(
+        "missionarchive",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("status", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("createdById", sa.Uuid(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("isActive", sa.Boolean(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("archivedAt", sa.DateTime(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["createdById"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_missionarchive_archivedAt", "missionarchive", ["archivedAt"])
+    op.create_index("ix_missionarchive_createdAt_id", "missionarchive", ["createdAt", "id"])
+    op.create_index("ix_missionarchive_createdById", "missionarchive", ["createdById"])
+    op.create_table(
+        "missionparticipantarchive",
+        sa.Column("mission_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("total_points", sa.Integer(), nullable=False),
+        sa.Column("joined_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["mission_id"], ["missionarchive.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("mission_id", "user_id"),
+    )
+    op.create_index(
+        "ix_missionparticipantarchive_mission_points", "missionparticipantarchive", ["mission_id", "total_points"]
+    )
+    op.create_index("ix_missionparticipantarchive_user_id", "missionparticipantarchive", ["user_id"])
+
+    with op.get_context().autocommit_block():
+        for name, (table, sqlite_where, postgresql_where) in PARTIAL_INDEXES.items():
+            op.create_index(
+                name, table, ["createdAt", "id"], if_not_exists=True, postgresql_concurrently=True,
+                sqlite_where=sa.text(sqlite_where), postgresql_where=sa.text(postgresql_where),
+            )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, (table, _, _) in PARTIAL_INDEXES.items():
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+    op.drop_index("ix_missionparticipantarchive_user_id", table_name="missionparticipantarchive")
+    op.drop_index("ix_missionparticipantarchive_mission_points", table_name="missionparticipantarchive")
+    op.drop_table("missionparticipantarchive")
+    op.drop_index("ix_missionarchive_createdById", table_name="missionarchive")
+    op.drop_index("ix_missionarchive_createdAt_id", table_name="missionarchive")
+    op.drop_index("ix_missionarchive_archivedAt", table_name="missionarchive")
+    op.drop_table("missionarchive")
@@ -0,0 +1,55 @@
+"""Timezone-aware timestamp columns
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+The models write aware UTC datetimes (datetime.now(timezone.utc)), which asyncpg
+refuses to bind to a `timestamp without time zone` column. On PostgreSQL every
+timestamp column becomes `timestamp with time zone`, reading the stored values
+as UTC. SQLite has no such type: its columns store the same text either way, so
+nothing is rebuilt there.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# table -> (column, nullable)
+COLUMNS = {
+    "user": (("createdAt", False), ("updatedAt", False)),
+    "mission": (("createdAt", False), ("updatedAt", False)),
+    "task": (("deadline", True), ("createdAt", False), ("updatedAt", False)),
+    "missionparticipant": (("joined_at", False),),
+    "taskcompletion": (("completed_at", False),),
+    "planjob": (
+        ("available_at", False), ("locked_until", True), ("createdAt", False),
+        ("updatedAt", False), ("finishedAt", True),
+    ),
+    "missionarchive": (("createdAt", False), ("updatedAt", False), ("archivedAt", False)),
+    "missionparticipantarchive": (("joined_at", False),),
+}
+
+def _alter(aware: bool):
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, columns in COLUMNS.items():
+        for column, nullable in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(timezone=aware),
+                existing_type=sa.DateTime(timezone=not aware),
+                existing_nullable=nullable,
+                postgresql_using=f"\"{column}\" AT TIME ZONE 'UTC'",
+            )
+
+def upgrade():
+    _alter(aware=True)
+
+def downgrade():
+    _alter(aware=False)
@@ -0,0 +1,42 @@
+"""One active plan job per user and prompt
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+jobs.submit looked for an active job with the same prompt before inserting one,
+so two concurrent submits could both miss it and queue the same prompt twice.
+A partial unique index on (user_id, prompt_key), over queued and running jobs
+only, makes the database reject the second insert. Duplicates that got in
+before it are failed first, keeping the oldest active job of each pair.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+ACTIVE = "status IN ('queued', 'running')"
+
+def upgrade():
+    op.execute(
+        f"""
+        UPDATE planjob SET status = 'failed', error = 'Duplicate of another active job.', locked_until = NULL
+        WHERE {ACTIVE} AND EXISTS (
+            SELECT 1 FROM planjob AS other
+            WHERE other.user_id = planjob.user_id AND other.prompt_key = planjob.prompt_key
+              AND other.{ACTIVE}
+              AND (other."createdAt" < planjob."createdAt" OR (other."createdAt" = planjob."createdAt" AND other.id < planjob.id))
+        )
+        """
+    )
+    op.create_index(
+        "uq_planjob_active_user_id_prompt_key", "planjob", ["user_id", "prompt_key"], unique=True,
+        sqlite_where=sa.text(ACTIVE), postgresql_where=sa.text(ACTIVE),
+    )
+
+def downgrade():
+    op.drop_index("uq_planjob_active_user_id_prompt_key", table_name="planjob")
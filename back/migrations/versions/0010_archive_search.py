@@ -0,0 +1,66 @@
+"""Full-text search over archived missions
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+Archived missions dropped out of /search/missions along with the hot rows they
+were moved from. missionarchive gets the same index as mission in 0005: an FTS5
+external-content table kept in sync by triggers on SQLite, a generated
+`search_vector` column with a GIN index on PostgreSQL. Existing archives are
+indexed by the migration.
+"""
+
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+TABLE, FTS = "missionarchive", "missionarchive_fts"
+COLUMNS = "name, description"
+
+def _sqlite_upgrade():
+    op.execute(
+        f"CREATE VIRTUAL TABLE {FTS} USING fts5({COLUMNS}, content='{TABLE}', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {FTS}_ai AFTER INSERT ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS}(rowid, {COLUMNS}) VALUES (new.rowid, new.name, new.description); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {FTS}_ad AFTER DELETE ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS}({FTS}, rowid, {COLUMNS}) VALUES ('delete', old.rowid, old.name, old.description); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {FTS}_au AFTER UPDATE OF {COLUMNS} ON {TABLE} BEGIN "
+        f"INSERT INTO {FTS}({FTS}, rowid, {COLUMNS}) VALUES ('delete', old.rowid, old.name, old.description); "
+        f"INSERT INTO {FTS}(rowid, {COLUMNS}) VALUES (new.rowid, new.name, new.description); END"
+    )
+    op.execute(f"INSERT INTO {FTS}({FTS}) VALUES ('rebuild')")
+
+def _postgresql_upgrade():
+    op.execute(
+        f"ALTER TABLE {TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        f"to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))) STORED"
+    )
+    op.execute(f"CREATE INDEX ix_{TABLE}_search_vector ON {TABLE} USING gin (search_vector)")
+
+def upgrade():
+    dialect = op.get_context().dialect.name
+    if dialect == "sqlite":
+        _sqlite_upgrade()
+    elif dialect == "postgresql":
+        _postgresql_upgrade()
+
+def downgrade():
+    dialect = op.get_context().dialect.name
+    if dialect == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {FTS}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {FTS}")
+    elif dialect == "postgresql":
+        op.execute(f"DROP INDEX IF EXISTS ix_{TABLE}_search_vector")
+        op.execute(f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,80 @@
+"""Key the SQLite search indexes on a stored column instead of the rowid
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+
+mission, task and missionarchive have UUID primary keys, so their rowid is
+implicit and VACUUM may renumber it, leaving the FTS5 indexes of 0005 and 0010
+pointing at the wrong rows. Each table gets a `search_key` INTEGER column with a
+unique index, filled from the current rowid and, for new rows, with the next
+free key by the insert trigger; the FTS5 tables are rebuilt with it as their
+content_rowid. Like the FTS tables, the column is not part of the SQLModel
+metadata (see `migrations/env.py`).
+
+PostgreSQL is left alone: its search_vector column lives in the row itself.
+"""
+
+from alembic import op
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+# table -> searched columns
+SEARCHED = {"mission": ("name", "description"), "task": ("title", "description"), "missionarchive": ("name", "description")}
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'"
+
+def _create_index(table: str, columns: tuple[str, str], key: str):
+    """The FTS5 table of `table` and its sync triggers, keyed on `key` (rowid or search_key)."""
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='{key}', {FTS_OPTIONS})")
+    if key == "rowid":
+        insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.rowid, {new_values});"
+    else:
+        # The ORM never sets search_key: the next key is taken here, then indexed.
+        insert = (
+            f"UPDATE {table} SET {key} = (SELECT coalesce(max({key}), 0) + 1 FROM {table}) "
+            f"WHERE rowid = new.rowid AND new.{key} IS NULL; "
+            f"INSERT INTO {fts}(rowid, {names}) SELECT {key}, {names} FROM {table} WHERE rowid = new.rowid;"
+        )
+    op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END")
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old_values}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.{key}, {new_values}); END"
+    )
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def _drop_index(table: str):
+    fts = f"{table}_fts"
+    for suffix in ("ai", "ad", "au"):
+        op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    op.execute(f"DROP TABLE IF EXISTS {fts}")
+
+def upgrade():
+    if op.get_context().dialect.name != "sqlite":
+        return
+    for table, columns in SEARCHED.items():
+        _drop_index(table)
+        op.execute(f"ALTER TABLE {table} ADD COLUMN search_key INTEGER")
+        op.execute(f"UPDATE {table} SET search_key = rowid")
+        op.execute(f"CREATE UNIQUE INDEX ix_{table}_search_key ON {table} (search_key)")
+        _create_index(table, columns, "search_key")
+
+def downgrade():
+    if op.get_context().dialect.name != "sqlite":
+        return
+    for table, columns in SEARCHED.items():
+        _drop_index(table)
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_key")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN search_key")
+        _create_index(table, columns, "rowid")
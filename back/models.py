@@ -3,33 +3,55 @@
 import uuid
 from datetime import datetime, timezone
 from typing import List, Optional
+from sqlalchemy import JSON, Column, DateTime, Index, LargeBinary, text
 from sqlmodel import Field, Relationship, SQLModel
 
 class User(SQLModel, table=True):
+    # Índices de caminhos quentes; ver migrations/versions/0002_hot_path_indexes.py
+    __table_args__ = (
+        Index("ix_user_createdAt_id", "createdAt", "id"),
+        # Listagens padrão só mostram usuários ativos; ver 0007_mission_archive.py.
+        Index(
+            "ix_user_active_createdAt_id", "createdAt", "id",
+            sqlite_where=text('"isActive" = 1'), postgresql_where=text('"isActive"'),
+        ),
+    )
+
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     name: str
     email: str = Field(unique=True, index=True)
     username: str = Field(unique=True, index=True)
     password: str
     avatar: Optional[str] = None
-    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
     isActive: bool = Field(default=True)
     
     createdMissions: List["Mission"] = Relationship(back_populates="createdBy")
     participations: List["MissionParticipant"] = Relationship(back_populates="user")
 
 class Mission(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_mission_createdAt_id", "createdAt", "id"),
+        # The hot set: default listings skip soft-deleted missions.
+        Index(
+            "ix_mission_active_createdAt_id", "createdAt", "id",
+            sqlite_where=text('"isActive" = 1'), postgresql_where=text('"isActive"'),
+        ),
+    )
+
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     name: str
     description: Optional[str] = None
     status: str = "active"
     # CORREÇÃO APLICADA AQUI:
     # O campo da chave estrangeira foi renomeado para "createdById"
-    createdById: uuid.UUID = Field(foreign_key="user.id")
-    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    createdById: uuid.UUID = Field(foreign_key="user.id", index=True)
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
     isActive: bool = Field(default=True)
+    # Bumped on every change to the mission or its tasks/participants; feeds the HTTP ETags.
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     # Esta é a propriedade que estabelece o relacionamento de volta para o User
     createdBy: User = Relationship(back_populates="createdMissions")
@@ -37,26 +59,96 @@ class Mission(SQLModel, table=True):
     participants: List["MissionParticipant"] = Relationship(back_populates="mission")
 
 class Task(SQLModel, table=True):
+    # Lists a mission's tasks in keyset order straight from the index.
+    __table_args__ = (Index("ix_task_missionId_createdAt_id", "missionId", "createdAt", "id"),)
+
     id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str
     description: Optional[str] = None
     points: int = Field(gt=0)
     missionId: uuid.UUID = Field(foreign_key="mission.id")
-    deadline: Optional[datetime] = None
+    deadline: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
     completed: bool = Field(default=False)
     isFinal: bool = Field(default=False)
-    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
     bossType: Optional[str] = None
     bossName: Optional[str] = None
 
     mission: Mission = Relationship(back_populates="tasks")
 
 class MissionParticipant(SQLModel, table=True):
+    # Serve leaderboard reads (ORDER BY total_points within a mission) from the index.
+    __table_args__ = (Index("ix_missionparticipant_mission_points", "mission_id", "total_points"),)
+
     mission_id: uuid.UUID = Field(foreign_key="mission.id", primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
     total_points: int = 0
-    joined_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    joined_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
     
     mission: "Mission" = Relationship(back_populates="participants")
-    user: "User" = Relationship(back_populates="participations")
\ No newline at end of file
+    user: "User" = Relationship(back_populates="participations")
+class TaskCompletion(SQLModel, table=True):
+    # One row per (task, user): the primary key is what makes completing a task idempotent.
+    task_id: uuid.UUID = Field(foreign_key="task.id", primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
+    points: int
+    completed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+
+class PlanJob(SQLModel, table=True):
+    """An AI planning request handled in the background; see jobs.py."""
+    __table_args__ = (
+        # Workers claim the oldest ready job; per-user counts and dedup look up by user.
+        Index("ix_planjob_status_available_at", "status", "available_at"),
+        Index("ix_planjob_user_id_status", "user_id", "status"),
+        # At most one active job per user and prompt, even for concurrent submits; see 0009.
+        Index(
+            "uq_planjob_active_user_id_prompt_key", "user_id", "prompt_key", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: Optional[uuid.UUID] = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id")
+    prompt: str
+    # services.ai_cache_key(prompt): identical prompts share one job per user.
+    prompt_key: str = Field(index=True)
+    status: str = "queued"  # queued, running, succeeded, failed
+    attempts: int = 0
+    result: Optional[list] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[str] = None
+    available_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+    locked_until: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True))
+    finishedAt: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
+
+class MissionArchive(SQLModel, table=True):
+    """A finished or deleted mission moved out of the hot tables; see archive.py."""
+    __table_args__ = (Index("ix_missionarchive_createdAt_id", "createdAt", "id"),)
+
+    id: uuid.UUID = Field(primary_key=True)
+    name: str
+    description: Optional[str] = None
+    status: str
+    createdById: uuid.UUID = Field(foreign_key="user.id", index=True)
+    createdAt: datetime = Field(sa_type=DateTime(timezone=True))
+    updatedAt: datetime = Field(sa_type=DateTime(timezone=True))
+    isActive: bool
+    version: int
+    archivedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True), index=True)
+    # Tasks and task completions, as zlib-compressed JSON (archive.pack).
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+    participants: List["MissionParticipantArchive"] = Relationship()
+
+class MissionParticipantArchive(SQLModel, table=True):
+    __table_args__ = (Index("ix_missionparticipantarchive_mission_points", "mission_id", "total_points"),)
+
+    mission_id: uuid.UUID = Field(foreign_key="missionarchive.id", primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, index=True)
+    total_points: int
+    joined_at: datetime = Field(sa_type=DateTime(timezone=True))
+
+    user: User = Relationship()
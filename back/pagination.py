@@ -0,0 +1,53 @@
+# /pagination.py
+
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def as_utc(value: datetime) -> datetime:
+    """`value` as an aware UTC datetime; SQLite hands timestamps back naive (already UTC)."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Encodes the (createdAt, id) keyset of the last row of a page into an opaque cursor."""
+    raw = json.dumps([created_at.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decodes a cursor produced by `encode_cursor`, rejecting anything malformed with a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return as_utc(datetime.fromisoformat(created_at)), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+async def paginate(session: AsyncSession, statement, model, limit: int, cursor: str | None = None) -> dict:
+    """
+    Runs `statement` as a keyset-paginated query ordered by (createdAt, id).
+
+    Rows after `cursor` are fetched with a row-value comparison so the database can seek
+    straight into the (createdAt, id) ordering instead of counting past an OFFSET, which
+    keeps every page equally cheap no matter how deep the client has scrolled.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(model.createdAt, model.id) > (created_at, row_id))
+
+    # One extra row tells us whether another page exists without a COUNT(*).
+    statement = statement.order_by(model.createdAt, model.id).limit(limit + 1)
+    rows = (await session.exec(statement)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].createdAt, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
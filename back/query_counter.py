@@ -0,0 +1,46 @@
+# /query_counter.py
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+class QueryCounter:
+    """Collects every SQL statement executed on an engine while it is active."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self.parameters: list = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+@contextmanager
+def count_queries(engine):
+    """Context manager yielding a `QueryCounter` for the statements run on `engine` inside the block."""
+    # Async engines emit cursor events on their underlying sync engine.
+    engine = getattr(engine, "sync_engine", engine)
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._record)
+
+@contextmanager
+def assert_max_queries(engine, expected: int):
+    """
+    Fails if the block runs more than `expected` statements on `engine`.
+
+    Meant for tests: wrap a request to an endpoint so that a change which brings
+    back per-row lazy loading (an N+1) fails loudly instead of silently slowing down.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > expected:
+        executed = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(counter.statements, 1))
+        raise AssertionError(f"Expected at most {expected} queries, got {counter.count}:\n{executed}")
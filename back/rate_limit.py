@@ -0,0 +1,349 @@
+# /rate_limit.py
+"""
+Per-client rate limiting and load shedding.
+
+`RateLimitMiddleware` gives every client a token bucket: RATE_LIMIT_BURST
+tokens, refilled continuously at RATE_LIMIT_PER_MINUTE. Over any window of t
+seconds a client can spend at most burst + rate * t tokens, a sliding window
+without the edge bursts of fixed windows. Each request costs the tokens of its
+route in ROUTE_POLICIES: hashing a password or calling Gemini costs more than
+reading a mission. Clients are keyed by the subject of their bearer token until
+it expires, or by IP address otherwise: behind RATE_LIMIT_TRUSTED_PROXIES
+proxies, the address X-Forwarded-For says the outermost one saw. Responses
+carry RateLimit-Limit, RateLimit-Remaining, RateLimit-Reset and
+RateLimit-Policy; rejected requests get 429 with Retry-After.
+
+`AdmissionMiddleware` protects the worker as a whole. It tracks the p95 latency
+of regular requests over ADMISSION_WINDOW_SECONDS windows. While it is above
+ADMISSION_SLO_SECONDS, each window sheds one more priority class with 503: first
+low-priority work (AI, search, bulk import), then reads. Writes, logins and
+health checks are never shed. Each window back under the SLO lets one class
+back in.
+"""
+
+import fnmatch
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Protocol
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from config import settings
+from metrics import Counter, Gauge
+from security import decode_token
+
+logger = logging.getLogger(__name__)
+
+# Priorities, in the order they are shed.
+LOW, NORMAL, HIGH, CRITICAL = 0, 1, 2, 3
+PRIORITY_NAMES = {LOW: "low", NORMAL: "normal", HIGH: "high", CRITICAL: "critical"}
+MAX_SHED_LEVEL = HIGH  # sheds LOW, then LOW and NORMAL; never HIGH or CRITICAL
+# Hysteresis: only let a class back in once latency is clearly under the SLO.
+RECOVERY_RATIO = 0.8
+
+rate_limited_total = Counter("http_rate_limited_total", "Requests rejected by the per-client rate limit.", ("priority",))
+admission_shed_total = Counter("admission_shed_total", "Requests shed by admission control.", ("priority",))
+admission_shed_level = Gauge("admission_shed_level", "Priority classes currently shed by admission control (0 = none).", multiprocess_mode="livemax")
+admission_latency_p95_seconds = Gauge("admission_latency_p95_seconds", "p95 latency of timed requests in the last admission window.", multiprocess_mode="livemax")
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    cost: int
+    priority: int
+    # Counted in the admission latency; not for streams or routes waiting on Gemini.
+    timed: bool = True
+
+# (method or None for any, path pattern, policy); the first match wins.
+ROUTE_POLICIES = [
+    # CORS preflights come with every cross-origin call; the call itself is what counts.
+    ("OPTIONS", "*", RoutePolicy(0, CRITICAL, timed=False)),
+    (None, "/healthz", RoutePolicy(0, CRITICAL, timed=False)),
+    (None, "/healthz/*", RoutePolicy(0, CRITICAL, timed=False)),
+    (None, "/readyz", RoutePolicy(0, CRITICAL, timed=False)),
+    (None, "/metrics", RoutePolicy(0, CRITICAL, timed=False)),
+    # Argon2: deliberately expensive.
+    ("POST", "/auth/login", RoutePolicy(10, HIGH)),
+    ("POST", "/users/", RoutePolicy(10, HIGH)),
+    # Paid Gemini calls. The planner cache, concurrency cap and breaker guard the upstream
+    # too; this only keeps one client from monopolizing it.
+    ("POST", "/ai/plan-mission*", RoutePolicy(20, LOW, timed=False)),
+    ("POST", "/ai/jobs", RoutePolicy(20, LOW, timed=False)),
+    (None, "/ai/*", RoutePolicy(1, LOW)),
+    ("POST", "/missions/bulk", RoutePolicy(20, LOW)),
+    ("GET", "/search/*", RoutePolicy(2, LOW)),
+    ("GET", "/missions/*/events/stream", RoutePolicy(1, NORMAL, timed=False)),
+]
+_COMPILED_POLICIES = [(method, re.compile(fnmatch.translate(pattern)), policy) for method, pattern, policy in ROUTE_POLICIES]
+READ_POLICY = RoutePolicy(1, NORMAL)
+WRITE_POLICY = RoutePolicy(1, HIGH)
+
+def route_policy(method: str, path: str) -> RoutePolicy:
+    for rule_method, pattern, policy in _COMPILED_POLICIES:
+        if (rule_method is None or rule_method == method) and pattern.match(path):
+            return policy
+    return READ_POLICY if method in ("GET", "HEAD", "OPTIONS") else WRITE_POLICY
+
+def _scope_policy(scope) -> RoutePolicy:
+    # Both middlewares need it; classify each request once.
+    policy = scope.get("questtasks.route_policy")
+    if policy is None:
+        policy = scope["questtasks.route_policy"] = route_policy(scope["method"], scope["path"])
+    return policy
+
+# --- Client keys ---
+
+@lru_cache(maxsize=10000)
+def _token_claims(token: str) -> tuple[str, float] | None:
+    # The signature is checked so nobody can spend another user's budget. Only the
+    # key is cached: authentication itself still happens in get_current_user.
+    try:
+        payload = decode_token(token)
+    except HTTPException:
+        return None
+    return payload["sub"], payload.get("exp", math.inf)
+
+def _token_subject(token: str) -> str | None:
+    claims = _token_claims(token)
+    # A cached token still expires: past `exp`, its requests count against the IP.
+    if claims and claims[1] > time.time():
+        return claims[0]
+    return None
+
+def forwarded_client(forwarded_for: str, trusted_proxies: int) -> str:
+    """
+    The client address in X-Forwarded-For behind `trusted_proxies` proxies.
+
+    Each proxy appends the address it received the request from, so only the last
+    `trusted_proxies` entries are known to be true; anything left of them is
+    whatever the client sent.
+    """
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    return hops[-min(trusted_proxies, len(hops))]
+
+def client_key(scope, trusted_proxies: int = 0) -> str:
+    authorization = forwarded_for = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            authorization = value.decode("latin-1")
+        elif name == b"x-forwarded-for":
+            # Proxies may add a header each instead of appending to the first one.
+            forwarded_for = f"{forwarded_for},{value.decode('latin-1')}" if forwarded_for else value.decode("latin-1")
+    if authorization and authorization[:7].lower() == "bearer ":
+        subject = _token_subject(authorization[7:].strip())
+        if subject:
+            return f"user:{subject}"
+    if trusted_proxies and forwarded_for and forwarded_for.strip(", "):
+        return f"ip:{forwarded_client(forwarded_for, trusted_proxies)}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+# --- Bucket stores ---
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: int
+    # Seconds until the bucket is full again, and until the request could pass.
+    reset: int
+    retry_after: int
+
+def _decision(allowed: bool, tokens: float, cost: float, capacity: float, per_second: float) -> Decision:
+    return Decision(
+        allowed=allowed,
+        remaining=max(0, int(tokens)),
+        reset=math.ceil((capacity - tokens) / per_second),
+        retry_after=0 if allowed else max(1, math.ceil((cost - tokens) / per_second)),
+    )
+
+class RateLimitStore(Protocol):
+    async def take(self, key: str, cost: float, capacity: float, per_second: float) -> Decision: ...
+
+    async def close(self) -> None: ...
+
+class InMemoryRateLimitStore:
+    """Buckets of this process. Beyond `max_keys`, the least recently seen clients are dropped (their buckets refill)."""
+
+    def __init__(self, max_keys: int):
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._max_keys = max_keys
+
+    async def take(self, key: str, cost: float, capacity: float, per_second: float) -> Decision:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * per_second)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self._max_keys:
+            self._buckets.popitem(last=False)
+        return _decision(allowed, tokens, cost, capacity, per_second)
+
+    async def close(self) -> None:
+        pass
+
+# Refill, take and store in one atomic step, on Redis' clock so workers agree.
+_TAKE_SCRIPT = """
+local capacity, per_second, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * per_second)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / per_second) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisRateLimitStore:
+    """Buckets shared by every worker through Redis. Requires the optional `redis` package."""
+
+    def __init__(self, url: str, prefix: str = "questtasks:ratelimit:"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._prefix = prefix
+
+    async def take(self, key: str, cost: float, capacity: float, per_second: float) -> Decision:
+        allowed, tokens = await self._take(keys=[self._prefix + key], args=[capacity, per_second, cost])
+        return _decision(bool(allowed), float(tokens), cost, capacity, per_second)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+def create_rate_limit_store(url: str | None, max_keys: int) -> RateLimitStore:
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisRateLimitStore(url)
+    return InMemoryRateLimitStore(max_keys)
+
+store = create_rate_limit_store(settings.RATE_LIMIT_URL, settings.RATE_LIMIT_MAX_KEYS)
+
+# --- Middlewares ---
+
+class RateLimitMiddleware:
+    """Token bucket per client; see the module docstring. Plain ASGI, like MetricsMiddleware."""
+
+    def __init__(self, app, store: RateLimitStore, burst: int, per_minute: int, trusted_proxies: int = 0):
+        self.app = app
+        self.store = store
+        self.burst = burst
+        self.per_second = per_minute / 60
+        self.trusted_proxies = trusted_proxies
+        self.policy_header = f"{burst};w={math.ceil(burst / self.per_second)}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        policy = _scope_policy(scope)
+        if not policy.cost:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            decision = await self.store.take(
+                client_key(scope, self.trusted_proxies), min(policy.cost, self.burst), self.burst, self.per_second
+            )
+        except Exception:
+            # Fail open: losing the shared store must not take the API down with it.
+            logger.exception("Rate limit store unavailable")
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            "RateLimit-Limit": str(self.burst),
+            "RateLimit-Remaining": str(decision.remaining),
+            "RateLimit-Reset": str(decision.reset),
+            "RateLimit-Policy": self.policy_header,
+        }
+        if not decision.allowed:
+            rate_limited_total.labels(PRIORITY_NAMES[policy.priority]).inc()
+            response = JSONResponse(
+                {"detail": "Too many requests, please slow down."},
+                status_code=429,
+                headers={**headers, "Retry-After": str(decision.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        raw_headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *raw_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class AdmissionController:
+    """Decides which priorities this worker admits, from the latency of recent requests."""
+
+    def __init__(self, slo_seconds: float, window_seconds: float):
+        self.slo_seconds = slo_seconds
+        self.window_seconds = window_seconds
+        self.level = 0
+        self._samples: list[float] = []
+        self._window_started = time.monotonic()
+
+    def admits(self, priority: int) -> bool:
+        self._maybe_evaluate()
+        return priority >= self.level
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def _maybe_evaluate(self):
+        now = time.monotonic()
+        if now - self._window_started < self.window_seconds:
+            return
+        samples, self._samples, self._window_started = self._samples, [], now
+        p95 = sorted(samples)[int(len(samples) * 0.95)] if samples else 0.0
+        if p95 > self.slo_seconds:
+            self.level = min(self.level + 1, MAX_SHED_LEVEL)
+        elif p95 < self.slo_seconds * RECOVERY_RATIO:
+            self.level = max(self.level - 1, 0)
+        admission_latency_p95_seconds.set(p95)
+        admission_shed_level.set(self.level)
+
+class AdmissionMiddleware:
+    """Sheds requests the AdmissionController does not admit, with 503 and Retry-After."""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        policy = _scope_policy(scope)
+        if not self.controller.admits(policy.priority):
+            admission_shed_total.labels(PRIORITY_NAMES[policy.priority]).inc()
+            response = JSONResponse(
+                {"detail": "Server is overloaded, please retry shortly."},
+                status_code=503,
+                headers={"Retry-After": str(math.ceil(self.controller.window_seconds))},
+            )
+            await response(scope, receive, send)
+            return
+        if not policy.timed:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.record(time.perf_counter() - started)
@@ -0,0 +1,67 @@
+# /read_routing.py
+"""
+Sends read-only routes to the read replicas (DATABASE_REPLICA_URLS).
+
+GET handlers depend on `get_read_session` instead of `get_session`; it hands out
+sessions from the replicas in turn. Replicas lag behind the primary, so a client
+that just wrote something would not always see it on its next read:
+`ReadYourWritesMiddleware` marks a client after each successful write with a
+cookie that keeps its reads on the primary for READ_YOUR_WRITES_SECONDS.
+
+Without replicas every read goes to the primary and the middleware is not
+installed.
+"""
+
+import itertools
+import time
+
+from fastapi import Request
+
+from config import settings
+from database import async_session_maker, replica_session_makers
+
+STICKY_COOKIE = "qt_primary_until"
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_replicas = itertools.cycle(replica_session_makers)
+
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_session_maker(request: Request):
+    """Session factory for a read in `request`: the next replica, or the primary if the client just wrote."""
+    if not replica_session_makers or _reads_from_primary(request):
+        return async_session_maker
+    return next(_replicas)
+
+async def get_read_session(request: Request):
+    async with read_session_maker(request)() as session:
+        yield session
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the stickiness cookie on every successful (2xx/3xx) write response.
+
+    Plain ASGI, like MetricsMiddleware, so streaming responses are untouched.
+    """
+
+    def __init__(self, app, seconds: float = settings.READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_ONLY_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.seconds
+                cookie = f"{STICKY_COOKIE}={until:.3f}; Max-Age={max(1, round(self.seconds))}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
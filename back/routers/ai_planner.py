@@ -1,20 +1,113 @@
 # /routers/ai_planner.py
 
+import json
+import uuid
 from typing import List
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import jobs
 import services
-from schemas import AIPlannerRequest, TaskSuggestion
+from database import get_session
+from dependencies import get_current_user
+from read_routing import get_read_session
+from schemas import (
+    AIPlannerRequest, MissionRead, MissionWithTasksCreate, PlanJobMissionCreate, PlanJobRead, TaskCreate,
+    TaskSuggestion, UserRead,
+)
 
 router = APIRouter()
 
-@router.post("/plan-mission", response_model=List[TaskSuggestion])
-def handle_plan_mission(request: AIPlannerRequest):
-    """
-    Receives a user prompt and uses the AI service to generate a list of task suggestions.
-    """
+def _validate_prompt(request: AIPlannerRequest):
     if not request.prompt or len(request.prompt) < 10:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Prompt must be at least 10 characters long."
         )
-    return services.plan_mission_with_ai(prompt=request.prompt)
\ No newline at end of file
+
+@router.post("/plan-mission", response_model=List[TaskSuggestion])
+async def handle_plan_mission(request: AIPlannerRequest):
+    """
+    Receives a user prompt and uses the AI service to generate a list of task suggestions.
+    """
+    _validate_prompt(request)
+    return await services.plan_mission_with_ai(prompt=request.prompt)
+
+@router.post("/plan-mission/stream")
+async def handle_plan_mission_stream(request: AIPlannerRequest):
+    """
+    Streams task suggestions as newline-delimited JSON, one `TaskSuggestion` per line,
+    flushing each task as soon as the model has generated it.
+    """
+    _validate_prompt(request)
+    services.ensure_ai_configured()
+    services.ensure_ai_available()
+
+    async def ndjson():
+        async for task in services.stream_mission_plan(prompt=request.prompt):
+            yield json.dumps(task) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+# --- Background jobs (see jobs.py) ---
+
+@router.post("/jobs", response_model=PlanJobRead, status_code=status.HTTP_202_ACCEPTED)
+async def handle_submit_plan_job(
+    request: AIPlannerRequest,
+    response: Response,
+    current_user: UserRead = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Queues a planning job and returns it right away; poll the URL in `Location`.
+    Submitting the same prompt again returns the job already queued or done for it.
+    """
+    _validate_prompt(request)
+    services.ensure_ai_configured()
+    job = await jobs.submit(session, current_user.id, request.prompt)
+    response.headers["Location"] = f"/ai/jobs/{job.id}"
+    if job.status in jobs.ACTIVE:
+        response.headers["Retry-After"] = str(jobs.poll_after(job))
+    return job
+
+@router.get("/jobs/{job_id}", response_model=PlanJobRead)
+async def handle_get_plan_job(
+    job_id: uuid.UUID,
+    response: Response,
+    current_user: UserRead = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Gets one of the caller's jobs. While it is queued or running, `Retry-After` says when to poll again."""
+    job = await jobs.get_job(session, job_id, current_user.id)
+    if job.status in jobs.ACTIVE:
+        response.headers["Retry-After"] = str(jobs.poll_after(job))
+    return job
+
+@router.post("/jobs/{job_id}/mission", response_model=MissionRead, status_code=status.HTTP_201_CREATED)
+async def handle_create_mission_from_plan_job(
+    job_id: uuid.UUID,
+    mission_in: PlanJobMissionCreate,
+    current_user: UserRead = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Creates a mission, owned by the caller, with the tasks a finished job planned."""
+    job = await jobs.get_job(session, job_id, current_user.id)
+    if job.status != jobs.SUCCEEDED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status}, not succeeded.")
+    tasks = []
+    for suggestion in job.result or []:
+        try:
+            tasks.append(TaskCreate.model_validate(suggestion))
+        except ValidationError:
+            continue
+    mission_data = MissionWithTasksCreate(
+        name=mission_in.name, description=mission_in.description, createdById=current_user.id, tasks=tasks
+    )
+    return await services.create_mission_with_tasks(session=session, mission_data=mission_data)
+
+@router.get("/status")
+async def handle_ai_status():
+    """Reports the AI upstream circuit breaker state and current in-flight calls."""
+    return services.ai_status()
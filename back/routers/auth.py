@@ -4,25 +4,26 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 import services
 from config import settings
 from database import get_session
-from schemas import LoginResponse, UserRead # Import LoginResponse and UserRead
-from security import create_access_token
+from dependencies import load_active_user
+from schemas import LoginResponse, RefreshRequest, UserRead # Import LoginResponse and UserRead
+from security import create_access_token, create_refresh_token, decode_token
 
 router = APIRouter()
 
 @router.post("/login", response_model=LoginResponse) # Update the response_model
-def login_for_access_token(
+async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Provides a JWT token and user info for valid user credentials.
     """
-    user = services.authenticate_user(
+    user = await services.authenticate_user(
         session=session, username=form_data.username, password=form_data.password
     )
 
@@ -33,14 +34,27 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Return the new response object, including the user
+    return _token_response(user)
+
+def _token_response(user) -> dict:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-
-    # Return the new response object, including the user
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": user  # Add the user object here
-    }
\ No newline at end of file
+        "refresh_token": create_refresh_token(data={"sub": user.username}),
+        "user": user
+    }
+
+@router.post("/refresh", response_model=LoginResponse)
+async def refresh_access_token(request: RefreshRequest, session: AsyncSession = Depends(get_session)):
+    """
+    Exchanges a refresh token for a new access/refresh token pair without re-checking
+    the password, so access tokens can stay short-lived.
+    """
+    payload = decode_token(request.refresh_token, expected_type="refresh")
+    user = await load_active_user(session, payload["sub"])
+    return _token_response(user)
\ No newline at end of file
@@ -0,0 +1,40 @@
+# /routers/health.py
+
+from fastapi import APIRouter, HTTPException, status
+
+from database import current_revisions, migration_heads
+from worker_health import worker_statuses
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def handle_liveness():
+    """Liveness probe: the process is up and serving. Touches no dependencies."""
+    return {"status": "ok"}
+
+@router.get("/healthz/workers")
+async def handle_worker_health():
+    """
+    Heartbeats of every server worker (see worker_health.py). 503 if any of them is
+    stale, so a hung worker fails the check even while the others keep answering.
+    """
+    workers = worker_statuses()
+    stale = sum(worker["stale"] for worker in workers)
+    body = {"status": "degraded" if stale else "ok", "alive": len(workers) - stale, "stale": stale, "workers": workers}
+    if stale:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=body)
+    return body
+
+@router.get("/readyz")
+async def handle_readiness():
+    """Readiness probe: the database is reachable and migrated to the latest revision."""
+    try:
+        revisions = await current_revisions()
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable or not migrated")
+    if revisions != migration_heads():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database schema is not at the latest migration; run `python manage.py migrate`",
+        )
+    return {"status": "ready", "revision": sorted(revisions)}
@@ -0,0 +1,43 @@
+# /routers/leaderboard.py
+
+from typing import List
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import leaderboard
+from read_routing import get_read_session
+from models import User
+from schemas import GlobalLeaderboardEntry
+
+router = APIRouter()
+
+@router.get("/global", response_model=List[GlobalLeaderboardEntry])
+async def handle_get_global_leaderboard(
+    limit: int = Query(leaderboard.DEFAULT_TOP, ge=1, le=leaderboard.MAX_TOP),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Gets the top users across every mission, ranked by their summed points."""
+    ranked = await leaderboard.global_top(session, limit)
+    if not ranked:
+        return []
+    users = {
+        user.id: user
+        for user in (await session.exec(select(User).where(User.id.in_([user_id for user_id, _ in ranked])))).all()
+    }
+    return [
+        {"rank": rank, "total_points": points, "user": users[user_id]}
+        for rank, (user_id, points) in enumerate(ranked, 1)
+        if user_id in users
+    ]
+
+@router.get("/global/{user_id}", response_model=GlobalLeaderboardEntry)
+async def handle_get_global_rank(user_id: uuid.UUID, session: AsyncSession = Depends(get_read_session)):
+    """Gets a single user's rank and summed points across every mission."""
+    user = await session.get(User, user_id)
+    position = await leaderboard.global_rank(session, user_id)
+    if not user or position is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not ranked")
+    rank, points = position
+    return {"rank": rank, "total_points": points, "user": user}
@@ -0,0 +1,12 @@
+# /routers/metrics.py
+
+from fastapi import APIRouter, Response
+
+import metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def handle_metrics():
+    """Exposes every registered metric in the Prometheus text format."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,103 +1,364 @@
 # /routers/missions.py
 
+import asyncio
 from typing import List
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import defer
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+import archive
+import events
+import leaderboard
 import services
-from database import get_session
-from models import Mission, Task, MissionParticipant, User
+from config import settings
+from database import async_session_maker, get_session
+from read_routing import get_read_session
+from http_cache import not_modified, set_validators, weak_etag
+from loaders import eager_options
+from models import Mission, MissionArchive, Task, MissionParticipant, User
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from serialization import ORJSONResponse, parse_fields, project, project_page
 from schemas import (
-    MissionCreate, MissionRead, MissionReadWithParticipants,
-    TaskCreate, TaskRead, MissionCreationRequest, # ALTERADO
-    ParticipantCreate, MissionParticipantRead, MissionParticipantReadWithUser
+    MissionCreate, MissionRead, MissionReadWithParticipants, MissionPage,
+    TaskCreate, TaskRead, TaskPage, MissionCreationRequest, MissionBulkCreateRequest, # ALTERADO
+    ParticipantCreate, MissionParticipantRead, MissionParticipantReadWithUser, LeaderboardEntry,
+    TaskCompletionCreate, TaskCompletionBatchRequest, TaskCompletionRead
 )
 
 router = APIRouter()
 
+def _mission_etag(request: Request, policy: str, mission_id: uuid.UUID, version: int) -> str:
+    # The query string is part of the representation (filters, cursor, limit).
+    return weak_etag(policy, mission_id, version, request.url.query)
+
+async def _mission_version(session: AsyncSession, mission_id: uuid.UUID) -> tuple[int, bool] | None:
+    """(version, archived) of a mission, looking in the archive only when it is not in the hot table."""
+    version = (await session.exec(select(Mission.version).where(Mission.id == mission_id))).first()
+    if version is not None:
+        return version, False
+    version = (await session.exec(select(MissionArchive.version).where(MissionArchive.id == mission_id))).first()
+    return None if version is None else (version, True)
+
+async def _mission_not_modified(request: Request, session: AsyncSession, policy: str, mission_id: uuid.UUID) -> Response | None:
+    """Answers a revalidation with 304 after reading only the mission's version."""
+    if "if-none-match" not in request.headers:
+        return None
+    found = await _mission_version(session, mission_id)
+    if found is None:
+        return None
+    return not_modified(request, _mission_etag(request, policy, mission_id, found[0]), policy)
+
+async def _writable_mission(session: AsyncSession, mission_id: uuid.UUID) -> Mission:
+    """The hot mission a write goes to; archived missions are read-only."""
+    mission = await session.get(Mission, mission_id)
+    if mission:
+        return mission
+    if await session.get(MissionArchive, mission_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Mission is archived")
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
+
 @router.post("/with-tasks", response_model=MissionRead)
-def handle_create_mission_with_tasks(
+async def handle_create_mission_with_tasks(
     # ALTERADO: Usa o novo schema para o payload aninhado
     request: MissionCreationRequest, 
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """Creates a mission and its tasks together by calling the service layer."""
-    return services.create_mission_with_tasks(session=session, mission_data=request.mission)
+    return await services.create_mission_with_tasks(session=session, mission_data=request.mission)
+
+@router.post("/bulk", response_model=List[MissionRead], status_code=status.HTTP_201_CREATED)
+async def handle_create_missions_bulk(request: MissionBulkCreateRequest, session: AsyncSession = Depends(get_session)):
+    """Creates many missions with their tasks in one transaction, for importers and seeding scripts."""
+    return await services.create_missions_with_tasks(session=session, missions=request.missions)
+
 @router.post("/", response_model=MissionRead, status_code=status.HTTP_201_CREATED)
 
-def handle_create_mission(mission_in: MissionCreate, session: Session = Depends(get_session)):
+async def handle_create_mission(mission_in: MissionCreate, session: AsyncSession = Depends(get_session)):
     """Creates a single mission without any tasks."""
     db_mission = Mission.model_validate(mission_in)
     session.add(db_mission)
-    session.commit()
-    session.refresh(db_mission)
+    await session.commit()
+    await session.refresh(db_mission)
     return db_mission
 
-@router.get("/", response_model=List[MissionRead])
-def handle_list_missions(session: Session = Depends(get_session)):
-    """Retrieves a list of all missions."""
-    missions = session.exec(select(Mission)).all()
-    return missions
+@router.get("/", response_model=MissionPage)
+async def handle_list_missions(
+    status_filter: str | None = Query(None, alias="status"),
+    isActive: bool | None = Query(None, description="Deleted missions are left out unless asked for (defaults to true for the hot set)"),
+    createdById: uuid.UUID | None = None,
+    archived: bool = Query(False, description="List the archived missions instead"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated subset of the fields to return"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Retrieves a page of missions, optionally filtered. Pass `next_cursor` back as `cursor` for the next page."""
+    selected = parse_fields(fields, MissionRead)
+    model = MissionArchive if archived else Mission
+    statement = select(model)
+    if archived:
+        # The compressed tasks and completions are not part of a MissionRead.
+        statement = statement.options(defer(MissionArchive.payload))
+    if status_filter is not None:
+        statement = statement.where(model.status == status_filter)
+    # Sem filtro explícito, só missões ativas: a consulta usa o índice parcial ix_mission_active_createdAt_id.
+    if isActive is None and not archived:
+        isActive = True
+    if isActive is not None:
+        statement = statement.where(model.isActive == isActive)
+    if createdById is not None:
+        statement = statement.where(model.createdById == createdById)
+    page = await paginate(session, statement, model, limit=limit, cursor=cursor)
+    return ORJSONResponse(project_page(MissionRead, page, selected))
 
 @router.get("/{mission_id}", response_model=MissionReadWithParticipants)
-def handle_get_mission(mission_id: uuid.UUID, session: Session = Depends(get_session)):
-    """Retrieves a single mission by its ID, including its participants."""
-    mission = session.get(Mission, mission_id)
-    if not mission:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
-    return mission
+async def handle_get_mission(
+    mission_id: uuid.UUID,
+    request: Request,
+    fields: str | None = Query(None, description="Comma-separated subset of the fields to return, e.g. id,name,participants"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Retrieves a single mission by its ID, including its participants and tasks. Supports If-None-Match.
+    Relationships left out of `fields` are not loaded at all.
+    """
+    selected = parse_fields(fields, MissionReadWithParticipants)
+    if cached := await _mission_not_modified(request, session, "mission", mission_id):
+        return cached
+    mission = await session.get(Mission, mission_id, options=eager_options(Mission, MissionReadWithParticipants, selected))
+    if mission:
+        response = ORJSONResponse(project(MissionReadWithParticipants, mission, selected))
+    else:
+        mission = await archive.get_mission(session, mission_id, MissionReadWithParticipants, selected)
+        if not mission:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
+        response = ORJSONResponse(archive.mission_view(mission, selected))
+    set_validators(response, _mission_etag(request, "mission", mission_id, mission.version), "mission")
+    return response
+
+@router.delete("/{mission_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def handle_delete_mission(mission_id: uuid.UUID, session: AsyncSession = Depends(get_session)):
+    """
+    Soft-deletes a mission: it leaves the default listings at once, stays readable by id,
+    and is moved to the archive by the next archival run after ARCHIVE_AFTER_DAYS.
+    """
+    mission = await _writable_mission(session, mission_id)
+    if mission.isActive:
+        mission.isActive = False
+        session.add(mission)
+        await services.touch_mission(session, mission_id)
+        await session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.post("/{mission_id}/tasks/", response_model=TaskRead, status_code=status.HTTP_201_CREATED)
-def handle_create_task_for_mission(
-    mission_id: uuid.UUID, task_in: TaskCreate, session: Session = Depends(get_session)
+async def handle_create_task_for_mission(
+    mission_id: uuid.UUID, task_in: TaskCreate, session: AsyncSession = Depends(get_session)
 ):
     """Adds a new task to an existing mission."""
-    mission = session.get(Mission, mission_id)
-    if not mission:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
-    
+    await _writable_mission(session, mission_id)
+
     db_task = Task.model_validate(task_in, update={"missionId": mission_id})
     session.add(db_task)
-    session.commit()
-    session.refresh(db_task)
+    version = await services.touch_mission(session, mission_id)
+    await session.commit()
+    await session.refresh(db_task)
+    await events.publish_mission_event(
+        mission_id, events.TASK_CREATED, version, TaskRead.model_validate(db_task).model_dump(mode="json")
+    )
     return db_task
 
-@router.get("/{mission_id}/tasks/", response_model=List[TaskRead])
-def handle_list_tasks_for_mission(mission_id: uuid.UUID, session: Session = Depends(get_session)):
-    """Retrieves all tasks associated with a specific mission."""
-    mission = session.get(Mission, mission_id)
-    if not mission:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
-    
-    tasks = session.exec(select(Task).where(Task.missionId == mission_id)).all()
-    return tasks
+@router.get("/{mission_id}/tasks/", response_model=TaskPage)
+async def handle_list_tasks_for_mission(
+    mission_id: uuid.UUID,
+    request: Request,
+    completed: bool | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated subset of the fields to return"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Retrieves a page of the tasks associated with a specific mission. Supports If-None-Match."""
+    selected = parse_fields(fields, TaskRead)
+    if cached := await _mission_not_modified(request, session, "mission_tasks", mission_id):
+        return cached
+    mission = await session.get(Mission, mission_id)
+    if mission:
+        statement = select(Task).where(Task.missionId == mission_id)
+        if completed is not None:
+            statement = statement.where(Task.completed == completed)
+        page = await paginate(session, statement, Task, limit=limit, cursor=cursor)
+    else:
+        mission = await archive.get_mission(session, mission_id)
+        if not mission:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
+        page = archive.task_page(mission, completed, limit, cursor)
+    response = ORJSONResponse(project_page(TaskRead, page, selected))
+    set_validators(response, _mission_etag(request, "mission_tasks", mission_id, mission.version), "mission_tasks")
+    return response
+
+@router.post("/{mission_id}/tasks/{task_id}/complete", response_model=TaskCompletionRead)
+async def handle_complete_task(
+    mission_id: uuid.UUID, task_id: uuid.UUID, completion: TaskCompletionCreate, session: AsyncSession = Depends(get_session)
+):
+    """Completes a task for a participant and credits its points. Repeating it awards nothing (`awarded: false`)."""
+    return await services.complete_task(session, mission_id, task_id, completion.user_id)
+
+@router.post("/{mission_id}/completions", response_model=List[TaskCompletionRead])
+async def handle_complete_tasks(
+    mission_id: uuid.UUID, request: TaskCompletionBatchRequest, session: AsyncSession = Depends(get_session)
+):
+    """Completes many (task, user) pairs of a mission in one transaction. Returns one result per distinct pair."""
+    completions = [(item.task_id, item.user_id) for item in request.completions]
+    return await services.complete_tasks(session, mission_id, completions)
 
 @router.post("/{mission_id}/participants", response_model=MissionParticipantRead, status_code=status.HTTP_201_CREATED)
-def handle_add_participant_to_mission(
-    mission_id: uuid.UUID, participant_in: ParticipantCreate, session: Session = Depends(get_session)
+async def handle_add_participant_to_mission(
+    mission_id: uuid.UUID, participant_in: ParticipantCreate, session: AsyncSession = Depends(get_session)
 ):
     """Adds a user as a participant to a mission."""
-    if not session.get(Mission, mission_id):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
-    if not session.get(User, participant_in.user_id):
+    await _writable_mission(session, mission_id)
+    if not await session.get(User, participant_in.user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    existing = session.get(MissionParticipant, (mission_id, participant_in.user_id))
+    existing = await session.get(MissionParticipant, (mission_id, participant_in.user_id))
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User is already a participant")
     
     new_participant = MissionParticipant(mission_id=mission_id, user_id=participant_in.user_id)
     session.add(new_participant)
-    session.commit()
-    session.refresh(new_participant)
+    version = await services.touch_mission(session, mission_id)
+    await session.commit()
+    await session.refresh(new_participant)
+    await leaderboard.publish_participant(mission_id, participant_in.user_id)
+    await events.publish_mission_event(
+        mission_id, events.PARTICIPANT_JOINED, version, {"user_id": participant_in.user_id, "total_points": 0}
+    )
     return new_participant
 
-@router.get("/{mission_id}/leaderboard", response_model=List[MissionParticipantReadWithUser])
-def handle_get_mission_leaderboard(mission_id: uuid.UUID, session: Session = Depends(get_session)):
-    """Gets the leaderboard for a mission, sorted by points."""
-    statement = select(MissionParticipant).where(MissionParticipant.mission_id == mission_id).order_by(MissionParticipant.total_points.desc())
-    participants = session.exec(statement).all()
-    if not participants and not session.get(Mission, mission_id):
-         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
-    return participants
\ No newline at end of file
+async def _leaderboard_entries(
+    session: AsyncSession, mission_id: uuid.UUID, ranked: list, first_rank: int = 1, archived: bool = False
+) -> list[dict]:
+    """Joins ranked (user_id, points) pairs with their participant and user rows in one query."""
+    if not ranked:
+        return []
+    user_ids = [user_id for user_id, _ in ranked]
+    if archived:
+        participants = await archive.participants_with_users(session, mission_id, user_ids)
+    else:
+        statement = (
+            select(MissionParticipant)
+            .where(MissionParticipant.mission_id == mission_id, MissionParticipant.user_id.in_(user_ids))
+            .options(*eager_options(MissionParticipant, MissionParticipantReadWithUser))
+        )
+        participants = {p.user_id: p for p in (await session.exec(statement)).all()}
+    return [
+        {"mission_id": mission_id, "user_id": user_id, "total_points": points, "user": participants[user_id].user, "rank": rank}
+        for rank, (user_id, points) in enumerate(ranked, first_rank)
+        if user_id in participants
+    ]
+
+@router.get("/{mission_id}/leaderboard", response_model=List[LeaderboardEntry])
+async def handle_get_mission_leaderboard(
+    mission_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    limit: int = Query(leaderboard.DEFAULT_TOP, ge=1, le=leaderboard.MAX_TOP),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Gets the top `limit` participants of a mission, sorted by points. Supports If-None-Match.
+
+    The ETag is taken from the ranking being served, not from the mission's version: the
+    board catches up with the database asynchronously, and a version-based ETag would let
+    a client keep a stale ranking under the new version.
+    """
+    found = await _mission_version(session, mission_id)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
+    archived = found[1]
+    if archived:
+        ranked = (await archive.ranked(session, mission_id))[:limit]
+    else:
+        ranked = await leaderboard.mission_top(session, mission_id, limit)
+    etag = weak_etag("mission_leaderboard", mission_id, request.url.query, *(f"{user_id}={points}" for user_id, points in ranked))
+    if cached := not_modified(request, etag, "mission_leaderboard"):
+        return cached
+    set_validators(response, etag, "mission_leaderboard")
+    return await _leaderboard_entries(session, mission_id, ranked, archived=archived)
+
+@router.get("/{mission_id}/leaderboard/{user_id}", response_model=LeaderboardEntry)
+async def handle_get_mission_rank(mission_id: uuid.UUID, user_id: uuid.UUID, session: AsyncSession = Depends(get_read_session)):
+    """Gets a single participant's rank and points within a mission."""
+    position = await leaderboard.mission_rank(session, mission_id, user_id)
+    entries = []
+    if position is not None:
+        entries = await _leaderboard_entries(session, mission_id, [(user_id, position[1])], first_rank=position[0])
+    if not entries:
+        # Not on a live board (or the board predates the archival): the mission may be archived.
+        ranked = await archive.ranked(session, mission_id)
+        position = next(((rank, points) for rank, (member, points) in enumerate(ranked, 1) if member == user_id), None)
+        if position is not None:
+            entries = await _leaderboard_entries(session, mission_id, [(user_id, position[1])], first_rank=position[0], archived=True)
+    if not entries:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Participant not found")
+    return entries[0]
+
+# --- Real-time events ---
+
+async def _mission_exists(mission_id: uuid.UUID) -> bool:
+    # Short-lived session: subscriptions stay open for a long time and must not hold a pool connection.
+    async with async_session_maker() as session:
+        return (await session.exec(select(Mission.id).where(Mission.id == mission_id))).first() is not None
+
+async def _pump_events(websocket: WebSocket, subscription: events.Subscription):
+    while True:
+        message = await subscription.get()
+        await asyncio.wait_for(websocket.send_text(message), timeout=settings.EVENTS_SEND_TIMEOUT_SECONDS)
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@router.websocket("/{mission_id}/events")
+async def handle_mission_events(websocket: WebSocket, mission_id: uuid.UUID):
+    """
+    Pushes the mission's deltas as JSON text frames: task_created, task_completed,
+    participant_joined and rank_changed, each with the mission version after the change.
+    A `resync` frame means updates were dropped and the client should re-fetch the mission.
+    """
+    if not await _mission_exists(mission_id):
+        await websocket.close(code=4404, reason="Mission not found")
+        return
+    await websocket.accept()
+    async with events.subscribe(mission_id) as subscription:
+        pump = asyncio.ensure_future(_pump_events(websocket, subscription))
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(websocket))
+        done, pending = await asyncio.wait({pump, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        errors = [task.exception() for task in done]
+        if any(isinstance(error, asyncio.TimeoutError) for error in errors):
+            # The client stopped reading; 1013 asks it to reconnect later.
+            await websocket.close(code=1013, reason="Consumer too slow")
+
+@router.get("/{mission_id}/events/stream")
+async def handle_mission_events_stream(mission_id: uuid.UUID):
+    """The same mission deltas as Server-Sent Events, for clients that cannot use WebSockets."""
+    if not await _mission_exists(mission_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission not found")
+
+    async def stream():
+        async with events.subscribe(mission_id) as subscription:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line that keeps proxies from closing an idle stream.
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,40 @@
+# /routers/search.py
+
+import uuid
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import search
+from read_routing import get_read_session
+from schemas import MissionSearchPage, TaskSearchPage
+
+router = APIRouter()
+
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+
+@router.get("/missions", response_model=MissionSearchPage)
+async def handle_search_missions(
+    q: str = Query(..., min_length=1, max_length=200),
+    createdById: uuid.UUID | None = None,
+    archived: bool = Query(False, description="Search the archived missions instead"),
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Searches mission names and descriptions, best matches first. Every word matches as a prefix.
+    Deleted missions are left out; pass `archived=true` to search the archived ones.
+    """
+    return await search.search_missions(session, q, limit=limit, cursor=cursor, created_by_id=createdById, archived=archived)
+
+@router.get("/tasks", response_model=TaskSearchPage)
+async def handle_search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    missionId: uuid.UUID | None = None,
+    limit: int = Query(DEFAULT_SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Searches task titles and descriptions, best matches first. Every word matches as a prefix."""
+    return await search.search_tasks(session, q, limit=limit, cursor=cursor, mission_id=missionId)
@@ -2,58 +2,89 @@
 
 from typing import List
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select, or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlmodel import select, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+import archive
 import services
 from database import get_session
+from read_routing import get_read_session
+from dependencies import get_current_user
+from http_cache import not_modified, set_validators, weak_etag
+from loaders import eager_options
 from models import User, Mission, MissionParticipant
-from schemas import UserCreate, UserRead, MissionRead, MissionReadWithParticipants
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from serialization import ORJSONResponse, parse_fields, project, project_page
+from schemas import UserCreate, UserRead, UserPage, MissionRead, MissionReadWithParticipants
 
 router = APIRouter()
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def handle_create_user(user_in: UserCreate, session: Session = Depends(get_session)):
+async def handle_create_user(user_in: UserCreate, session: AsyncSession = Depends(get_session)):
     """API endpoint to create a user by calling the service layer."""
-    return services.create_user(session=session, user_in=user_in)
+    return await services.create_user(session=session, user_in=user_in)
 
-@router.get("/", response_model=List[UserRead])
-def handle_list_users(session: Session = Depends(get_session)):
-    """API endpoint to retrieve a list of all users."""
-    users = session.exec(select(User)).all()
-    return users
+@router.get("/", response_model=UserPage)
+async def handle_list_users(
+    isActive: bool = Query(True, description="Inactive users are left out unless asked for"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """API endpoint to retrieve a page of users. Pass `next_cursor` back as `cursor` for the next page."""
+    statement = select(User)
+    # O padrão (só ativos) usa o índice parcial ix_user_active_createdAt_id.
+    statement = statement.where(User.isActive == isActive)
+    page = await paginate(session, statement, User, limit=limit, cursor=cursor)
+    return ORJSONResponse(project_page(UserRead, page))
+
+@router.get("/me", response_model=UserRead)
+async def handle_get_current_user(current_user: UserRead = Depends(get_current_user)):
+    """API endpoint to retrieve the user the bearer token belongs to."""
+    return current_user
 
 @router.get("/{user_id}", response_model=UserRead)
-def handle_get_user(user_id: uuid.UUID, session: Session = Depends(get_session)):
-    """API endpoint to retrieve a single user by their ID."""
-    user = session.get(User, user_id)
+async def handle_get_user(
+    user_id: uuid.UUID, request: Request, response: Response, session: AsyncSession = Depends(get_read_session)
+):
+    """API endpoint to retrieve a single user by their ID. Supports If-None-Match."""
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    etag = weak_etag("user", user.id, user.updatedAt.isoformat())
+    if cached := not_modified(request, etag, "user"):
+        return cached
+    set_validators(response, etag, "user")
     return user
 
 @router.get("/{user_id}/missions/", response_model=List[MissionReadWithParticipants]) # ALTERADO: Usa o response_model correto
-def handle_get_user_missions(user_id: uuid.UUID, session: Session = Depends(get_session)):
+async def handle_get_user_missions(
+    user_id: uuid.UUID,
+    fields: str | None = Query(None, description="Comma-separated subset of the fields to return, e.g. id,name"),
+    session: AsyncSession = Depends(get_read_session),
+):
     """
-    Retrieves a list of all missions a user is involved in, including participants and tasks.
+    Retrieves a list of all (not deleted) missions a user is involved in, including participants and tasks.
+    Archived missions come after the ones still in play, read-only but in the same shape.
+    Pass `fields` to leave out `participants`/`tasks`; they are then not loaded at all.
     """
-    user = session.get(User, user_id)
+    selected = parse_fields(fields, MissionReadWithParticipants)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    # A lógica para encontrar as missões está correta, mas a forma de retornar os dados precisa ser ajustada
-    # para incluir os relacionamentos (participantes e tarefas), o que o SQLModel faz automaticamente
-    # se o response_model for `MissionReadWithParticipants`.
+    # Participantes (com usuário) e tarefas são carregados antecipadamente a partir do que
+    # `MissionReadWithParticipants` serializa, evitando uma consulta extra por missão (N+1).
+    # O filtro usa IN (subconsulta) em vez de LEFT JOIN + OR para que os dois ramos sejam
+    # resolvidos pelos índices de createdById e missionparticipant.user_id.
+    participating = select(MissionParticipant.mission_id).where(MissionParticipant.user_id == user_id)
     statement = (
         select(Mission)
-        .join(MissionParticipant, Mission.id == MissionParticipant.mission_id, isouter=True)
-        .where(
-            or_(
-                Mission.createdById == user_id,
-                MissionParticipant.user_id == user_id
-            )
-        )
-        .distinct()
+        .where(or_(Mission.createdById == user_id, Mission.id.in_(participating)), Mission.isActive == True)
+        .options(*eager_options(Mission, MissionReadWithParticipants, selected))
     )
     
-    missions = session.exec(statement).all()
-    return missions
\ No newline at end of file
+    missions = (await session.exec(statement)).all()
+    archived = await archive.user_missions(session, user_id, selected)
+    return ORJSONResponse([project(MissionReadWithParticipants, mission, selected) for mission in missions] + archived)
\ No newline at end of file
@@ -3,7 +3,8 @@
 import uuid
 from datetime import datetime
 from typing import List
-from sqlmodel import SQLModel
+from pydantic import model_validator
+from sqlmodel import Field, SQLModel
 
 # --- User Schemas ---
 class UserBase(SQLModel):
@@ -18,6 +19,10 @@ class UserCreate(UserBase):
 class UserRead(UserBase):
     id: uuid.UUID
 
+class UserPage(SQLModel):
+    items: List[UserRead]
+    next_cursor: str | None = None
+
 # --- Task Schemas ---
 class TaskBase(SQLModel):
     title: str
@@ -36,6 +41,10 @@ class TaskRead(TaskBase):
     id: uuid.UUID
     createdAt: datetime
 
+class TaskPage(SQLModel):
+    items: List[TaskRead]
+    next_cursor: str | None = None
+
 # --- Mission Schemas ---
 class MissionBase(SQLModel):
     name: str
@@ -48,6 +57,10 @@ class MissionRead(MissionBase):
     id: uuid.UUID
     createdById: uuid.UUID
 
+class MissionPage(SQLModel):
+    items: List[MissionRead]
+    next_cursor: str | None = None
+
 # --- AI Planner Schemas ---
 class AIPlannerRequest(SQLModel):
     prompt: str
@@ -57,13 +70,42 @@ class TaskSuggestion(SQLModel):
     description: str
     points: int
 
+class PlanJobRead(SQLModel):
+    id: uuid.UUID
+    status: str
+    attempts: int
+    result: List[TaskSuggestion] | None = None
+    error: str | None = None
+    createdAt: datetime
+    updatedAt: datetime
+    finishedAt: datetime | None = None
+
+class PlanJobMissionCreate(MissionBase):
+    """Name and description of the mission made from a finished planning job."""
+
 # --- Schemas para Criação de Missão com Tarefas (Payload do Frontend) ---
+MAX_TASKS_PER_MISSION = 500
+
 class MissionWithTasksCreate(MissionCreate):
-    tasks: List[TaskCreate] # ALTERADO: Usa TaskCreate para incluir todos os campos
+    tasks: List[TaskCreate] = Field(max_length=MAX_TASKS_PER_MISSION) # ALTERADO: Usa TaskCreate para incluir todos os campos
 
 # NOVO: Schema para lidar com o payload aninhado do frontend
 class MissionCreationRequest(SQLModel):
     mission: MissionWithTasksCreate
+
+# Importação em lote (seeds, importadores): limita as linhas de uma requisição, não só as missões.
+MAX_BULK_MISSIONS = 5000
+MAX_BULK_TASKS = 50000
+
+class MissionBulkCreateRequest(SQLModel):
+    missions: List[MissionWithTasksCreate] = Field(max_length=MAX_BULK_MISSIONS)
+
+    @model_validator(mode="after")
+    def _limit_total_tasks(self):
+        total = sum(len(mission.tasks) for mission in self.missions)
+        if total > MAX_BULK_TASKS:
+            raise ValueError(f"At most {MAX_BULK_TASKS} tasks per request, got {total}.")
+        return self
     
 # --- Participant Schemas ---
 class ParticipantCreate(SQLModel):
@@ -77,10 +119,55 @@ class MissionParticipantRead(SQLModel):
 class MissionParticipantReadWithUser(MissionParticipantRead):
     user: UserRead
 
+class LeaderboardEntry(MissionParticipantReadWithUser):
+    rank: int
+
+class GlobalLeaderboardEntry(SQLModel):
+    rank: int
+    total_points: int
+    user: UserRead
+
 class MissionReadWithParticipants(MissionRead):
     participants: List[MissionParticipantReadWithUser] = []
     tasks: List[TaskRead] = [] # NOVO: Adiciona tarefas à resposta
 
+# --- Task Completion Schemas ---
+MAX_BATCH_COMPLETIONS = 500
+
+class TaskCompletionCreate(SQLModel):
+    user_id: uuid.UUID
+
+class TaskCompletionBatchItem(SQLModel):
+    task_id: uuid.UUID
+    user_id: uuid.UUID
+
+class TaskCompletionBatchRequest(SQLModel):
+    completions: List[TaskCompletionBatchItem] = Field(min_length=1, max_length=MAX_BATCH_COMPLETIONS)
+
+class TaskCompletionRead(SQLModel):
+    task_id: uuid.UUID
+    user_id: uuid.UUID
+    points: int
+    # False when this (task, user) pair had already been completed; nothing was awarded again.
+    awarded: bool
+    total_points: int
+
+# --- Search Schemas ---
+class MissionSearchHit(MissionRead):
+    score: float
+
+class MissionSearchPage(SQLModel):
+    items: List[MissionSearchHit]
+    next_cursor: str | None = None
+
+class TaskSearchHit(TaskRead):
+    missionId: uuid.UUID
+    score: float
+
+class TaskSearchPage(SQLModel):
+    items: List[TaskSearchHit]
+    next_cursor: str | None = None
+
 # --- Token and Login Schemas ---
 class Token(SQLModel):
     access_token: str
@@ -92,4 +179,8 @@ class TokenData(SQLModel):
 class LoginResponse(SQLModel):
     access_token: str
     token_type: str
-    user: UserRead
\ No newline at end of file
+    refresh_token: str | None = None
+    user: UserRead
+
+class RefreshRequest(SQLModel):
+    refresh_token: str
\ No newline at end of file
@@ -0,0 +1,140 @@
+# /search.py
+"""
+Full-text search over missions and tasks.
+
+The index lives in the database (migration 0005): FTS5 tables on SQLite and a
+generated tsvector column on PostgreSQL, both maintained by the database itself
+on every insert and update. Every query word must match, as a prefix; a whole
+word also matches its exact form, so it ranks above a mere prefix.
+
+Ranking happens in the query, bm25() on SQLite and ts_rank() on PostgreSQL, with
+titles weighing TITLE_WEIGHT times descriptions. Pages are read in (rank, id)
+order with a keyset cursor: only the page leaves the database, and a deeper page
+does not re-read the earlier ones. Searches within one mission or one user's
+missions add that filter to the same query.
+
+Like the mission listings, searches cover the hot set: deleted missions, and
+the tasks of deleted missions, are left out. Archived missions have an index of
+their own (migration 0010) and are searched with `archived=True`.
+"""
+
+import base64
+import json
+import re
+import unicodedata
+import uuid
+
+from fastapi import HTTPException, status
+from sqlalchemy import column, func, literal, literal_column, table, text, tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import Mission, MissionArchive, Task
+from schemas import MissionSearchHit, TaskSearchHit
+
+MAX_TERMS = 8
+# Um termo no título vale mais que na descrição.
+TITLE_WEIGHT = 4.0
+# ts_rank weights, in {D, C, B, A} order: descriptions are D, titles A.
+TS_RANK_WEIGHTS = f"{{{1 / TITLE_WEIGHT}, 0.1, 0.1, 1.0}}"
+
+# Letters and digits only: anything else (quotes, operators, "_") separates terms,
+# so user input can never change the structure of the MATCH/tsquery expression.
+_TERM = re.compile(r"[^\W_]+")
+
+def _normalize(value: str) -> str:
+    # Same folding as the FTS5 tokenizer (remove_diacritics): "Missão" -> "missao".
+    if value.isascii():
+        return value.lower()
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def search_terms(q: str) -> list[str]:
+    return _TERM.findall(_normalize(q))[:MAX_TERMS]
+
+def fts5_query(terms: list[str]) -> str:
+    """Every term must match as a prefix; the whole word matches twice: `("plan" OR "plan"*) AND ...`."""
+    return " AND ".join(f'("{term}" OR "{term}"*)' for term in terms)
+
+def tsquery(terms: list[str]) -> str:
+    return " & ".join(f"({term} | {term}:*)" for term in terms)
+
+def encode_cursor(rank: float, row_id: uuid.UUID) -> str:
+    raw = json.dumps([rank, str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        rank, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(rank), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+def _hit_columns(model, schema) -> list:
+    # Only what a hit shows: an archived mission's payload never leaves the database.
+    return [getattr(model, name) for name in schema.model_fields if name != "score"]
+
+def _ranked(session: AsyncSession, model, title_column, columns: list, terms: list[str]):
+    """(statement, rank) for the rows matching every term; a lower rank is a better match."""
+    name = model.__tablename__
+    if session.bind.dialect.name == "postgresql":
+        query = func.to_tsquery("simple", tsquery(terms))
+        # search_vector is unweighted: the weighted vector is rebuilt for the matching rows only.
+        # Untyped literals: setweight() takes a "char", which a varchar parameter is not cast to.
+        weighted = func.setweight(func.to_tsvector("simple", func.coalesce(title_column, "")), literal_column("'A'")).op("||")(
+            func.setweight(func.to_tsvector("simple", func.coalesce(model.description, "")), literal_column("'D'"))
+        )
+        rank = -func.ts_rank(literal_column(f"'{TS_RANK_WEIGHTS}'::float4[]"), weighted, query)
+        statement = select(*columns, rank.label("rank")).where(literal_column(f"{name}.search_vector").op("@@")(query))
+        return statement, rank
+
+    fts = table(f"{name}_fts", column("rowid"))
+    # bm25() is already negative, best matches first; one weight per FTS5 column.
+    rank = func.bm25(literal_column(f"{name}_fts"), literal(TITLE_WEIGHT), literal(1.0))
+    statement = (
+        select(*columns, rank.label("rank"))
+        # Keyed on search_key, not on the implicit rowid a VACUUM may renumber (migration 0011).
+        .join(fts, fts.c.rowid == literal_column(f"{name}.search_key"))
+        .where(text(f"{name}_fts MATCH :query").bindparams(query=fts5_query(terms)))
+    )
+    return statement, rank
+
+async def _search(session: AsyncSession, model, title_column, schema, terms: list[str], limit: int, cursor: str | None, *filters) -> dict:
+    """A keyset page of the matching rows, best first."""
+    if not terms:
+        return {"items": [], "next_cursor": None}
+    statement, rank = _ranked(session, model, title_column, _hit_columns(model, schema), terms)
+    statement = statement.where(*filters)
+    if cursor:
+        statement = statement.where(tuple_(rank, model.id) > decode_cursor(cursor))
+    rows = (await session.exec(statement.order_by(rank, model.id).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1].id)
+    items = []
+    for row in rows:
+        item = dict(row._mapping)
+        item["score"] = -item.pop("rank")
+        items.append(item)
+    return {"items": items, "next_cursor": next_cursor}
+
+async def search_missions(
+    session: AsyncSession, q: str, limit: int, cursor: str | None = None, created_by_id: uuid.UUID | None = None, archived: bool = False
+) -> dict:
+    model = MissionArchive if archived else Mission
+    filters = [model.isActive == True]
+    if created_by_id:
+        filters.append(model.createdById == created_by_id)
+    return await _search(session, model, model.name, MissionSearchHit, search_terms(q), limit, cursor, *filters)
+
+async def search_tasks(session: AsyncSession, q: str, limit: int, cursor: str | None = None, mission_id: uuid.UUID | None = None) -> dict:
+    active = select(Mission.id).where(Mission.isActive == True)
+    if mission_id:
+        # The mission is checked once, not for each of its tasks.
+        filters = [Task.missionId.in_(active.where(Mission.id == mission_id))]
+    else:
+        # One primary-key lookup per matching task: reading every active mission's id
+        # first would cost more than the lookups for all but the most common words.
+        filters = [active.where(Mission.id == Task.missionId).exists()]
+    return await _search(session, Task, Task.title, TaskSearchHit, search_terms(q), limit, cursor, *filters)
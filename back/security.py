@@ -1,13 +1,36 @@
 # /security.py
 
+import asyncio
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from jose import jwt
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from config import settings
+from metrics import Counter, Gauge, Histogram
 
 # Explicitly set the default scheme for hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", default="argon2")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    default="argon2",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# --- Password Hashing Pool ---
+hash_duration_seconds = Histogram("password_hash_duration_seconds", "Time spent computing an Argon2 hash or verification.")
+hash_queue_wait_seconds = Histogram("password_hash_queue_wait_seconds", "Time a hashing job waited for a free worker.")
+hash_queue_depth = Gauge("password_hash_queue_depth", "Hashing jobs submitted and not yet finished.")
+hash_rejected_total = Counter("password_hash_rejected_total", "Hashing jobs rejected because the queue was full.")
+
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pending = 0
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a plain password against a hashed one."""
@@ -17,6 +40,78 @@ def get_password_hash(password: str) -> str:
     """Hashes a password using Argon2."""
     return pwd_context.hash(password)
 
+def _timed_call(fn, *args):
+    # Runs inside the worker process; wall-clock time is comparable across processes.
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time() - started
+
+def _reset_signals():
+    # A pool process must not inherit SIGTERM/SIGINT handlers that only set a flag the pool
+    # never checks: it would then outlive a shutdown of the server.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    # Created on first use so importing this module never spawns processes.
+    global _hash_pool
+    if _hash_pool is None:
+        # Not fork: the server runs threads (the executor's own, the DB drivers'), and a child
+        # forked while one of them holds a lock inherits it locked. The fork server is a clean
+        # single-threaded process that each pool process is forked from instead.
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.HASH_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_reset_signals,
+        )
+    return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        # Queued jobs are dropped; waiting for the running ones (one hash each) lets the pool
+        # release its semaphores instead of leaving them to the resource tracker.
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
+
+async def _run_in_hash_pool(fn, *args):
+    """
+    Runs `fn` in the hashing process pool, shedding load once too many jobs are pending.
+
+    Argon2 is deliberately expensive, so a burst of logins could otherwise queue up
+    behind each other for seconds; rejecting early with Retry-After keeps latency bounded.
+    """
+    global _hash_pending
+    if _hash_pending >= settings.HASH_QUEUE_LIMIT:
+        hash_rejected_total.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry shortly.",
+            headers={"Retry-After": str(settings.HASH_RETRY_AFTER_SECONDS)},
+        )
+
+    _hash_pending += 1
+    hash_queue_depth.set(_hash_pending)
+    submitted = time.time()
+    try:
+        loop = asyncio.get_running_loop()
+        result, started, duration = await loop.run_in_executor(_get_hash_pool(), _timed_call, fn, *args)
+    finally:
+        _hash_pending -= 1
+        hash_queue_depth.set(_hash_pending)
+
+    hash_queue_wait_seconds.observe(max(0.0, started - submitted))
+    hash_duration_seconds.observe(duration)
+    return result
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a password in the hashing pool without blocking the event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hashes a password in the hashing pool without blocking the event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """Creates a new JWT access token."""
     to_encode = data.copy()
@@ -26,6 +121,29 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
         # Default to a 15-minute expiration if not provided
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "typ": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def create_refresh_token(data: dict) -> str:
+    """Creates a long-lived JWT that can only be exchanged for new access tokens."""
+    to_encode = data.copy()
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "typ": "refresh"})
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_token(token: str, expected_type: str = "access") -> dict:
+    """Verifies a JWT's signature, expiry and type, raising 401 if any check fails."""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    # Tokens issued before refresh tokens existed carry no type and are access tokens.
+    if payload.get("typ", "access") != expected_type or not payload.get("sub"):
+        raise credentials_exception
+    return payload
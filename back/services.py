@@ -1,20 +1,32 @@
 # /services.py
 
-import json
+import asyncio
+import hashlib
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-import google.generativeai as genai
 from fastapi import HTTPException, status
-from sqlmodel import Session, select, or_
+from sqlmodel import insert, select, update, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+import ai_output
+from ai_stream import JSONArrayStreamParser
+from cache import SingleFlight, create_cache_backend
+from circuit_breaker import CircuitBreaker
 from config import settings
-from models import User, Mission, Task
-from schemas import UserCreate, MissionWithTasksCreate
-from security import get_password_hash, verify_password
+import events
+import leaderboard
+from metrics import Counter, Histogram
+from models import User, Mission, Task, MissionParticipant, TaskCompletion
+from schemas import UserCreate, MissionWithTasksCreate, TaskSuggestion
+from security import get_password_hash_async, verify_password_async
 
-# --- AI Planner Configuration ---
-if settings.GOOGLE_API_KEY:
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
+logger = logging.getLogger(__name__)
 
+# --- AI Planner Configuration ---
 SYSTEM_PROMPT = """
 You are 'QuestMaster', a friendly and expert project planner designed specifically to help students succeed. Your mission is to take a student's project goal and break it down into a series of clear, manageable, and motivating tasks presented as a quest.
 
@@ -76,13 +88,36 @@ Your Output:
   }
 ]
 """
+SYSTEM_PROMPT_HASH = hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()
+
+ai_cache = create_cache_backend(
+    settings.AI_CACHE_URL, max_entries=settings.AI_CACHE_MAX_ENTRIES, ttl=settings.AI_CACHE_TTL_SECONDS
+)
+_ai_inflight = SingleFlight()
+_ai_model = None
+
+# Caps concurrent upstream calls so a slow Gemini cannot absorb every worker.
+_ai_semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+_ai_calls_in_flight = 0
+ai_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=settings.AI_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.AI_BREAKER_RESET_SECONDS,
+)
+
+ai_request_duration_seconds = Histogram(
+    "ai_request_duration_seconds", "Time for an upstream Gemini generation.", ("mode", "outcome")
+)
+ai_tokens_total = Counter("ai_tokens_total", "Tokens reported in Gemini usage metadata.", ("kind",))
+ai_output_total = Counter("ai_output_total", "Planner responses by how they were parsed (see ai_output.py).", ("outcome",))
+
 # --- User & Auth Services ---
 
-def create_user(session: Session, user_in: UserCreate) -> User:
+async def create_user(session: AsyncSession, user_in: UserCreate) -> User:
     """Creates a new user in the database."""
-    existing_user = session.exec(
+    existing_user = (await session.exec(
         select(User).where(or_(User.username == user_in.username, User.email == user_in.email))
-    ).first()
+    )).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -90,68 +125,405 @@ def create_user(session: Session, user_in: UserCreate) -> User:
         )
 
     user_dict = user_in.model_dump()
-    user_dict["password"] = get_password_hash(user_in.password)
+    user_dict["password"] = await get_password_hash_async(user_in.password)
     
     db_user = User.model_validate(user_dict)
     
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
     return db_user
 
-def authenticate_user(session: Session, username: str, password: str) -> User | None:
+async def authenticate_user(session: AsyncSession, username: str, password: str) -> User | None:
     """Authenticates a user by checking username and password."""
-    user = session.exec(select(User).where(User.username == username)).first()
+    user = (await session.exec(select(User).where(User.username == username))).first()
     if not user:
         return None
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         return None
     
     return user
 
 # --- AI Planner Service ---
 
-def plan_mission_with_ai(prompt: str) -> list:
-    if not settings.GOOGLE_API_KEY:
+def get_ai_model():
+    """Returns the process-wide generative model, building it on first use."""
+    global _ai_model
+    if _ai_model is None:
+        if settings.AI_BACKEND == "fake":
+            from fake_gemini import FakeGenerativeModel
+            _ai_model = FakeGenerativeModel(
+                settings.GEMINI_MODEL,
+                latency=settings.FAKE_GEMINI_LATENCY_SECONDS,
+                failure_rate=settings.FAKE_GEMINI_FAILURE_RATE,
+            )
+        else:
+            # Importado aqui: o SDK do Gemini é pesado e só é necessário na primeira chamada ao planner.
+            import google.generativeai as genai
+            genai.configure(api_key=settings.GOOGLE_API_KEY)
+            _ai_model = genai.GenerativeModel(settings.GEMINI_MODEL)
+    return _ai_model
+
+def ai_cache_key(prompt: str) -> str:
+    """Cache key for a prompt: whitespace/case-normalized text plus the model and system prompt versions."""
+    normalized = " ".join(prompt.split()).casefold()
+    return hashlib.sha256(f"{settings.GEMINI_MODEL}\0{SYSTEM_PROMPT_HASH}\0{normalized}".encode()).hexdigest()
+
+def _full_prompt(prompt: str) -> str:
+    return f"{SYSTEM_PROMPT}\nUser's Request: \"{prompt}\"\nYour Output:"
+
+def _generation_config() -> dict | None:
+    if not settings.AI_RESPONSE_SCHEMA:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": ai_output.RESPONSE_SCHEMA}
+
+def ensure_ai_configured():
+    if settings.AI_BACKEND == "gemini" and not settings.GOOGLE_API_KEY:
         raise HTTPException(status_code=500, detail="Google API Key is not configured.")
+
+def _ai_unavailable(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def ensure_ai_available():
+    """Fails fast with 503 while the circuit breaker is open."""
+    if ai_breaker.state == CircuitBreaker.OPEN:
+        raise _ai_unavailable("AI service is temporarily unavailable.", ai_breaker.retry_after())
+
+def ai_status() -> dict:
+    return {
+        "circuit": ai_breaker.snapshot(),
+        "in_flight": _ai_calls_in_flight,
+        "max_concurrency": settings.AI_MAX_CONCURRENCY,
+    }
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
+@asynccontextmanager
+async def _ai_call_slot():
+    """
+    Admits one upstream call and yields its deadline (event-loop time).
+
+    The caller must record the outcome on `ai_breaker`. Waiting for a concurrency slot is
+    bounded separately and rejected with 503, so local saturation never trips the breaker.
+    """
+    global _ai_calls_in_flight
+    if not ai_breaker.allow():
+        raise _ai_unavailable("AI service is temporarily unavailable.", ai_breaker.retry_after())
+    try:
+        await asyncio.wait_for(_ai_semaphore.acquire(), timeout=settings.AI_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        ai_breaker.release()
+        raise _ai_unavailable("AI service is busy, please retry shortly.", 1)
+
+    deadline = asyncio.get_running_loop().time() + settings.AI_TIMEOUT_SECONDS
+    _ai_calls_in_flight += 1
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        full_prompt = f"{SYSTEM_PROMPT}\nUser's Request: \"{prompt}\"\nYour Output:"
-        response = model.generate_content(full_prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
-        tasks = json.loads(cleaned_response)
-        return tasks if isinstance(tasks, list) else []
-    except Exception as e:
-        print(f"An error occurred with the Gemini API: {e}")
+        yield deadline
+    except BaseException:
+        # Calls that end without a recorded outcome (cancelled, client gone) free the probe slot.
+        ai_breaker.release()
+        raise
+    finally:
+        _ai_calls_in_flight -= 1
+        _ai_semaphore.release()
+
+def _record_ai_call(mode: str, outcome: str, started: float, usage=None):
+    ai_request_duration_seconds.labels(mode, outcome).observe(time.perf_counter() - started)
+    if usage is not None:
+        ai_tokens_total.labels("prompt").inc(getattr(usage, "prompt_token_count", 0) or 0)
+        ai_tokens_total.labels("completion").inc(getattr(usage, "candidates_token_count", 0) or 0)
+
+async def _generate_plan(key: str, prompt: str) -> list:
+    model = get_ai_model()
+    async with _ai_call_slot() as deadline:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(_full_prompt(prompt), generation_config=_generation_config()),
+                timeout=_remaining(deadline),
+            )
+            text = response.text
+        except asyncio.TimeoutError:
+            ai_breaker.record_failure()
+            _record_ai_call("generate", "timeout", started)
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="AI service timed out.")
+        except Exception:
+            ai_breaker.record_failure()
+            _record_ai_call("generate", "error", started)
+            logger.exception("An error occurred with the Gemini API")
+            raise HTTPException(status_code=503, detail="AI service is currently unavailable.")
+        ai_breaker.record_success()
+        _record_ai_call("generate", "ok", started, getattr(response, "usage_metadata", None))
+
+    # Whatever can be salvaged is kept: a retry would pay for a whole new generation.
+    parsed = ai_output.parse_tasks(text)
+    ai_output_total.labels(parsed.outcome).inc()
+    if not parsed.tasks:
+        logger.warning("Could not parse the Gemini response: %r", text[:200])
         raise HTTPException(status_code=503, detail="AI service is currently unavailable.")
+    await ai_cache.set(key, parsed.tasks, settings.AI_CACHE_TTL_SECONDS)
+    return parsed.tasks
+
+async def plan_mission_with_ai(prompt: str) -> list:
+    ensure_ai_configured()
+    key = ai_cache_key(prompt)
+    cached = await ai_cache.get(key)
+    if cached is not None:
+        return cached
+    # Concurrent identical prompts share a single upstream generation.
+    return await _ai_inflight.do(key, lambda: _generate_plan(key, prompt))
+
+async def stream_mission_plan(prompt: str):
+    """
+    Yields each task suggestion as soon as the model finishes generating it.
+
+    Objects are parsed out of the streamed JSON array one by one, repaired and normalized
+    like in `ai_output.parse_tasks`; unusable ones are skipped. If the output held no
+    array at all, the whole text goes through `parse_tasks` once it is complete. Upstream
+    failures after the stream has started are reported as a final `{"error": ...}` item
+    since the status is already sent.
+
+    The upstream call runs in a task of its own that hands the tasks over through a
+    queue: the AI concurrency slot is freed as soon as the model is done, however slowly
+    the client reads. A client that leaves early cancels the call.
+    """
+    key = ai_cache_key(prompt)
+    cached = await ai_cache.get(key)
+    if cached is not None:
+        for task in cached:
+            yield TaskSuggestion.model_validate(task).model_dump()
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.create_task(_stream_plan(key, prompt, queue.put_nowait))
+    producer.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (item := await queue.get()) is not None:
+            yield item
+        await producer
+    finally:
+        producer.cancel()
+
+async def _stream_plan(key: str, prompt: str, emit):
+    """The upstream side of `stream_mission_plan`: calls `emit` with each item to send."""
+    parser = JSONArrayStreamParser(loads=ai_output.loads_lenient)
+    tasks = []
+    chunk_texts = []
+    try:
+        async with _ai_call_slot() as deadline:
+            started = time.perf_counter()
+            usage = None
+            try:
+                response = await asyncio.wait_for(
+                    get_ai_model().generate_content_async(
+                        _full_prompt(prompt), stream=True, generation_config=_generation_config()
+                    ),
+                    timeout=_remaining(deadline),
+                )
+                chunks = aiter(response)
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), timeout=_remaining(deadline))
+                    except StopAsyncIteration:
+                        break
+                    # Usage metadata is cumulative; the last chunk carries the totals.
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    chunk_texts.append(chunk.text)
+                    for candidate in parser.feed(chunk.text):
+                        task = ai_output.normalize_task(candidate)
+                        if task is not None:
+                            tasks.append(task)
+                            emit(TaskSuggestion.model_validate(task).model_dump())
+            except asyncio.TimeoutError:
+                ai_breaker.record_failure()
+                _record_ai_call("stream", "timeout", started, usage)
+                emit({"error": "AI service timed out."})
+                return
+            except Exception:
+                ai_breaker.record_failure()
+                _record_ai_call("stream", "error", started, usage)
+                logger.exception("An error occurred with the Gemini API")
+                emit({"error": "AI service is currently unavailable."})
+                return
+            ai_breaker.record_success()
+            _record_ai_call("stream", "ok", started, usage)
+    except HTTPException as e:
+        emit({"error": e.detail})
+        return
+    if not tasks:
+        parsed = ai_output.parse_tasks("".join(chunk_texts))
+        ai_output_total.labels(parsed.outcome).inc()
+        tasks = parsed.tasks
+        for task in tasks:
+            emit(TaskSuggestion.model_validate(task).model_dump())
+        if not tasks:
+            emit({"error": "AI service is currently unavailable."})
+            return
+    await ai_cache.set(key, tasks, settings.AI_CACHE_TTL_SECONDS)
 
 # --- Mission Services ---
 
-def create_mission_with_tasks(session: Session, mission_data: MissionWithTasksCreate) -> Mission:
+def _mission_rows(missions: list[MissionWithTasksCreate]) -> tuple[list[dict], list[dict]]:
+    """
+    Builds plain insert rows for missions and their tasks.
+
+    UUIDs and timestamps are generated client-side so child rows can reference their
+    mission without waiting for the database to hand back generated keys.
+    """
+    now = datetime.now(timezone.utc)
+    mission_rows, task_rows = [], []
+    for mission_data in missions:
+        mission_id = uuid.uuid4()
+        mission_rows.append({
+            **mission_data.model_dump(exclude={"tasks"}),
+            "id": mission_id,
+            "status": "active",
+            "isActive": True,
+            "createdAt": now,
+            "updatedAt": now,
+        })
+        for task_data in mission_data.tasks:
+            task_rows.append({
+                **task_data.model_dump(),
+                "id": uuid.uuid4(),
+                "missionId": mission_id,
+                "createdAt": now,
+                "updatedAt": now,
+            })
+    return mission_rows, task_rows
+
+async def create_missions_with_tasks(session: AsyncSession, missions: list[MissionWithTasksCreate]) -> list[dict]:
+    """
+    Creates many missions and all of their tasks in one transaction.
+
+    Each table is written with a single executemany INSERT, so the statement count stays
+    constant no matter how many missions or tasks are in the payload.
+    """
+    mission_rows, task_rows = _mission_rows(missions)
+    if mission_rows:
+        await session.exec(insert(Mission), params=mission_rows)
+    if task_rows:
+        await session.exec(insert(Task), params=task_rows)
+    await session.commit()
+    return mission_rows
+
+async def create_mission_with_tasks(session: AsyncSession, mission_data: MissionWithTasksCreate) -> dict:
     """Creates a new mission and its associated tasks in a single transaction."""
-    mission_dict = mission_data.model_dump(exclude={"tasks"})
-    
-    new_mission = Mission.model_validate(mission_dict)
-    
-    session.add(new_mission)
-    session.commit()
-    session.refresh(new_mission)
-
-    for task_suggestion in mission_data.tasks:
-        # CORRIGIDO: A variável correta é 'task_suggestion', não 'task.data'
-        new_task = Task(
-            title=task_suggestion.title,
-            description=task_suggestion.description,
-            points=task_suggestion.points,
-            deadline=task_suggestion.deadline,
-            completed=task_suggestion.completed,
-            isFinal=task_suggestion.isFinal,
-            bossType=task_suggestion.bossType,
-            bossName=task_suggestion.bossName,
-            missionId=new_mission.id,
+    created = await create_missions_with_tasks(session, [mission_data])
+    return created[0]
+
+# --- Task Completion ---
+
+async def touch_mission(session: AsyncSession, mission_id: uuid.UUID) -> int | None:
+    """Bumps a mission's version inside the caller's transaction so cached ETags go stale. Returns the new version."""
+    result = await session.exec(
+        update(Mission)
+        .where(Mission.id == mission_id)
+        .values(version=Mission.version + 1, updatedAt=datetime.now(timezone.utc))
+        .returning(Mission.version)
+    )
+    return result.scalar_one_or_none()
+
+def _insert_ignoring_conflicts(session: AsyncSession, model):
+    """INSERT ... ON CONFLICT DO NOTHING for the session's backend (PostgreSQL or SQLite)."""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model).on_conflict_do_nothing()
+
+async def complete_tasks(session: AsyncSession, mission_id: uuid.UUID, completions: list[tuple[uuid.UUID, uuid.UUID]]) -> list[dict]:
+    """
+    Completes (task_id, user_id) pairs of a mission and credits each task's points to its user.
+
+    Everything happens in one transaction and without read-modify-write in Python:
+    the completion rows are inserted with ON CONFLICT DO NOTHING, so only pairs that
+    were not completed before come back from RETURNING and earn points, and each
+    user's total is raised with a single `total_points = total_points + :points`.
+    Repeating a completion is therefore harmless, however many requests race on it.
+    """
+    pairs = list(dict.fromkeys(completions))
+    task_ids = {task_id for task_id, _ in pairs}
+    user_ids = {user_id for _, user_id in pairs}
+
+    points_by_task = dict((await session.exec(
+        select(Task.id, Task.points).where(Task.missionId == mission_id, Task.id.in_(task_ids))
+    )).all())
+    if missing := task_ids - points_by_task.keys():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Task not found: {', '.join(map(str, missing))}")
+    participants = set((await session.exec(
+        select(MissionParticipant.user_id).where(MissionParticipant.mission_id == mission_id, MissionParticipant.user_id.in_(user_ids))
+    )).all())
+    if missing := user_ids - participants:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User is not a participant in this mission: {', '.join(map(str, missing))}",
         )
-        session.add(new_task)
-    
-    session.commit()
-    session.refresh(new_mission)
-    return new_mission
\ No newline at end of file
+
+    # Rows are written in key order so concurrent batches take their locks in the same order.
+    now = datetime.now(timezone.utc)
+    inserted = (await session.exec(
+        _insert_ignoring_conflicts(session, TaskCompletion)
+        .values([
+            {"task_id": task_id, "user_id": user_id, "points": points_by_task[task_id], "completed_at": now}
+            for task_id, user_id in sorted(pairs)
+        ])
+        .returning(TaskCompletion.task_id, TaskCompletion.user_id)
+    )).all()
+    awarded = {(task_id, user_id) for task_id, user_id in inserted}
+
+    points_by_user: dict[uuid.UUID, int] = {}
+    for task_id, user_id in awarded:
+        points_by_user[user_id] = points_by_user.get(user_id, 0) + points_by_task[task_id]
+    totals = {}
+    for user_id, points in sorted(points_by_user.items()):
+        totals[user_id] = await leaderboard.award_points(session, mission_id, user_id, points)
+    version = None
+    if awarded:
+        await session.exec(
+            update(Task)
+            .where(Task.id.in_({task_id for task_id, _ in awarded}), Task.completed == False)
+            .values(completed=True, updatedAt=now)
+        )
+        version = await touch_mission(session, mission_id)
+    if missing_totals := user_ids - totals.keys():
+        totals.update((await session.exec(
+            select(MissionParticipant.user_id, MissionParticipant.total_points)
+            .where(MissionParticipant.mission_id == mission_id, MissionParticipant.user_id.in_(missing_totals))
+        )).all())
+    await session.commit()
+
+    for user_id in points_by_user:
+        await leaderboard.publish_points(session, mission_id, user_id, totals[user_id])
+    for task_id, user_id in pairs:
+        if (task_id, user_id) in awarded:
+            await events.publish_mission_event(
+                mission_id, events.TASK_COMPLETED, version,
+                {"task_id": task_id, "user_id": user_id, "points": points_by_task[task_id]},
+            )
+    for user_id in points_by_user:
+        position = await leaderboard.mission_rank(session, mission_id, user_id)
+        if position is not None:
+            await events.publish_mission_event(
+                mission_id, events.RANK_CHANGED, version, {"user_id": user_id, "rank": position[0], "total_points": position[1]}
+            )
+
+    return [
+        {
+            "task_id": task_id,
+            "user_id": user_id,
+            "points": points_by_task[task_id],
+            "awarded": (task_id, user_id) in awarded,
+            "total_points": totals[user_id],
+        }
+        for task_id, user_id in pairs
+    ]
+
+async def complete_task(session: AsyncSession, mission_id: uuid.UUID, task_id: uuid.UUID, user_id: uuid.UUID) -> dict:
+    """Completes one task for one user; see `complete_tasks`."""
+    return (await complete_tasks(session, mission_id, [(task_id, user_id)]))[0]
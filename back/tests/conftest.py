@@ -0,0 +1,53 @@
+# /tests/conftest.py
+"""
+Shared fixtures: one throwaway SQLite database, migrated to head, and one TestClient
+for the whole session, with the offline Gemini client and no rate limiting.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+# Set before config.py is imported by anything below.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/tests.db"
+os.environ["AI_BACKEND"] = "fake"
+os.environ.setdefault("ARGON2_MEMORY_COST", "8192")
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["ADMISSION_SLO_SECONDS"] = "0"
+os.environ["WORKER_STATUS_DIR"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def app():
+    from database import run_migrations
+
+    run_migrations()
+    import main
+
+    return main.app
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+def create_user(client: TestClient) -> dict:
+    suffix = uuid.uuid4().hex[:12]
+    response = client.post("/users/", json={
+        "email": f"test{suffix}@example.com", "username": f"test{suffix}", "name": "Test", "password": "test-pass",
+    })
+    response.raise_for_status()
+    return response.json()
+
+def create_mission(client: TestClient, creator_id: str, tasks: int = 3, participants: list[str] = ()) -> dict:
+    specs = [{"title": f"Task {i}", "points": 10 * (i + 1)} for i in range(tasks)]
+    response = client.post("/missions/with-tasks", json={"mission": {"name": "Test mission", "createdById": creator_id, "tasks": specs}})
+    response.raise_for_status()
+    mission = response.json()
+    for user_id in participants:
+        client.post(f"/missions/{mission['id']}/participants", json={"user_id": user_id}).raise_for_status()
+    return mission
@@ -0,0 +1,169 @@
+# /tests/test_ai_planner.py
+"""
+/ai/plan-mission and the background jobs against the offline Gemini client:
+malformed output, upstream errors and timeouts, the circuit breaker, and the
+job retries. Each test gets a fresh fake model and breaker, and its own prompt
+so the planner cache never answers for another test.
+"""
+
+import time
+import uuid
+
+import pytest
+from prometheus_client import REGISTRY
+
+import ai_output
+import services
+from circuit_breaker import CircuitBreaker
+from config import settings
+from conftest import create_user
+from fake_gemini import FakeGenerativeModel, FakeUpstreamError
+
+BREAKER_THRESHOLD = 3
+
+@pytest.fixture
+def model(client, monkeypatch):
+    fake = FakeGenerativeModel(settings.GEMINI_MODEL)
+    monkeypatch.setattr(services, "_ai_model", fake)
+    monkeypatch.setattr(services, "ai_breaker", CircuitBreaker("gemini", BREAKER_THRESHOLD, reset_timeout=60))
+    return fake
+
+def reply_with(monkeypatch, model: FakeGenerativeModel, text: str):
+    monkeypatch.setattr(model, "_text_for", lambda contents, generation_config=None: text)
+
+def fail_first(monkeypatch, model: FakeGenerativeModel, failures: int):
+    def maybe_fail():
+        if model.calls <= failures:
+            raise FakeUpstreamError("Injected upstream fault.")
+
+    monkeypatch.setattr(model, "_maybe_fail", maybe_fail)
+
+def new_prompt() -> str:
+    return f"Plan my science fair project {uuid.uuid4().hex}"
+
+def plan(client, prompt: str | None = None):
+    return client.post("/ai/plan-mission", json={"prompt": prompt or new_prompt()})
+
+def parsed(outcome: str) -> float:
+    return REGISTRY.get_sample_value("ai_output_total", {"outcome": outcome}) or 0.0
+
+def test_plan(client, model):
+    response = plan(client)
+    assert response.status_code == 200
+    tasks = response.json()
+    assert len(tasks) == 5
+    assert all(task["title"] and 10 <= task["points"] <= 100 for task in tasks)
+
+def test_plan_is_cached(client, model):
+    prompt = new_prompt()
+    first = plan(client, prompt)
+    # Same prompt up to whitespace and case.
+    second = plan(client, f"  {prompt.upper()} ")
+    assert first.json() == second.json()
+    assert model.calls == 1
+
+@pytest.mark.parametrize("text, expected, outcome", [
+    ('```json\n[{"title": "A", "description": "a", "points": 20,}, {"title": "B", "description": "b", "points": 30},]\n```', 2, ai_output.REPAIRED),
+    ('[{"title": "A", "description": "a", "points": 20}, {"title": "B", "description": "b", "po', 1, ai_output.PARTIAL),
+    ('[{"title": "A", "description": "a", "points": 20}, {"title": "", "points": 30}]', 1, ai_output.PARTIAL),
+])
+def test_malformed_output_is_salvaged(client, model, monkeypatch, text, expected, outcome):
+    reply_with(monkeypatch, model, text)
+    before = parsed(outcome)
+    response = plan(client)
+    assert response.status_code == 200
+    assert len(response.json()) == expected
+    assert parsed(outcome) == before + 1
+    assert model.calls == 1
+
+def test_unusable_output_is_not_cached(client, model, monkeypatch):
+    prompt = new_prompt()
+    reply_with(monkeypatch, model, "I'm sorry, but I can't help with planning that.")
+    response = plan(client, prompt)
+    assert response.status_code == 503
+    # A well-formed output is not an upstream failure.
+    assert services.ai_breaker.consecutive_failures == 0
+
+    del model._text_for  # back to the fake's own plan
+    assert plan(client, prompt).status_code == 200
+    assert model.calls == 2
+
+def test_upstream_error(client, model):
+    model.failure_rate = 1.0
+    response = plan(client)
+    assert response.status_code == 503
+    assert services.ai_breaker.consecutive_failures == 1
+
+def test_timeout(client, model, monkeypatch):
+    monkeypatch.setattr(settings, "AI_TIMEOUT_SECONDS", 0.05)
+    model.latency = 1.0
+    started = time.perf_counter()
+    response = plan(client)
+    assert response.status_code == 504
+    assert time.perf_counter() - started < 1.0
+    assert services.ai_breaker.consecutive_failures == 1
+
+def test_open_circuit_fails_fast(client, model):
+    model.failure_rate = 1.0
+    for _ in range(BREAKER_THRESHOLD):
+        assert plan(client).status_code == 503
+    assert services.ai_breaker.state == CircuitBreaker.OPEN
+
+    response = plan(client)
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
+    assert model.calls == BREAKER_THRESHOLD
+    assert client.get("/ai/status").json()["circuit"]["state"] == CircuitBreaker.OPEN
+    stream = client.post("/ai/plan-mission/stream", json={"prompt": new_prompt()})
+    assert stream.status_code == 503
+
+def test_half_open_probe_closes_the_circuit(client, model):
+    model.failure_rate = 1.0
+    for _ in range(BREAKER_THRESHOLD):
+        plan(client)
+    services.ai_breaker.reset_timeout = 0
+    assert services.ai_breaker.state == CircuitBreaker.HALF_OPEN
+
+    model.failure_rate = 0.0
+    assert plan(client).status_code == 200
+    assert services.ai_breaker.state == CircuitBreaker.CLOSED
+
+def test_short_prompt(client, model):
+    assert plan(client, "too short").status_code == 400
+    assert model.calls == 0
+
+# --- Background jobs ---
+
+@pytest.fixture
+def headers(client):
+    user = create_user(client)
+    login = client.post("/auth/login", data={"username": user["username"], "password": "test-pass"})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+def wait_for_job(client, headers, job_id: str, timeout: float = 10) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/ai/jobs/{job_id}", headers=headers).json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} still {job['status']} after {timeout}s")
+
+def test_job_retries_upstream_errors(client, model, monkeypatch, headers):
+    monkeypatch.setattr(settings, "AI_JOB_BACKOFF_SECONDS", 0.01)
+    fail_first(monkeypatch, model, failures=1)
+    submitted = client.post("/ai/jobs", json={"prompt": new_prompt()}, headers=headers)
+    assert submitted.status_code == 202
+    job = wait_for_job(client, headers, submitted.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+    assert len(job["result"]) == 5
+
+def test_job_fails_after_max_attempts(client, model, monkeypatch, headers):
+    monkeypatch.setattr(settings, "AI_JOB_BACKOFF_SECONDS", 0.01)
+    fail_first(monkeypatch, model, failures=settings.AI_JOB_MAX_ATTEMPTS)
+    submitted = client.post("/ai/jobs", json={"prompt": new_prompt()}, headers=headers)
+    job = wait_for_job(client, headers, submitted.json()["id"])
+    assert job["status"] == "failed"
+    assert job["attempts"] == settings.AI_JOB_MAX_ATTEMPTS
+    assert model.calls == settings.AI_JOB_MAX_ATTEMPTS
@@ -0,0 +1,115 @@
+# /tests/test_ai_stream.py
+"""
+Streamed planning: the incremental JSON array parser on awkward chunking, and
+/ai/plan-mission/stream against the offline Gemini client.
+"""
+
+import asyncio
+import json
+import uuid
+
+import pytest
+
+import ai_output
+import services
+from ai_stream import JSONArrayStreamParser
+from circuit_breaker import CircuitBreaker
+from config import settings
+from fake_gemini import FakeGenerativeModel
+
+def parse(chunks: list[str], loads=json.loads) -> list:
+    parser = JSONArrayStreamParser(loads=loads)
+    return [obj for chunk in chunks for obj in parser.feed(chunk)]
+
+def one_char_at_a_time(text: str) -> list[str]:
+    return list(text)
+
+# --- Parser ---
+
+def test_objects_split_mid_token():
+    text = '```json\n[{"title": "Plan", "points": 20}, {"title": "Build", "points": 30}]\n```'
+    expected = [{"title": "Plan", "points": 20}, {"title": "Build", "points": 30}]
+    assert parse([text]) == expected
+    assert parse(one_char_at_a_time(text)) == expected
+    assert parse([text[:17], text[17:40], text[40:]]) == expected
+
+def test_each_object_is_returned_as_soon_as_it_closes():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+
+def test_escaped_strings():
+    objects = [
+        {"title": 'Say "hi" {not an object}', "description": "back\\slash \\", "points": 10},
+        {"title": "tab\tnewline\n", "description": "}]", "points": 20},
+    ]
+    text = json.dumps(objects)
+    assert parse(one_char_at_a_time(text)) == objects
+    # The escape falls at a chunk boundary.
+    cut = text.index('\\"')
+    assert parse([text[:cut + 1], text[cut + 1:]]) == objects
+
+def test_nested_objects_are_kept_whole():
+    text = '[{"title": "A", "meta": {"x": {"y": 1}}}, {"title": "B"}]'
+    assert parse(one_char_at_a_time(text)) == [{"title": "A", "meta": {"x": {"y": 1}}}, {"title": "B"}]
+
+def test_trailing_junk_is_ignored():
+    assert parse(['[{"title": "A"}]\n```\nHope this helps!']) == [{"title": "A"}]
+    assert parse(['[{"title": "A"}]\n```\n{"unfinished": "obj']) == [{"title": "A"}]
+
+def test_truncated_input_yields_the_complete_objects():
+    text = '[{"title": "A", "points": 10}, {"title": "B", "po'
+    assert parse(one_char_at_a_time(text)) == [{"title": "A", "points": 10}]
+
+def test_rejected_objects_are_skipped():
+    text = '[{"title": "A",}, {bad}, {"title": "B"}]'
+    assert parse([text]) == [{"title": "B"}]
+    assert parse([text], loads=ai_output.loads_lenient)[0] == {"title": "A"}
+
+# --- Endpoint ---
+
+@pytest.fixture
+def model(client, monkeypatch):
+    fake = FakeGenerativeModel(settings.GEMINI_MODEL)
+    monkeypatch.setattr(services, "_ai_model", fake)
+    monkeypatch.setattr(services, "ai_breaker", CircuitBreaker("gemini", 3, reset_timeout=60))
+    return fake
+
+def new_prompt() -> str:
+    return f"Plan my science fair project {uuid.uuid4().hex}"
+
+def stream(client, prompt: str) -> list[dict]:
+    response = client.post("/ai/plan-mission/stream", json={"prompt": prompt})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_stream(client, model):
+    prompt = new_prompt()
+    tasks = stream(client, prompt)
+    assert len(tasks) == 5
+    assert all(task["title"] for task in tasks)
+    # Cached once complete: the same tasks, without another call.
+    assert stream(client, prompt) == tasks
+    assert model.calls == 1
+
+def test_upstream_error_is_the_last_line(client, model):
+    model.failure_rate = 1.0
+    assert stream(client, new_prompt()) == [{"error": "AI service is currently unavailable."}]
+
+def test_slow_reader_does_not_hold_the_ai_slot(client, model):
+    async def read_one_then_wait():
+        plan = services.stream_mission_plan(new_prompt())
+        first = await anext(plan)
+        # The reader stalls; the upstream call finishes without it.
+        for _ in range(100):
+            if services._ai_calls_in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        in_flight = services._ai_calls_in_flight
+        rest = [item async for item in plan]
+        return first, in_flight, rest
+
+    first, in_flight, rest = client.portal.call(read_one_then_wait)
+    assert in_flight == 0
+    assert len([first, *rest]) == 5
@@ -0,0 +1,96 @@
+# /tests/test_archive.py
+"""
+Archived missions in the user's mission list and in search, next to the hot set:
+finished missions stay visible from the archive, deleted ones nowhere.
+"""
+
+import contextlib
+import uuid
+
+import pytest
+from sqlmodel import update
+
+import archive
+import manage
+from conftest import create_user
+from database import all_async_engines, async_session_maker, engine
+from models import Mission
+from query_counter import count_queries
+
+@pytest.fixture
+def word() -> str:
+    return f"w{uuid.uuid4().hex[:10]}"
+
+def create_mission(client, creator_id: str, name: str, member_id: str) -> str:
+    mission = {"name": name, "createdById": creator_id, "tasks": [{"title": "Only task", "points": 10}]}
+    response = client.post("/missions/with-tasks", json={"mission": mission})
+    response.raise_for_status()
+    mission_id = response.json()["id"]
+    client.post(f"/missions/{mission_id}/participants", json={"user_id": member_id}).raise_for_status()
+    return mission_id
+
+def archive_now(client, *mission_ids: str):
+    """Finishes the missions and runs the archival job with no waiting period."""
+    async def run():
+        async with async_session_maker() as session:
+            ids = [uuid.UUID(mission_id) for mission_id in mission_ids]
+            await session.exec(update(Mission).where(Mission.id.in_(ids)).values(status="completed"))
+            await session.commit()
+            await archive.archive_missions(session, after_days=0, retention_days=0)
+
+    client.portal.call(run)
+
+@pytest.fixture
+def missions(client, word):
+    creator, member = create_user(client)["id"], create_user(client)["id"]
+    hot = create_mission(client, creator, f"Hot {word}", member)
+    archived = create_mission(client, creator, f"Archived {word}", member)
+    deleted = create_mission(client, creator, f"Deleted {word}", member)
+    client.delete(f"/missions/{deleted}").raise_for_status()
+    archive_now(client, archived, deleted)
+    return {"member": member, "hot": hot, "archived": archived, "deleted": deleted}
+
+def test_user_missions_include_the_archive(client, missions):
+    listed = client.get(f"/users/{missions['member']}/missions/").json()
+    assert [mission["id"] for mission in listed] == [missions["hot"], missions["archived"]]
+    assert listed[1]["tasks"][0]["title"] == "Only task"
+    assert [p["user_id"] for p in listed[1]["participants"]] == [missions["member"]]
+
+    slim = client.get(f"/users/{missions['member']}/missions/", params={"fields": "id,name"}).json()
+    assert slim[1] == {"id": missions["archived"], "name": listed[1]["name"]}
+
+def test_search_leaves_out_deleted_missions(client, missions, word):
+    hot = client.get("/search/missions", params={"q": word}).json()["items"]
+    assert [mission["id"] for mission in hot] == [missions["hot"]]
+    archived = client.get("/search/missions", params={"q": word, "archived": "true"}).json()["items"]
+    assert [mission["id"] for mission in archived] == [missions["archived"]]
+
+def test_search_leaves_out_tasks_of_deleted_missions(client, word):
+    creator = create_user(client)["id"]
+    kept = create_mission(client, creator, "Kept", creator)
+    dropped = create_mission(client, creator, "Dropped", creator)
+    for mission_id in (kept, dropped):
+        task = {"title": f"Task {word}", "points": 10}
+        client.post(f"/missions/{mission_id}/tasks/", json=task).raise_for_status()
+    client.delete(f"/missions/{dropped}").raise_for_status()
+    items = client.get("/search/tasks", params={"q": word}).json()["items"]
+    assert [item["missionId"] for item in items] == [kept]
+
+def test_archived_listing_leaves_the_payload_out(client, missions):
+    creator = client.get(f"/missions/{missions['hot']}").json()["createdById"]
+    with contextlib.ExitStack() as stack:
+        counters = [stack.enter_context(count_queries(async_engine)) for async_engine in all_async_engines()]
+        listed = client.get("/missions/", params={"archived": "true", "createdById": creator}).json()["items"]
+    assert {mission["id"] for mission in listed} == {missions["archived"], missions["deleted"]}
+    selects = [sql for counter in counters for sql in counter.statements if "missionarchive" in sql]
+    assert selects and not any("payload" in sql for sql in selects)
+
+def test_rebuild_search_restores_the_archive_index(client, missions, word):
+    def search_archive():
+        return client.get("/search/missions", params={"q": word, "archived": "true"}).json()["items"]
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO missionarchive_fts(missionarchive_fts) VALUES ('delete-all')")
+    assert search_archive() == []
+    assert manage.rebuild_search(None) == 0
+    assert [mission["id"] for mission in search_archive()] == [missions["archived"]]
@@ -0,0 +1,59 @@
+# /tests/test_bulk_missions.py
+"""
+POST /missions/bulk: many missions and their tasks in one transaction, within
+the per-request limits on missions, tasks per mission and tasks overall.
+"""
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import schemas
+import services
+from conftest import create_user
+
+def bulk(client, creator_id: str, missions: int, tasks: int):
+    payload = [
+        {"name": f"Bulk {m}", "createdById": creator_id, "tasks": [{"title": f"Task {t}", "points": 10} for t in range(tasks)]}
+        for m in range(missions)
+    ]
+    return client.post("/missions/bulk", json={"missions": payload})
+
+def missions_of(client, creator_id: str) -> list[dict]:
+    return client.get("/missions/", params={"createdById": creator_id, "limit": 200}).json()["items"]
+
+def test_bulk_create(client):
+    creator = create_user(client)["id"]
+    response = bulk(client, creator, missions=3, tasks=4)
+    assert response.status_code == 201
+    created = response.json()
+    assert [m["name"] for m in created] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+    assert {m["id"] for m in missions_of(client, creator)} == {m["id"] for m in created}
+    tasks = client.get(f"/missions/{created[0]['id']}/tasks/").json()["items"]
+    assert len(tasks) == 4
+
+def test_too_many_tasks_in_one_mission(client):
+    creator = create_user(client)["id"]
+    assert bulk(client, creator, missions=1, tasks=schemas.MAX_TASKS_PER_MISSION + 1).status_code == 422
+    assert missions_of(client, creator) == []
+
+def test_too_many_tasks_overall(client, monkeypatch):
+    monkeypatch.setattr(schemas, "MAX_BULK_TASKS", 10)
+    creator = create_user(client)["id"]
+    response = bulk(client, creator, missions=3, tasks=4)
+    assert response.status_code == 422
+    assert "At most 10 tasks" in response.text
+    assert missions_of(client, creator) == []
+
+def test_failed_insert_creates_nothing(client, monkeypatch):
+    creator = create_user(client)["id"]
+    build_rows = services._mission_rows
+
+    def broken_task(missions):
+        mission_rows, task_rows = build_rows(missions)
+        task_rows[-1]["points"] = None  # NOT NULL: the task INSERT fails after the missions went in
+        return mission_rows, task_rows
+
+    monkeypatch.setattr(services, "_mission_rows", broken_task)
+    with pytest.raises(IntegrityError):
+        bulk(client, creator, missions=3, tasks=2)
+    assert missions_of(client, creator) == []
@@ -0,0 +1,88 @@
+# /tests/test_completions.py
+"""
+Concurrent task completions: every (task, user) pair is awarded exactly once and
+each participant's total_points is exactly the sum of their completions, however
+the calls for the same and for different users interleave.
+"""
+
+import asyncio
+import random
+import uuid
+
+import pytest
+from sqlmodel import func, select
+
+import services
+from conftest import create_mission, create_user
+from database import async_session_maker
+from models import MissionParticipant, TaskCompletion
+
+USERS = 4
+TASKS = 5
+DUPLICATES = 3
+
+@pytest.fixture
+def mission(client):
+    members = [create_user(client)["id"] for _ in range(USERS)]
+    mission = create_mission(client, create_user(client)["id"], tasks=TASKS, participants=members)
+    tasks = client.get(f"/missions/{mission['id']}/tasks/").json()["items"]
+    return {
+        "id": uuid.UUID(mission["id"]),
+        "members": [uuid.UUID(member) for member in members],
+        "points": {uuid.UUID(task["id"]): task["points"] for task in tasks},
+    }
+
+def complete_concurrently(client, mission_id: uuid.UUID, batches: list[list[tuple]]) -> list[dict]:
+    async def complete(batch):
+        async with async_session_maker() as session:
+            return await services.complete_tasks(session, mission_id, batch)
+
+    async def run():
+        results = await asyncio.gather(*(complete(batch) for batch in batches))
+        return [item for result in results for item in result]
+
+    return client.portal.call(run)
+
+def stored(client, mission_id: uuid.UUID, task_ids) -> tuple[dict, dict]:
+    async def run():
+        async with async_session_maker() as session:
+            totals = dict((await session.exec(
+                select(MissionParticipant.user_id, MissionParticipant.total_points)
+                .where(MissionParticipant.mission_id == mission_id)
+            )).all())
+            completions = dict((await session.exec(
+                select(TaskCompletion.user_id, func.count())
+                .where(TaskCompletion.task_id.in_(task_ids))
+                .group_by(TaskCompletion.user_id)
+            )).all())
+            return totals, completions
+
+    return client.portal.call(run)
+
+def test_parallel_completions(client, mission):
+    pairs = [(task_id, user_id) for task_id in mission["points"] for user_id in mission["members"]]
+    # Every pair several times over, in single completions and in batches mixing users.
+    requests = [[pair] for pair in pairs * DUPLICATES]
+    shuffled = pairs * DUPLICATES
+    random.Random(17).shuffle(shuffled)
+    requests += [shuffled[i:i + 7] for i in range(0, len(shuffled), 7)]
+    random.Random(42).shuffle(requests)
+
+    results = complete_concurrently(client, mission["id"], requests)
+
+    awarded = [(uuid.UUID(str(r["task_id"])), uuid.UUID(str(r["user_id"]))) for r in results if r["awarded"]]
+    assert sorted(awarded) == sorted(pairs)
+    totals, completions = stored(client, mission["id"], mission["points"].keys())
+    everything = sum(mission["points"].values())
+    assert totals == {user_id: everything for user_id in mission["members"]}
+    assert completions == {user_id: TASKS for user_id in mission["members"]}
+
+def test_parallel_completions_of_one_task(client, mission):
+    task_id, user_id = next(iter(mission["points"])), mission["members"][0]
+    results = complete_concurrently(client, mission["id"], [[(task_id, user_id)]] * 20)
+
+    assert sum(r["awarded"] for r in results) == 1
+    totals, completions = stored(client, mission["id"], [task_id])
+    assert totals[user_id] == mission["points"][task_id]
+    assert completions == {user_id: 1}
+    assert all(totals[other] == 0 for other in mission["members"][1:])
@@ -0,0 +1,158 @@
+# /tests/test_events.py
+"""
+Mission events over the WebSocket and the SSE stream, and the hub and Redis
+listener staying up when a handler or the subscription fails.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import events
+from config import settings
+from conftest import create_mission, create_user
+from routers import missions
+
+def wait_for_subscriber(mission_id: str):
+    channel = events.mission_channel(uuid.UUID(mission_id))
+    deadline = time.monotonic() + 5
+    while channel not in events.hub._channels:
+        assert time.monotonic() < deadline, "no subscriber"
+        time.sleep(0.01)
+
+@pytest.fixture
+def mission(client):
+    return create_mission(client, create_user(client)["id"], tasks=1)
+
+# --- WebSocket ---
+
+def test_websocket_receives_mission_events(client, mission):
+    member = create_user(client)["id"]
+    with client.websocket_connect(f"/missions/{mission['id']}/events") as websocket:
+        wait_for_subscriber(mission["id"])
+        client.post(f"/missions/{mission['id']}/tasks/", json={"title": "Live", "points": 5}).raise_for_status()
+        client.post(f"/missions/{mission['id']}/participants", json={"user_id": member}).raise_for_status()
+        created, joined = websocket.receive_json(), websocket.receive_json()
+
+    assert created["type"] == events.TASK_CREATED
+    assert created["mission_id"] == mission["id"]
+    assert created["data"]["title"] == "Live"
+    assert joined["type"] == events.PARTICIPANT_JOINED
+    assert joined["data"] == {"user_id": member, "total_points": 0}
+    assert joined["version"] > created["version"]
+
+def test_websocket_unsubscribes_on_disconnect(client, mission):
+    with client.websocket_connect(f"/missions/{mission['id']}/events"):
+        wait_for_subscriber(mission["id"])
+    channel = events.mission_channel(uuid.UUID(mission["id"]))
+    deadline = time.monotonic() + 5
+    while channel in events.hub._channels:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_websocket_unknown_mission(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/missions/{uuid.uuid4()}/events") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 4404
+
+# --- Server-Sent Events ---
+
+def test_sse_stream(client, mission, monkeypatch):
+    # TestClient reads a response to its end, so the endless stream is read in the app's loop.
+    monkeypatch.setattr(settings, "EVENTS_HEARTBEAT_SECONDS", 0.05)
+    mission_id = uuid.UUID(mission["id"])
+
+    async def read_stream():
+        response = await missions.handle_mission_events_stream(mission_id)
+        body = response.body_iterator
+        keepalive = await anext(body)
+        await events.publish_mission_event(mission_id, events.TASK_COMPLETED, 7, {"points": 10})
+        event = await anext(body)
+        await body.aclose()
+        return response.media_type, keepalive, event
+
+    media_type, keepalive, event = client.portal.call(read_stream)
+    assert media_type == "text/event-stream"
+    assert keepalive == ": keepalive\n\n"
+    assert event.startswith("data: ") and event.endswith("\n\n")
+    assert json.loads(event[len("data: "):]) == {
+        "type": events.TASK_COMPLETED, "mission_id": mission["id"], "version": 7, "data": {"points": 10},
+    }
+    assert events.mission_channel(mission_id) not in events.hub._channels
+
+def test_sse_unknown_mission(client):
+    assert client.get(f"/missions/{uuid.uuid4()}/events/stream").status_code == 404
+
+# --- Hub and broker ---
+
+def test_failing_handler_does_not_stop_dispatch(caplog):
+    hub = events.Hub()
+    received = []
+    hub.on("users", lambda message: 1 / 0)
+    hub.on("users", received.append)
+    subscription = events.Subscription("users", max_queue=10)
+    hub.add(subscription)
+
+    with caplog.at_level(logging.ERROR, logger="events"):
+        hub.dispatch("users", "hello")
+    hub.remove(subscription)
+
+    assert received == ["hello"]
+    assert asyncio.run(subscription.get()) == "hello"
+    assert "Event handler for users failed" in caplog.text
+
+class FlakyPubSub:
+    """Stands in for a redis pub/sub connection whose first subscription drops."""
+
+    def __init__(self, attempt: int, prefix: str):
+        self.attempt = attempt
+        self.prefix = prefix
+
+    async def psubscribe(self, pattern: str):
+        pass
+
+    async def listen(self):
+        if self.attempt == 0:
+            raise ConnectionError("connection reset")
+        yield {"type": "psubscribe", "channel": b"", "data": 1}
+        yield {"type": "pmessage", "channel": f"{self.prefix}mission:1".encode(), "data": b"after"}
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        pass
+
+class FlakyClient:
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.attempts = 0
+
+    def pubsub(self):
+        self.attempts += 1
+        return FlakyPubSub(self.attempts - 1, self.prefix)
+
+def test_redis_listener_resubscribes(monkeypatch):
+    hub = events.Hub()
+    # RedisBroker imports redis in __init__; only the listener is exercised here.
+    broker = events.RedisBroker.__new__(events.RedisBroker)
+    broker._hub, broker._prefix, broker._listener = hub, "test:", None
+    broker._client = FlakyClient("test:")
+    monkeypatch.setattr(events.RedisBroker, "RETRY_SECONDS", 0.01)
+
+    async def run():
+        subscription = events.Subscription("mission:1", max_queue=10)
+        hub.add(subscription)
+        listener = asyncio.ensure_future(broker._listen())
+        try:
+            return [await asyncio.wait_for(subscription.get(), 5) for _ in range(2)]
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    assert asyncio.run(run()) == [events.RESYNC_MESSAGE, "after"]
+    assert broker._client.attempts == 2
@@ -0,0 +1,66 @@
+# /tests/test_health.py
+"""
+Probes: /readyz fails while the database is behind the migrations or cannot be
+reached, and /healthz keeps answering through both. A worker's uptime counts
+from its own start, not from the import in the server master.
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database
+import worker_health
+from config import settings
+
+def set_revision(client, revision: str):
+    async def run():
+        async with database.async_engine.begin() as connection:
+            await connection.execute(text("UPDATE alembic_version SET version_num = :revision"), {"revision": revision})
+
+    client.portal.call(run)
+
+@pytest.fixture
+def pending_migration(client):
+    (head,) = database.migration_heads()
+    set_revision(client, f"{int(head) - 1:04d}")
+    yield
+    set_revision(client, head)
+
+@pytest.fixture
+def unreachable_database(client, monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/dir/app.db")
+    monkeypatch.setattr(database, "async_engine", engine)
+    yield
+    client.portal.call(engine.dispose)
+
+def test_ready(client):
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "revision": sorted(database.migration_heads())}
+
+def test_not_ready_while_a_migration_is_pending(client, pending_migration):
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert "migrate" in response.json()["detail"]
+    assert client.get("/healthz").status_code == 200
+
+def test_not_ready_without_the_database(client, unreachable_database):
+    assert client.get("/readyz").status_code == 503
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+def test_ready_again_once_migrated(client, pending_migration):
+    assert client.get("/readyz").status_code == 503
+    (head,) = database.migration_heads()
+    set_revision(client, head)
+    assert client.get("/readyz").status_code == 200
+
+def test_worker_uptime_counts_from_start(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_STATUS_DIR", "")
+    heartbeat = worker_health.Heartbeat()
+    assert heartbeat.status()["uptime_seconds"] is None
+
+    heartbeat.start()
+    status = heartbeat.status()
+    assert status["started_at"] <= status["heartbeat_at"]
+    assert 0 <= status["uptime_seconds"] < 1
@@ -0,0 +1,56 @@
+# /tests/test_jobs.py
+"""
+jobs.submit under concurrent submits of one user, and the local wakeup queue
+across event loops. The workers are stopped so submitted jobs stay queued.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+import jobs
+from config import settings
+from conftest import create_user
+from database import async_session_maker
+
+@pytest.fixture
+def idle_workers(client):
+    client.portal.call(jobs.workers.stop)
+    yield
+    client.portal.call(jobs.workers.start)
+
+async def submit_all(user_id: uuid.UUID, prompts: list[str]) -> list:
+    async def submit(prompt: str):
+        async with async_session_maker() as session:
+            return await jobs.submit(session, user_id, prompt)
+
+    return await asyncio.gather(*(submit(prompt) for prompt in prompts), return_exceptions=True)
+
+def test_concurrent_submits_share_one_job(client, idle_workers):
+    user_id = uuid.UUID(create_user(client)["id"])
+    prompt = f"Plan my science fair project {uuid.uuid4().hex}"
+    results = client.portal.call(submit_all, user_id, [prompt] * 5)
+    assert len({job.id for job in results}) == 1
+
+def test_concurrent_submits_respect_the_per_user_limit(client, idle_workers):
+    user_id = uuid.UUID(create_user(client)["id"])
+    prompts = [f"Plan my science fair project {uuid.uuid4().hex}" for _ in range(settings.AI_JOBS_PER_USER + 3)]
+    results = client.portal.call(submit_all, user_id, prompts)
+    queued = [result for result in results if isinstance(result, jobs.PlanJob)]
+    rejected = [result for result in results if getattr(result, "status_code", None) == 429]
+    assert len(queued) == settings.AI_JOBS_PER_USER
+    assert len(rejected) == len(prompts) - settings.AI_JOBS_PER_USER
+
+def test_local_queue_outlives_its_event_loop():
+    queue = jobs.LocalJobQueue()
+
+    async def wake_a_waiter():
+        waiter = asyncio.create_task(queue.wait(timeout=5))
+        await asyncio.sleep(0.01)  # let it block on the event
+        await queue.notify()
+        await asyncio.wait_for(waiter, 1)
+
+    # Each run is a new loop, like a restarted app or a second TestClient.
+    asyncio.run(wake_a_waiter())
+    asyncio.run(wake_a_waiter())
@@ -0,0 +1,147 @@
+# /tests/test_leaderboard.py
+"""
+Conditional GETs of a mission leaderboard: the ETag follows the ranking that is
+served, which may lag behind the mission's version in the database. Loads that
+race with awards, and the bounded in-memory boards.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+import leaderboard
+import services
+from conftest import create_mission, create_user
+from database import async_session_maker
+
+@pytest.fixture
+def mission(client):
+    members = [create_user(client)["id"] for _ in range(2)]
+    mission = create_mission(client, create_user(client)["id"], tasks=2, participants=members)
+    tasks = client.get(f"/missions/{mission['id']}/tasks/").json()["items"]
+    return {"id": mission["id"], "members": members, "tasks": [task["id"] for task in tasks]}
+
+def fetch(client, mission_id: str, etag: str | None = None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/missions/{mission_id}/leaderboard", headers=headers)
+
+def test_unchanged_ranking_is_not_modified(client, mission):
+    etag = fetch(client, mission["id"]).headers["ETag"]
+    assert fetch(client, mission["id"], etag).status_code == 304
+
+def test_new_ranking_gets_a_new_etag(client, mission):
+    first = fetch(client, mission["id"])
+    path = f"/missions/{mission['id']}/tasks/{mission['tasks'][0]}/complete"
+    client.post(path, json={"user_id": mission["members"][0]}).raise_for_status()
+
+    response = fetch(client, mission["id"], first.headers["ETag"])
+    assert response.status_code == 200
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert response.json()[0]["user_id"] == mission["members"][0]
+
+def test_version_bump_without_ranking_change(client, mission):
+    # What a worker whose board has not caught up yet sees: the version moved, the ranking did not.
+    first = fetch(client, mission["id"])
+
+    async def touch():
+        async with async_session_maker() as session:
+            await services.touch_mission(session, uuid.UUID(mission["id"]))
+            await session.commit()
+
+    client.portal.call(touch)
+    response = fetch(client, mission["id"], first.headers["ETag"])
+    assert response.status_code == 304
+
+# --- Loads racing awards ---
+
+def user_a_b():
+    return uuid.uuid4(), uuid.uuid4()
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_award_published_during_a_load_is_kept():
+    backend = leaderboard.InMemoryLeaderboardBackend(refresh_seconds=60, max_boards=10)
+    a, b = user_a_b()
+
+    async def scenario():
+        assert await backend.begin_load("global")
+        # The snapshot was read before a's award committed; the award is published before the load ends.
+        await backend.raise_score("global", a, 30)
+        await backend.load("global", [(a, 10), (b, 20)])
+        return await backend.top("global", 10)
+
+    assert run(scenario()) == [(a, 30), (b, 20)]
+
+def test_award_already_in_the_snapshot_is_not_counted_twice():
+    backend = leaderboard.InMemoryLeaderboardBackend(refresh_seconds=60, max_boards=10)
+    a, b = user_a_b()
+
+    async def scenario():
+        assert await backend.begin_load("global")
+        await backend.raise_score("global", a, 30)
+        await backend.load("global", [(a, 30), (b, 20)])
+        # Published again by a slower request: the same committed total.
+        await backend.raise_score("global", a, 30)
+        return await backend.top("global", 10)
+
+    assert run(scenario()) == [(a, 30), (b, 20)]
+
+def test_one_load_at_a_time():
+    backend = leaderboard.InMemoryLeaderboardBackend(refresh_seconds=60, max_boards=10)
+
+    async def scenario():
+        first, second = await backend.begin_load("global"), await backend.begin_load("global")
+        await backend.abort_load("global")
+        return first, second, await backend.begin_load("global")
+
+    assert run(scenario()) == (True, False, True)
+
+def test_least_recently_used_boards_are_evicted():
+    backend = leaderboard.InMemoryLeaderboardBackend(refresh_seconds=60, max_boards=2)
+    a, _ = user_a_b()
+
+    async def scenario():
+        for board in ("one", "two"):
+            await backend.begin_load(board)
+            await backend.load(board, [(a, 10)])
+        await backend.rank("one", a)
+        await backend.begin_load("three")
+        await backend.load("three", [(a, 10)])
+        return [await backend.has_board(board) for board in ("one", "two", "three")]
+
+    assert run(scenario()) == [True, False, True]
+
+def test_completions_during_a_global_rebuild_are_ranked(client, mission):
+    members, tasks = mission["members"], mission["tasks"]
+    client.get("/leaderboard/global").raise_for_status()
+    snapshot_read = asyncio.Event()
+    awarded = asyncio.Event()
+
+    async def rebuild_around_an_award():
+        real_scores = leaderboard._global_scores
+
+        async def slow_scores(session):
+            scores = await real_scores(session)
+            # Ends the read transaction, so the award can commit on SQLite without WAL.
+            await session.rollback()
+            snapshot_read.set()
+            await awarded.wait()
+            return scores
+
+        leaderboard.backend._boards.pop(leaderboard.GLOBAL_BOARD, None)
+        async with async_session_maker() as session:
+            await leaderboard._load(leaderboard.GLOBAL_BOARD, lambda: slow_scores(session))
+
+    async def complete_during_the_rebuild():
+        rebuild = asyncio.ensure_future(rebuild_around_an_award())
+        await asyncio.wait_for(snapshot_read.wait(), 5)
+        async with async_session_maker() as session:
+            await services.complete_tasks(session, uuid.UUID(mission["id"]), [(uuid.UUID(tasks[0]), uuid.UUID(members[0]))])
+        awarded.set()
+        await asyncio.wait_for(rebuild, 5)
+
+    client.portal.call(complete_during_the_rebuild)
+    points = {task["id"]: task["points"] for task in client.get(f"/missions/{mission['id']}/tasks/").json()["items"]}
+    assert client.get(f"/leaderboard/global/{members[0]}").json()["total_points"] == points[tasks[0]]
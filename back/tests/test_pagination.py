@@ -0,0 +1,75 @@
+# /tests/test_pagination.py
+"""
+Keyset pagination of the listings: following next_cursor visits every row once,
+in (createdAt, id) order even when createdAt ties, and bad cursors get 400.
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlmodel import update
+
+from conftest import create_mission, create_user
+from database import async_session_maker
+from models import Mission, Task
+
+def walk(client, path: str, limit: int, **params) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        page = client.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert page.status_code == 200
+        body = page.json()
+        assert len(body["items"]) <= limit
+        items += body["items"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return items
+
+def same_created_at(client, model, *filters):
+    """Gives the matching rows one createdAt, so only the id orders them."""
+    async def run():
+        async with async_session_maker() as session:
+            instant = datetime(2026, 1, 1, tzinfo=timezone.utc)
+            await session.exec(update(model).where(*filters).values(createdAt=instant))
+            await session.commit()
+
+    client.portal.call(run)
+
+def test_mission_pages(client):
+    creator = create_user(client)["id"]
+    created = {create_mission(client, creator, tasks=0)["id"] for _ in range(5)}
+    listed = walk(client, "/missions/", limit=2, createdById=creator)
+    assert len(listed) == len(created)
+    assert {m["id"] for m in listed} == created
+
+def test_tied_created_at_is_ordered_by_id(client):
+    creator = create_user(client)["id"]
+    missions = [create_mission(client, creator, tasks=0)["id"] for _ in range(5)]
+    same_created_at(client, Mission, Mission.createdById == uuid.UUID(creator))
+    listed = [m["id"] for m in walk(client, "/missions/", limit=2, createdById=creator)]
+    assert listed == sorted(missions, key=uuid.UUID)
+
+def test_task_pages(client):
+    mission = create_mission(client, create_user(client)["id"], tasks=7)
+    same_created_at(client, Task, Task.missionId == uuid.UUID(mission["id"]))
+    path = f"/missions/{mission['id']}/tasks/"
+    listed = [t["id"] for t in walk(client, path, limit=3)]
+    assert len(listed) == 7
+    assert listed == sorted(listed, key=uuid.UUID)
+    assert listed == [t["id"] for t in walk(client, path, limit=100)]
+
+def test_user_pages(client):
+    created = {create_user(client)["id"] for _ in range(3)}
+    listed = [u["id"] for u in walk(client, "/users/", limit=4)]
+    assert len(listed) == len(set(listed))
+    assert created <= set(listed)
+
+@pytest.mark.parametrize("cursor", ["nope", "bm9wZQ", "WyJub3QgYSBkYXRlIiwgIngiXQ"])
+@pytest.mark.parametrize("path", ["/missions/", "/users/"])
+def test_invalid_cursor(client, path, cursor):
+    assert client.get(path, params={"cursor": cursor}).status_code == 400
+
+def test_invalid_task_cursor(client):
+    mission = create_mission(client, create_user(client)["id"], tasks=1)
+    assert client.get(f"/missions/{mission['id']}/tasks/", params={"cursor": "nope"}).status_code == 400
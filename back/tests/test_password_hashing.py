@@ -0,0 +1,27 @@
+# /tests/test_password_hashing.py
+"""
+The Argon2 process pool: hashes round-trip through it, and once HASH_QUEUE_LIMIT
+jobs are pending, logins and sign-ups get 503 with Retry-After instead of queueing.
+"""
+
+import security
+from config import settings
+from conftest import create_user
+
+def test_pool_does_not_fork_the_server(client):
+    assert security._get_hash_pool()._mp_context.get_start_method() == "forkserver"
+
+def test_hash_round_trip(client):
+    hashed = client.portal.call(security.get_password_hash_async, "correct horse")
+    assert client.portal.call(security.verify_password_async, "correct horse", hashed)
+    assert not client.portal.call(security.verify_password_async, "wrong horse", hashed)
+
+def test_saturated_pool_sheds_logins(client, monkeypatch):
+    user = create_user(client)
+    monkeypatch.setattr(settings, "HASH_QUEUE_LIMIT", 0)
+    response = client.post("/auth/login", data={"username": user["username"], "password": "test-pass"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.HASH_RETRY_AFTER_SECONDS)
+
+    signup = client.post("/users/", json={"email": "x@example.com", "username": "x", "name": "X", "password": "pw"})
+    assert signup.status_code == 503
@@ -0,0 +1,76 @@
+# /tests/test_query_counts.py
+"""
+Query budgets for the list and detail endpoints.
+
+Each endpoint is called on enough rows (missions with several tasks and
+participants) that loading a relationship per row would blow the budget: an N+1
+brought back by a change to the routes, the loaders or the schemas fails here.
+Budgets count every statement on every engine, including the authentication lookup.
+Background statements would be counted too, so the AI job workers and the global
+leaderboard refresher are stopped.
+"""
+
+import contextlib
+
+import pytest
+
+import jobs
+import leaderboard
+from conftest import create_mission, create_user
+from database import all_async_engines
+from query_counter import assert_max_queries
+
+MISSIONS = 5
+PARTICIPANTS = 4
+
+@pytest.fixture(scope="module")
+def idle_workers(client):
+    """Stops the background work for the module: it runs on the same engines."""
+    client.portal.call(jobs.workers.stop)
+    client.portal.call(leaderboard.refresher.stop)
+    yield
+    client.portal.call(leaderboard.refresher.start)
+    client.portal.call(jobs.workers.start)
+
+@pytest.fixture(scope="module")
+def seeded(client, idle_workers):
+    creator = create_user(client)
+    members = [create_user(client)["id"] for _ in range(PARTICIPANTS)]
+    missions = [create_mission(client, creator["id"], tasks=4, participants=members) for _ in range(MISSIONS)]
+    login = client.post("/auth/login", data={"username": creator["username"], "password": "test-pass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    return {"creator": creator["id"], "member": members[0], "missions": [m["id"] for m in missions], "headers": headers}
+
+@contextlib.contextmanager
+def max_queries(expected: int):
+    with contextlib.ExitStack() as stack:
+        for engine in all_async_engines():
+            stack.enter_context(assert_max_queries(engine, expected))
+        yield
+
+# (path, with {mission}/{creator}/{member} filled in, statements allowed)
+BUDGETS = {
+    "list missions": ("/missions/?limit=5", 1),
+    "list missions by creator": ("/missions/?createdById={creator}", 1),
+    "get mission": ("/missions/{mission}", 3),
+    "list tasks": ("/missions/{mission}/tasks/", 2),
+    "mission leaderboard": ("/missions/{mission}/leaderboard", 2),
+    "list users": ("/users/", 1),
+    "get user": ("/users/{member}", 1),
+    "current user": ("/users/me", 1),
+    # User, missions, their tasks, their participants, then the archived missions.
+    "user missions": ("/users/{member}/missions/", 5),
+    "global leaderboard": ("/leaderboard/global", 1),
+}
+
+@pytest.mark.parametrize("name", BUDGETS)
+def test_query_budget(client, seeded, name):
+    template, budget = BUDGETS[name]
+    path = template.format(mission=seeded["missions"][0], creator=seeded["creator"], member=seeded["member"])
+    # Warm-up: boards and caches filled on first use are not what is measured.
+    client.get(path, headers=seeded["headers"]).raise_for_status()
+    with max_queries(budget):
+        response = client.get(path, headers=seeded["headers"])
+    assert response.status_code == 200
+    if name == "user missions":
+        assert len(response.json()) == MISSIONS
@@ -0,0 +1,66 @@
+# /tests/test_query_plans.py
+"""
+The read routes of check_query_plans.py against the test database: no statement
+scans a whole table, and the hot lookups run on the index meant for them.
+"""
+
+import httpx
+import pytest
+
+import leaderboard
+from check_query_plans import exercise_routes, full_scans, route_plans
+
+# route -> plan steps (substrings) that must show up among its statements.
+EXPECTED_INDEXES = {
+    "list missions": ["SEARCH mission USING INDEX ix_mission_active_createdAt_id"],
+    "list missions by creator": ["SEARCH mission USING INDEX ix_mission_createdById"],
+    "list archived missions": ["SEARCH missionarchive USING INDEX ix_missionarchive_createdById"],
+    "list tasks": ["SEARCH task USING INDEX ix_task_missionId_createdAt_id"],
+    "mission leaderboard": ["SEARCH missionparticipant USING INDEX ix_missionparticipant_mission_points"],
+    "global leaderboard": [
+        "SCAN missionparticipant USING INDEX ix_missionparticipant_user_id",
+        "SCAN missionparticipantarchive USING INDEX ix_missionparticipantarchive_user_id",
+    ],
+    "list users": ["SEARCH user USING INDEX ix_user_active_createdAt_id"],
+    "current user": ["SEARCH user USING INDEX ix_user_username"],
+    "user missions": [
+        "SEARCH missionparticipant USING INDEX ix_missionparticipant_user_id",
+        "SEARCH missionparticipantarchive USING INDEX ix_missionparticipantarchive_user_id",
+    ],
+    "search missions": ["SCAN mission_fts VIRTUAL TABLE INDEX", "SEARCH mission USING INDEX ix_mission_search_key"],
+    "search archived missions": [
+        "SCAN missionarchive_fts VIRTUAL TABLE INDEX",
+        "SEARCH missionarchive USING INDEX ix_missionarchive_search_key",
+    ],
+    "search tasks": ["SCAN task_fts VIRTUAL TABLE INDEX", "SEARCH task USING INDEX ix_task_search_key"],
+}
+
+@pytest.fixture(scope="module")
+def plans(app, client):
+    # Fresh boards, so the leaderboard routes run the queries that load them.
+    fresh = leaderboard.InMemoryLeaderboardBackend(refresh_seconds=60, max_boards=100)
+    previous, leaderboard.backend = leaderboard.backend, fresh
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://plans") as http:
+            return await exercise_routes(http)
+
+    try:
+        return route_plans(client.portal.call(run))
+    finally:
+        leaderboard.backend = previous
+
+def test_no_full_table_scans(plans):
+    scans = {
+        route: scans
+        for route, statements in plans.items()
+        for _, steps in statements
+        if (scans := full_scans(steps))
+    }
+    assert scans == {}
+
+@pytest.mark.parametrize("route", EXPECTED_INDEXES)
+def test_expected_index(plans, route):
+    steps = [step for _, statement_steps in plans[route] for step in statement_steps]
+    for expected in EXPECTED_INDEXES[route]:
+        assert any(step.startswith(expected) for step in steps), f"{route}: {expected!r} not in {steps}"
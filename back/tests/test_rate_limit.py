@@ -0,0 +1,60 @@
+# /tests/test_rate_limit.py
+"""
+Rate limit keys and default budget. The suite runs with the middleware off, so
+these call rate_limit directly.
+"""
+
+import asyncio
+import time
+import uuid
+
+import rate_limit
+from config import settings
+from security import create_access_token
+
+# What the web client sends on a first visit: sign up, log in (through the
+# trailing-slash redirect), load the missions page, then plan a mission and retry it once.
+FIRST_SESSION = [
+    ("POST", "/users/"),
+    ("POST", "/auth/login/"),
+    ("POST", "/auth/login"),
+    ("GET", "/users/me/missions/"),
+    ("GET", "/missions/"),
+    ("POST", "/ai/plan-mission"),
+    ("POST", "/ai/plan-mission"),
+]
+
+def scope(*headers: tuple[str, str], client: str = "10.0.0.1") -> dict:
+    return {"headers": [(name.encode(), value.encode()) for name, value in headers], "client": (client, 1234)}
+
+def test_forwarded_for_is_read_from_the_right():
+    forwarded = ("x-forwarded-for", "198.51.100.66, 203.0.113.7, 10.0.0.2")
+    assert rate_limit.client_key(scope(forwarded)) == "ip:10.0.0.1"
+    assert rate_limit.client_key(scope(forwarded), trusted_proxies=1) == "ip:10.0.0.2"
+    assert rate_limit.client_key(scope(forwarded), trusted_proxies=2) == "ip:203.0.113.7"
+    # More proxies configured than hops: the left-most entry, never an index error.
+    assert rate_limit.client_key(scope(forwarded), trusted_proxies=5) == "ip:198.51.100.66"
+    # One header per proxy reads the same as one appended header.
+    split = scope(("x-forwarded-for", "198.51.100.66"), ("x-forwarded-for", "203.0.113.7"))
+    assert rate_limit.client_key(split, trusted_proxies=1) == "ip:203.0.113.7"
+
+def test_expired_token_falls_back_to_the_ip(monkeypatch):
+    subject = str(uuid.uuid4())
+    authorization = ("authorization", f"Bearer {create_access_token({'sub': subject})}")
+    assert rate_limit.client_key(scope(authorization)) == f"user:{subject}"
+
+    later = time.time() + 3600
+    monkeypatch.setattr(rate_limit.time, "time", lambda: later)
+    assert rate_limit.client_key(scope(authorization)) == "ip:10.0.0.1"
+
+def test_first_session_fits_the_default_burst():
+    store = rate_limit.InMemoryRateLimitStore(max_keys=10)
+    per_second = settings.RATE_LIMIT_PER_MINUTE / 60
+
+    async def run():
+        for method, path in FIRST_SESSION:
+            cost = rate_limit.route_policy(method, path).cost
+            decision = await store.take("ip:10.0.0.1", cost, settings.RATE_LIMIT_BURST, per_second)
+            assert decision.allowed, f"{method} {path} rate limited"
+
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+# /tests/test_search.py
+"""
+Full-text search: ranking done by the database and keyset pages over it. Each
+test searches for a word of its own, so rows from other tests never match.
+"""
+
+import uuid
+
+import pytest
+
+from conftest import create_user
+from database import engine
+
+@pytest.fixture
+def word() -> str:
+    return f"w{uuid.uuid4().hex[:10]}"
+
+def create_tasks(client, creator_id: str, specs: list[tuple[str, str]]) -> str:
+    tasks = [{"title": title, "description": description, "points": 10} for title, description in specs]
+    response = client.post("/missions/with-tasks", json={"mission": {"name": "Search mission", "createdById": creator_id, "tasks": tasks}})
+    response.raise_for_status()
+    return response.json()["id"]
+
+def search(client, path: str, **params) -> dict:
+    response = client.get(path, params=params)
+    response.raise_for_status()
+    return response.json()
+
+def test_title_and_whole_word_rank_first(client, word):
+    create_tasks(client, create_user(client)["id"], [
+        ("Something else", f"mentions {word}ing in passing"),
+        (f"Prefix {word}ing", "only a longer word"),
+        (f"All about {word}", "the title says it"),
+    ])
+    items = search(client, "/search/tasks", q=word)["items"]
+    assert [item["title"] for item in items] == [f"All about {word}", f"Prefix {word}ing", "Something else"]
+    assert items[0]["score"] > items[1]["score"] > items[2]["score"] > 0
+
+def test_pages_cover_every_match_once(client, word):
+    create_tasks(client, create_user(client)["id"], [(f"Task {i} {word}", "same text" if i % 2 else f"{word} twice") for i in range(7)])
+    seen, cursor = [], None
+    while True:
+        page = search(client, "/search/tasks", q=word, limit=3, **({"cursor": cursor} if cursor else {}))
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 7
+
+def test_scoped_searches(client, word):
+    creator = create_user(client)["id"]
+    mission_id = create_tasks(client, creator, [(f"{word} here", "")])
+    create_tasks(client, create_user(client)["id"], [(f"{word} elsewhere", "")])
+    assert len(search(client, "/search/tasks", q=word)["items"]) == 2
+    assert [item["missionId"] for item in search(client, "/search/tasks", q=word, missionId=mission_id)["items"]] == [mission_id]
+
+    client.post("/missions/with-tasks", json={"mission": {"name": f"Named {word}", "createdById": creator, "tasks": []}}).raise_for_status()
+    assert len(search(client, "/search/missions", q=word, createdById=creator)["items"]) == 1
+
+def test_index_survives_renumbered_rowids(client, word):
+    create_tasks(client, create_user(client)["id"], [(f"First {word}", ""), (f"Second {word}", "")])
+    # What a VACUUM or a table rebuild may do to tables without an INTEGER PRIMARY KEY.
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE task SET rowid = -rowid WHERE title LIKE ?", (f"% {word}",))
+    create_tasks(client, create_user(client)["id"], [(f"Third {word}", "")])
+    items = search(client, "/search/tasks", q=word)["items"]
+    assert sorted(item["title"] for item in items) == [f"First {word}", f"Second {word}", f"Third {word}"]
+
+def test_invalid_cursor(client):
+    assert client.get("/search/tasks", params={"q": "task", "cursor": "nope"}).status_code == 400
@@ -0,0 +1,66 @@
+# /tests/test_serialization.py
+"""
+The projected fast path: `fields=` sparse fieldsets, and output identical to what
+the response models would have produced.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import create_mission, create_user
+from schemas import MissionRead, MissionReadWithParticipants, TaskRead
+from serialization import ORJSONResponse
+
+@pytest.fixture
+def mission(client):
+    creator, member = create_user(client)["id"], create_user(client)["id"]
+    mission = create_mission(client, creator, tasks=2, participants=[member])
+    return {"id": mission["id"], "creator": creator, "member": member}
+
+def get(client, path: str, **params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def test_mission_list_fields(client, mission):
+    page = get(client, "/missions/", createdById=mission["creator"], fields="id,name")
+    assert page["items"] == [{"id": mission["id"], "name": "Test mission"}]
+
+def test_mission_fields(client, mission):
+    body = get(client, f"/missions/{mission['id']}", fields="id,participants")
+    assert body.keys() == {"id", "participants"}
+    assert [p["user_id"] for p in body["participants"]] == [mission["member"]]
+
+def test_task_fields(client, mission):
+    items = get(client, f"/missions/{mission['id']}/tasks/", fields="title, points")["items"]
+    assert sorted(items, key=lambda task: task["points"]) == [{"title": "Task 0", "points": 10}, {"title": "Task 1", "points": 20}]
+
+def test_user_missions_fields(client, mission):
+    assert get(client, f"/users/{mission['member']}/missions/", fields="id") == [{"id": mission["id"]}]
+
+@pytest.mark.parametrize("path", ["/missions/", "/missions/{id}", "/missions/{id}/tasks/", "/users/{member}/missions/"])
+def test_unknown_fields(client, mission, path):
+    response = client.get(path.format(**mission), params={"fields": "id,password"})
+    assert response.status_code == 400
+    assert "Unknown fields: password" in response.json()["detail"]
+
+def test_projection_matches_the_response_models(client, mission):
+    # What FastAPI would have returned had it validated and dumped through the schemas.
+    def as_schema(schema, data: dict) -> dict:
+        return schema.model_validate(data).model_dump(mode="json")
+
+    full = get(client, f"/missions/{mission['id']}")
+    assert full == as_schema(MissionReadWithParticipants, full)
+    listed = get(client, "/missions/", createdById=mission["creator"])["items"]
+    assert listed == [as_schema(MissionRead, item) for item in listed]
+    tasks = get(client, f"/missions/{mission['id']}/tasks/")["items"]
+    assert tasks == [as_schema(TaskRead, task) for task in tasks]
+
+def test_orjson_response():
+    response = ORJSONResponse({"at": datetime(2026, 1, 1, tzinfo=timezone.utc), 1: "non-string key"})
+    assert response.body == b'{"at":"2026-01-01T00:00:00Z","1":"non-string key"}'
+    assert response.media_type == "application/json"
+
+def test_default_response_class(app):
+    assert app.router.default_response_class is ORJSONResponse
@@ -0,0 +1,88 @@
+# /tests/test_token_cache.py
+"""
+Cached bearer tokens are dropped when their user changes: once the change has
+committed (not when it is flushed), in this worker and, through the events
+broker, in the others.
+"""
+
+import json
+import uuid
+
+import pytest
+
+import dependencies
+import events
+from config import settings
+from conftest import create_user
+from database import async_session_maker
+from models import User
+
+class RecordingBroker(events.InMemoryBroker):
+    def __init__(self):
+        super().__init__(events.hub)
+        self.published: list[tuple[str, str]] = []
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.published.append((channel, message))
+        await super().publish(channel, message)
+
+@pytest.fixture
+def broker(monkeypatch):
+    recording = RecordingBroker()
+    monkeypatch.setattr(events, "broker", recording)
+    return recording
+
+@pytest.fixture
+def user(client):
+    user = create_user(client)
+    login = client.post("/auth/login", data={"username": user["username"], "password": "test-pass"})
+    user["headers"] = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    # Verified once, then served from the token cache.
+    assert client.get("/users/me", headers=user["headers"]).status_code == 200
+    return user
+
+def deactivate(client, user_id: str, commit: bool):
+    async def run():
+        async with async_session_maker() as session:
+            db_user = await session.get(User, uuid.UUID(user_id))
+            db_user.isActive = False
+            session.add(db_user)
+            await session.flush()
+            if commit:
+                await session.commit()
+            else:
+                await session.rollback()
+
+    client.portal.call(run)
+
+def generation(user_id: str) -> int:
+    return dependencies._generation(uuid.UUID(user_id))
+
+def test_committed_change_invalidates(client, broker, user):
+    deactivate(client, user["id"], commit=True)
+    assert client.get("/users/me", headers=user["headers"]).status_code == 401
+    assert broker.published == [(dependencies.INVALIDATION_CHANNEL, json.dumps([user["id"]]))]
+
+def test_rolled_back_change_keeps_the_cache(client, broker, user):
+    before = generation(user["id"])
+    deactivate(client, user["id"], commit=False)
+    assert generation(user["id"]) == before
+    assert broker.published == []
+    assert client.get("/users/me", headers=user["headers"]).status_code == 200
+
+def test_invalidation_from_another_worker(client, user):
+    before = generation(user["id"])
+    events.hub.dispatch(dependencies.INVALIDATION_CHANNEL, json.dumps([user["id"]]))
+    assert generation(user["id"]) > before
+    assert client.get("/users/me", headers=user["headers"]).status_code == 200
+
+def test_old_changes_are_forgotten(monkeypatch):
+    changed = [uuid.uuid4() for _ in range(3)]
+    for user_id in changed[:2]:
+        dependencies.invalidate_user(user_id)
+    later = dependencies.time.monotonic() + settings.TOKEN_CACHE_TTL_SECONDS + 1
+    monkeypatch.setattr(dependencies.time, "monotonic", lambda: later)
+    dependencies.invalidate_user(changed[2])
+    # Every token cached before the first two changes has expired by now.
+    assert [dependencies._generation(user_id) for user_id in changed[:2]] == [0, 0]
+    assert list(dependencies._user_generations) == [changed[2]]
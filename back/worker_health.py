@@ -0,0 +1,157 @@
+# /worker_health.py
+"""
+Per-worker health under the multi-process server (gunicorn.conf.py).
+
+/healthz is answered by whichever worker accepts the connection, so it says
+nothing about the others: a worker with a blocked event loop or an exhausted
+connection pool goes unnoticed as long as another one answers. Each worker
+therefore writes a status file every WORKER_HEARTBEAT_SECONDS (pid, uptime,
+requests served and in flight, database connections in use, event-loop lag) to
+a directory named after its parent process, the server master, under
+WORKER_STATUS_DIR. GET /healthz/workers reads the files of its own server: a
+worker whose last heartbeat is older than STALE_HEARTBEATS intervals is
+reported stale, and files of processes that no longer exist are removed.
+During a reload (python manage.py reload) the old and the new server each
+report their own workers.
+
+With WORKER_STATUS_DIR empty only the current process is reported.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+from config import settings
+from database import async_engine
+from instrumentation import http_requests_in_flight, http_requests_total
+from metrics import local_value
+
+logger = logging.getLogger(__name__)
+
+STALE_HEARTBEATS = 3
+
+def server_directory(server_pid: int | None = None) -> str | None:
+    """Where the workers of the server `server_pid` (default: this worker's) report."""
+    if not settings.WORKER_STATUS_DIR:
+        return None
+    return os.path.join(settings.WORKER_STATUS_DIR, str(server_pid or os.getppid()))
+
+def status_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class Heartbeat:
+    def __init__(self):
+        # Set by start(), in the worker: with a preloaded app the import happens in the master.
+        self.started_at: float | None = None
+        self.loop_lag_seconds = 0.0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def directory(self) -> str | None:
+        # Not fixed at import: with a preloaded app the module is imported before the fork.
+        return server_directory()
+
+    def status(self) -> dict:
+        pool = async_engine.pool
+        now = time.time()
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "heartbeat_at": now,
+            "uptime_seconds": round(now - self.started_at, 1) if self.started_at is not None else None,
+            "requests": int(local_value(http_requests_total)),
+            "in_flight": int(local_value(http_requests_in_flight)),
+            # Not every pool class counts checkouts (in-memory SQLite uses a static pool).
+            "db_connections_in_use": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "loop_lag_seconds": round(self.loop_lag_seconds, 4),
+        }
+
+    def _write(self):
+        path = status_path(self.directory, os.getpid())
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.status(), f)
+        # Atomic on POSIX: readers never see a half-written file.
+        os.replace(temporary, path)
+
+    async def _beat(self):
+        interval = settings.WORKER_HEARTBEAT_SECONDS
+        while True:
+            try:
+                self._write()
+            except OSError:
+                logger.exception("Could not write the worker status file")
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            # How late the loop woke us up: time other coroutines held it without yielding.
+            self.loop_lag_seconds = max(0.0, time.perf_counter() - started - interval)
+
+    def start(self):
+        self.started_at = time.time()
+        if self._task is None and self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._task = asyncio.ensure_future(self._beat())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            os.remove(status_path(self.directory, os.getpid()))
+        except OSError:
+            pass
+
+def read_statuses(directory: str) -> list[dict]:
+    """The status files in `directory` of processes still running."""
+    statuses = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            # Removed by its worker between listdir and open.
+            continue
+        if not _alive(status["pid"]):
+            # Killed without running its shutdown (SIGKILL, out of memory).
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        statuses.append(status)
+    return statuses
+
+def worker_statuses(server_pid: int | None = None) -> list[dict]:
+    """The status of every worker of a server, each with `age_seconds` and `stale`, by pid."""
+    directory = server_directory(server_pid)
+    statuses = read_statuses(directory) if directory else []
+    if not statuses and server_pid is None:
+        # Not reporting (WORKER_STATUS_DIR empty, or served without the startup event).
+        statuses = [heartbeat.status()]
+    now = time.time()
+    for status in statuses:
+        status["age_seconds"] = round(now - status["heartbeat_at"], 1)
+        status["stale"] = status["age_seconds"] > STALE_HEARTBEATS * settings.WORKER_HEARTBEAT_SECONDS
+    return sorted(statuses, key=lambda status: status["pid"])
+
+heartbeat = Heartbeat()
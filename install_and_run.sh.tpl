@@ -7,7 +7,7 @@ sleep 20
 # Atualiza os pacotes e instala as dependências do sistema
 export DEBIAN_FRONTEND=noninteractive
 apt-get update
-apt-get install -y git python3-pip python3-venv
+apt-get install -y git python3-pip python3-venv redis-server
 
 # Clona o repositório do projeto
 # ATENÇÃO: Confirme se esta é a URL correta do seu repositório Git
@@ -22,6 +22,10 @@ GOOGLE_API_KEY="${google_api_key}"
 SECRET_KEY="${jwt_secret_key}"
 ALGORITHM="HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES=30
+# Backends compartilhados entre os workers do gunicorn (um por CPU com eles; sem eles, um só)
+EVENTS_URL="${redis_url}"
+LEADERBOARD_URL="${redis_url}"
+RATE_LIMIT_URL="${redis_url}"
 EOL
 
 # Muda o dono de todos os arquivos do projeto para o usuário 'ubuntu'
@@ -39,7 +43,13 @@ source venv/bin/activate
 # Instala as dependências do Python a partir do requirements.txt
 pip install -r requirements.txt
 
-# Inicia o servidor FastAPI em segundo plano usando 'nohup'
-# Isso garante que o servidor continue rodando mesmo após o script terminar
-nohup uvicorn main:app --host 0.0.0.0 --port 8000 &
+# Aplica as migrações do banco uma única vez, antes de subir o servidor
+# (os workers não criam mais o schema no startup)
+python manage.py migrate
+
+# Inicia o servidor em segundo plano usando 'nohup' (continua rodando após o script terminar).
+# O gunicorn (configurado em gunicorn.conf.py) sobe um worker uvicorn por CPU, já que o .env
+# aponta EVENTS_URL, LEADERBOARD_URL e RATE_LIMIT_URL para o Redis. Para publicar
+# código novo sem derrubar requisições, rode `python manage.py reload` em vez de reiniciar.
+nohup gunicorn main:app > gunicorn.log 2>&1 &
 EOF
\ No newline at end of file
@@ -26,6 +26,12 @@ variable "jwt_secret_key" {
   sensitive = true
 }
 
+# Redis dos backends compartilhados (eventos, rankings, rate limit); por padrão o da própria VM
+variable "redis_url" {
+  type    = string
+  default = "redis://localhost:6379/0"
+}
+
 provider "mgc" {
   region  = "br-se1"
   api_key = var.api_key
@@ -37,6 +43,7 @@ data "template_file" "startup_script" {
   vars = {
     google_api_key = var.google_api_key
     jwt_secret_key = var.jwt_secret_key
+    redis_url      = var.redis_url
   }
 }
 
@@ -5,7 +5,7 @@ export const createTaskForMission = async (missionId: string, taskData: any) =>
     return response.data;
 };
 
-export const getTasksByMission = async (missionId: string) => {
-    const response = await api.get(`/missions/${missionId}/tasks/`);
-    return response.data;
+export const getTasksByMission = async (missionId: string, cursor?: string) => {
+    const response = await api.get(`/missions/${missionId}/tasks/`, { params: { cursor } });
+    return response.data; // { items, next_cursor }
 }
\ No newline at end of file